@@ -0,0 +1,4 @@
+"""Benchmarks of pybv, run with airspeed velocity (asv)."""
+
+# Authors: pybv developers
+# SPDX-License-Identifier: BSD-3-Clause
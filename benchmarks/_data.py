@@ -0,0 +1,89 @@
+"""Deterministic synthetic data for the benchmarks."""
+
+# Authors: pybv developers
+# SPDX-License-Identifier: BSD-3-Clause
+
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+SFREQ = 1000
+
+# number of time points that are generated and written to disk at a time
+_BLOCK_SAMPLES = 100_000
+
+
+def get_data_dir():
+    """Get the folder where generated data is cached across benchmark runs.
+
+    Set the environment variable ``PYBV_BENCHMARK_DATA`` to choose a folder on a disk
+    with enough space for the large cases.
+    """
+    default = Path(tempfile.gettempdir()) / "pybv-benchmarks"
+    data_dir = Path(os.environ.get("PYBV_BENCHMARK_DATA", default))
+    data_dir.mkdir(parents=True, exist_ok=True)
+    return data_dir
+
+
+def make_data(n_channels, n_times, seed=0):
+    """Generate EEG-like data in Volts, return it memory-mapped from a *.npy* file.
+
+    The data is generated and written in blocks of time points, such that files much
+    larger than the memory can be created. Each block is drawn from a generator seeded
+    with `seed` and the index of the block, such that the data is the same on every
+    machine and in every run. The last channel is a reference channel of zeros.
+
+    Files are cached in :func:`get_data_dir`, and only generated if they do not exist.
+    """
+    fname = get_data_dir() / f"data_{n_channels}x{n_times}_{seed}.npy"
+    if not fname.exists():
+        tmp_fname = fname.with_suffix(".tmp.npy")
+        data = np.lib.format.open_memmap(
+            str(tmp_fname), mode="w+", dtype=np.float64, shape=(n_channels, n_times)
+        )
+        freqs = np.linspace(1, 40, n_channels)[:, np.newaxis]
+        for block, start in enumerate(range(0, n_times, _BLOCK_SAMPLES)):
+            stop = min(start + _BLOCK_SAMPLES, n_times)
+            rng = np.random.default_rng([seed, block])
+            times = np.arange(start, stop) / SFREQ
+            noise = rng.standard_normal((n_channels, stop - start))
+            data[:, start:stop] = 10e-6 * noise + 20e-6 * np.sin(
+                2 * np.pi * freqs * times
+            )
+            data[-1, start:stop] = 0.0
+        data.flush()
+        del data
+        os.replace(tmp_fname, fname)  # never leave partially generated files
+    return np.load(fname, mmap_mode="r")
+
+
+def make_events(n_events, n_times, n_channels, kind="array", seed=0):
+    """Generate `n_events` events within `n_times` time points.
+
+    `kind` is the type of the events: ``"array"`` (onsets and descriptions of
+    stimuli), ``"list of dict"`` (stimuli, responses, and comments, some of which are
+    related to a few channels), or ``"EventTable"`` (the same events as columns).
+    """
+    from pybv import EventTable
+
+    rng = np.random.default_rng(seed)
+    onsets = np.sort(rng.integers(0, n_times, n_events))
+    descriptions = rng.integers(1, 256, n_events)
+    if kind == "array":
+        return np.column_stack([onsets, descriptions])
+
+    types = np.array(["Stimulus", "Response", "Comment"])[rng.integers(0, 3, n_events)]
+    records = []
+    for onset, description, event_type in zip(
+        onsets.tolist(), descriptions.tolist(), types.tolist()
+    ):
+        record = dict(onset=onset, description=description, type=event_type)
+        if event_type == "Comment":
+            record["description"] = f"comment {description}"
+            record["channels"] = f"ch{description % (n_channels - 1)}"
+        records.append(record)
+    if kind == "list of dict":
+        return records
+    return EventTable.from_records(records)
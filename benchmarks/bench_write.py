@@ -0,0 +1,231 @@
+"""Benchmarks of writing BrainVision files."""
+
+# Authors: pybv developers
+# SPDX-License-Identifier: BSD-3-Clause
+
+import io
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+import warnings
+from pathlib import Path
+
+import numpy as np
+
+from pybv import write_brainvision
+from pybv.io import (
+    _chk_events,
+    _get_ch_index,
+    _get_data_scales,
+    _write_bveeg_samples,
+    _write_vmrk_file,
+)
+
+from ._data import SFREQ, make_data, make_events
+
+
+def _get_ch_names(n_channels):
+    """Get channel names, the last channel being the reference channel."""
+    return [f"ch{idx}" for idx in range(n_channels - 1)] + ["ref"]
+
+
+class _WriteBenchmark:
+    """Set up data and an output folder, and write the data with `kwargs`."""
+
+    def setup(self, *params):
+        self.tmp_dir = Path(tempfile.mkdtemp(prefix="pybv-benchmark-"))
+
+    def teardown(self, *params):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def write(self, **kwargs):
+        # warnings about unsupported units are expected
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            write_brainvision(
+                data=self.data,
+                sfreq=SFREQ,
+                ch_names=self.ch_names,
+                fname_base="bench",
+                folder_out=self.tmp_dir,
+                overwrite=True,
+                **kwargs,
+            )
+
+
+class WriteSuite(_WriteBenchmark):
+    """Write data of different sizes and formats."""
+
+    params = (
+        [32, 256],
+        [60, 600],
+        ["binary_float32", "binary_int16", "auto"],
+        ["multiplexed", "vectorized"],
+    )
+    param_names = ["n_channels", "duration", "fmt", "orientation"]
+    timeout = 600
+
+    def setup(self, n_channels, duration, fmt, orientation):
+        """Generate (or load cached) data."""
+        super().setup()
+        self.data = make_data(n_channels, duration * SFREQ)
+        self.ch_names = _get_ch_names(n_channels)
+        self.kwargs = dict(fmt=fmt, orientation=orientation)
+        if fmt == "auto":
+            self.kwargs["resolution"] = "auto"
+
+    def time_write(self, *params):
+        """Wall time of writing."""
+        self.write(**self.kwargs)
+
+    def peakmem_write(self, *params):
+        """Peak resident memory of the process while writing."""
+        self.write(**self.kwargs)
+
+    def track_throughput(self, *params):
+        """Megabytes of (float64) input data written per second."""
+        start = time.perf_counter()
+        self.write(**self.kwargs)
+        return self.data.nbytes / 1e6 / (time.perf_counter() - start)
+
+    track_throughput.unit = "MB/s"
+
+    def track_tracemalloc_peak(self, *params):
+        """Peak of the memory allocated by Python and NumPy while writing."""
+        tracemalloc.start()
+        try:
+            self.write(**self.kwargs)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return peak / 1e6
+
+    track_tracemalloc_peak.unit = "MB"
+
+
+class LargeWriteSuite(_WriteBenchmark):
+    """Write several GB of data, only if ``PYBV_BENCHMARK_LARGE`` is set."""
+
+    params = ([256], [3_600])
+    param_names = ["n_channels", "duration"]
+    timeout = 3_600
+
+    def setup(self, n_channels, duration):
+        """Generate (or load cached) data, which takes a while on the first run."""
+        if not os.environ.get("PYBV_BENCHMARK_LARGE"):
+            raise NotImplementedError("Set PYBV_BENCHMARK_LARGE=1 to run")
+        super().setup()
+        self.data = make_data(n_channels, duration * SFREQ)
+        self.ch_names = _get_ch_names(n_channels)
+
+    def track_throughput(self, *params):
+        """Megabytes of (float64) input data written per second."""
+        start = time.perf_counter()
+        self.write()
+        return self.data.nbytes / 1e6 / (time.perf_counter() - start)
+
+    track_throughput.unit = "MB/s"
+
+    def peakmem_write(self, *params):
+        """Peak resident memory of the process while writing."""
+        self.write()
+
+
+class UnitsSuite(_WriteBenchmark):
+    """Write data with different units, resolutions, and reference channels."""
+
+    params = (
+        ["µV", "mixed"],
+        ["scalar", "per channel"],
+        ["none", "common", "in data"],
+    )
+    param_names = ["units", "resolution", "reference"]
+
+    def setup(self, units, resolution, reference):
+        """Generate (or load cached) data."""
+        super().setup()
+        n_channels = 64
+        self.data = make_data(n_channels, 60 * SFREQ)
+        self.ch_names = _get_ch_names(n_channels)
+        self.kwargs = dict(
+            unit=(
+                "µV"
+                if units == "µV"
+                else (["µV", "mV", "nV", "°C"] * n_channels)[:n_channels]
+            ),
+            resolution=(
+                0.1 if resolution == "scalar" else np.logspace(-3, 0, n_channels)
+            ),
+            ref_ch_names={
+                "none": None,
+                "common": "FCz",
+                "in data": "ref",
+            }[reference],
+        )
+
+    def time_write(self, *params):
+        """Wall time of writing."""
+        self.write(**self.kwargs)
+
+
+class EventsSuite(_WriteBenchmark):
+    """Validate and write events of different kinds and numbers."""
+
+    params = ([1_000, 100_000], ["array", "list of dict", "EventTable"])
+    param_names = ["n_events", "kind"]
+
+    def setup(self, n_events, kind):
+        """Generate and validate events."""
+        super().setup()
+        self.n_times = 3_600 * SFREQ
+        self.ch_names = _get_ch_names(64)
+        self.ch_index = _get_ch_index(self.ch_names)
+        self.events = make_events(n_events, self.n_times, len(self.ch_names), kind)
+        self.checked = _chk_events(self.events, self.ch_index, self.n_times)
+
+    def time_chk_events(self, *params):
+        """Wall time of validating the events."""
+        _chk_events(self.events, self.ch_index, self.n_times)
+
+    def time_write_vmrk_file(self, *params):
+        """Wall time of writing validated events to the marker file."""
+        _write_vmrk_file(
+            self.tmp_dir / "bench.vmrk",
+            self.tmp_dir / "bench.eeg",
+            self.checked,
+            "20000101120000000000",
+        )
+
+
+class EncodeSuite:
+    """Check, scale, and convert data in Volts to the binary format, in memory."""
+
+    params = ([32, 256], ["binary_float32", "binary_int16"])
+    param_names = ["n_channels", "fmt"]
+
+    def setup(self, n_channels, fmt):
+        """Load the data into memory, and get the scales of its units."""
+        self.data = np.asarray(make_data(n_channels, 60 * SFREQ))
+        self.units = (["µV", "mV"] * n_channels)[:n_channels]
+        self.resolution = np.full(n_channels, 0.1)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            self.scales = _get_data_scales(self.units, self.resolution)
+        self.ref_chs = {"ref": n_channels - 1}
+        # the buffer is reused, so that its memory is allocated only once
+        self.fid = io.BytesIO()
+
+    def time_write_bveeg_samples(self, n_channels, fmt):
+        """Wall time of encoding the data as written to the data file."""
+        self.fid.seek(0)
+        _write_bveeg_samples(
+            self.fid,
+            self.data,
+            scales=self.scales,
+            format=fmt,
+            resolution=self.resolution,
+            units=self.units,
+            ref_chs=self.ref_chs,
+        )
@@ -3,13 +3,99 @@
 # Authors: pybv developers
 # SPDX-License-Identifier: BSD-3-Clause
 
-try:
-    from importlib.metadata import version
+import importlib
+from typing import TYPE_CHECKING
 
-    __version__ = version("pybv")
-except Exception:
-    __version__ = "0.0.0"
+if TYPE_CHECKING:
+    from pybv._edit import (
+        append_markers,
+        concatenate_brainvision,
+        crop_brainvision,
+        pick_channels_brainvision,
+        split_brainvision,
+        update_brainvision,
+    )
+    from pybv._read import BrainVisionRaw, read_brainvision, read_markers, read_window
+    from pybv.io import (
+        BrainVisionWriter,
+        EventTable,
+        WriteReport,
+        submit_write,
+        write_brainvision,
+        write_brainvision_async,
+        write_brainvision_batch,
+        write_brainvision_streams,
+    )
 
-from pybv.io import write_brainvision
+__all__ = [
+    "BrainVisionRaw",
+    "BrainVisionWriter",
+    "EventTable",
+    "WriteReport",
+    "append_markers",
+    "concatenate_brainvision",
+    "crop_brainvision",
+    "pick_channels_brainvision",
+    "read_brainvision",
+    "read_markers",
+    "read_window",
+    "split_brainvision",
+    "submit_write",
+    "update_brainvision",
+    "write_brainvision",
+    "write_brainvision_async",
+    "write_brainvision_batch",
+    "write_brainvision_streams",
+]
 
-__all__ = ["write_brainvision"]
+# the public API is imported from its module on first access, such that importing pybv
+# (e.g., to run the command line interface) does not import NumPy
+_LAZY_MODULES = {
+    "pybv._edit": [
+        "append_markers",
+        "concatenate_brainvision",
+        "crop_brainvision",
+        "pick_channels_brainvision",
+        "split_brainvision",
+        "update_brainvision",
+    ],
+    "pybv._read": ["BrainVisionRaw", "read_brainvision", "read_markers", "read_window"],
+    "pybv.io": [
+        "BrainVisionWriter",
+        "EventTable",
+        "WriteReport",
+        "submit_write",
+        "write_brainvision",
+        "write_brainvision_async",
+        "write_brainvision_batch",
+        "write_brainvision_streams",
+    ],
+}
+_LAZY_IMPORTS = {
+    name: module for module, names in _LAZY_MODULES.items() for name in names
+}
+
+
+def _get_version():
+    """Get the installed version of pybv."""
+    try:
+        from importlib.metadata import version
+
+        return version("pybv")
+    except Exception:
+        return "0.0.0"
+
+
+def __getattr__(name):
+    if name == "__version__":
+        value = _get_version()
+    elif name in _LAZY_IMPORTS:
+        value = getattr(importlib.import_module(_LAZY_IMPORTS[name]), name)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value  # later accesses do not call __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__) | {"__version__"})
@@ -0,0 +1,11 @@
+"""Run the command line interface with ``python -m pybv``."""
+
+# Authors: pybv developers
+# SPDX-License-Identifier: BSD-3-Clause
+
+import sys
+
+from pybv._cli import main
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
@@ -0,0 +1,303 @@
+"""Command line interface of pybv."""
+
+# Authors: pybv developers
+# SPDX-License-Identifier: BSD-3-Clause
+
+import argparse
+import csv
+import json
+import struct
+import sys
+import zipfile
+from pathlib import Path
+
+# parameters of `write_brainvision` that can be set in a JSON sidecar
+_SIDECAR_KEYS = ("sfreq", "ch_names", "ref_ch_names", "unit", "resolution", "fmt")
+
+
+def main(argv=None):
+    """Run the ``pybv`` command line interface.
+
+    Parameters
+    ----------
+    argv : list of str | None
+        The command line arguments. If ``None`` (default), ``sys.argv[1:]`` is used.
+    """
+    parser = _get_parser()
+    args = parser.parse_args(argv)
+    try:
+        args.func(args)
+    except (ValueError, OSError) as exc:
+        parser.exit(1, f"{parser.prog}: error: {exc}\n")
+
+
+def _get_parser():
+    """Get the argument parser of the command line interface."""
+    parser = argparse.ArgumentParser(
+        prog="pybv", description="Lightweight I/O for the BrainVision data format."
+    )
+    subparsers = parser.add_subparsers(title="commands", required=True)
+
+    convert = subparsers.add_parser(
+        "convert",
+        help="convert .npy, .npz, or raw binary data to BrainVision",
+        description=(
+            "Convert data in Volts from a .npy file, an uncompressed member of a .npz "
+            "file, or a raw binary file to BrainVision. The input is memory-mapped "
+            "and written in blocks, such that the memory used does not depend on its "
+            "size. Metadata is taken from a JSON sidecar (with keys named like the "
+            "parameters of pybv.write_brainvision, e.g., 'sfreq' and 'ch_names'), a "
+            "TSV sidecar (with the columns 'name' and optionally 'units', "
+            "'resolution', and 'reference', like a BIDS channels.tsv file), or the "
+            "options below, which take precedence."
+        ),
+    )
+    convert.set_defaults(func=_convert)
+    convert.add_argument("input", type=Path, help="the .npy, .npz, or raw binary file")
+    convert.add_argument(
+        "-o",
+        "--folder-out",
+        type=Path,
+        default=Path("."),
+        help="the folder for the BrainVision files (default: current folder)",
+    )
+    convert.add_argument(
+        "--fname-base", help="the base name of the BrainVision files (default: input)"
+    )
+    convert.add_argument(
+        "--sidecar",
+        type=Path,
+        action="append",
+        default=[],
+        help="a .json or .tsv file with metadata, can be given more than once",
+    )
+    convert.add_argument("--sfreq", type=float, help="the sampling frequency in Hz")
+    convert.add_argument(
+        "--ch-names", type=_split_list, help="comma-separated channel names"
+    )
+    convert.add_argument(
+        "--ref-ch-names",
+        type=_split_list,
+        help="the reference channel, or comma-separated reference channels",
+    )
+    convert.add_argument(
+        "--unit", type=_split_list, help="the unit, or comma-separated units"
+    )
+    convert.add_argument(
+        "--resolution",
+        type=_split_list,
+        help="the resolution, comma-separated resolutions, or 'auto'",
+    )
+    convert.add_argument(
+        "--fmt",
+        choices=["binary_float32", "binary_int16", "auto"],
+        help="the binary format (default: binary_float32)",
+    )
+    convert.add_argument(
+        "--orientation",
+        choices=["multiplexed", "vectorized"],
+        default="multiplexed",
+        help="the data orientation of the .eeg file (default: multiplexed)",
+    )
+    convert.add_argument(
+        "--meas-date", help="the measurement date as YYYYMMDDhhmmssuuuuuu"
+    )
+    convert.add_argument(
+        "--chunk-samples", type=int, help="the number of time points written at a time"
+    )
+    convert.add_argument(
+        "--overwrite", action="store_true", help="overwrite existing files"
+    )
+
+    inputs = convert.add_argument_group("input options")
+    inputs.add_argument("--member", help="the name of the array in a .npz file")
+    inputs.add_argument(
+        "--layout",
+        choices=["channels-first", "times-first"],
+        help=(
+            "the layout of the input, channels-first for shape (n_channels, n_times) "
+            "and times-first for shape (n_times, n_channels) or interleaved raw binary "
+            "(default: channels-first for .npy/.npz, times-first for raw binary)"
+        ),
+    )
+    inputs.add_argument(
+        "--dtype",
+        help="the dtype of raw binary data, e.g., '<f4' or 'int16' (default: '<f8')",
+    )
+    inputs.add_argument(
+        "--n-channels",
+        type=int,
+        help="the number of channels of raw binary data (default: from channel names)",
+    )
+    inputs.add_argument(
+        "--offset",
+        type=int,
+        default=0,
+        help="the number of bytes before the data in a raw binary file (default: 0)",
+    )
+    return parser
+
+
+def _split_list(value):
+    """Split a comma-separated command line argument into a list of str."""
+    return value.split(",")
+
+
+def _convert(args):
+    """Run ``pybv convert``."""
+    import numpy as np
+
+    from pybv.io import write_brainvision
+
+    params = dict()
+    for sidecar in args.sidecar:
+        params.update(_read_sidecar(sidecar))
+    for key in _SIDECAR_KEYS:
+        value = getattr(args, key)
+        if value is not None:
+            params[key] = value
+    for key in ("unit", "ref_ch_names", "resolution"):
+        # single values apply to all channels
+        if isinstance(params.get(key), list) and len(params[key]) == 1:
+            params[key] = params[key][0]
+    if isinstance(params.get("resolution"), list):
+        params["resolution"] = np.array(params["resolution"], dtype=float)
+    elif params.get("resolution", "auto") != "auto":
+        params["resolution"] = float(params["resolution"])
+    for key in ("sfreq", "ch_names"):
+        if key not in params:
+            raise ValueError(
+                f"{key} must be given as --{key.replace('_', '-')} or in a sidecar"
+            )
+
+    n_channels = args.n_channels or len(params["ch_names"])
+    data = _load_data(args, n_channels)
+    write_brainvision(
+        data=data,
+        fname_base=args.fname_base or args.input.stem,
+        folder_out=args.folder_out,
+        overwrite=args.overwrite,
+        meas_date=args.meas_date,
+        chunk_samples=args.chunk_samples,
+        orientation=args.orientation,
+        **params,
+    )
+
+
+def _read_sidecar(fname):
+    """Read metadata from a JSON or TSV sidecar file, see `_get_parser`."""
+    if fname.suffix == ".json":
+        content = json.loads(fname.read_text(encoding="utf-8"))
+        params = {key: content[key] for key in _SIDECAR_KEYS if key in content}
+        if "SamplingFrequency" in content:  # BIDS sidecars
+            params.setdefault("sfreq", content["SamplingFrequency"])
+        return params
+
+    if fname.suffix == ".tsv":
+        with open(fname, encoding="utf-8", newline="") as fin:
+            rows = list(csv.DictReader(fin, delimiter="\t"))
+        if not rows or "name" not in rows[0]:
+            raise ValueError(f"{fname} must have a column 'name'")
+        params = dict(ch_names=[row["name"] for row in rows])
+        columns = dict(units="unit", resolution="resolution", reference="ref_ch_names")
+        for column, key in columns.items():
+            values = [row.get(column) for row in rows]
+            # columns that are missing or "n/a" (as in BIDS) for any channel are ignored
+            if all(value not in (None, "", "n/a") for value in values):
+                params[key] = values
+        return params
+
+    raise ValueError(f"Sidecar {fname} must be a .json or .tsv file")
+
+
+def _load_data(args, n_channels):
+    """Memory-map the input data as array of shape (n_channels, n_times)."""
+    import numpy as np
+
+    fname = args.input
+    if fname.suffix == ".npy":
+        data = np.load(fname, mmap_mode="r", allow_pickle=False)
+        layout = args.layout or "channels-first"
+    elif fname.suffix == ".npz":
+        data = _memmap_npz_member(fname, args.member)
+        layout = args.layout or "channels-first"
+    else:
+        dtype = np.dtype(args.dtype or "<f8")
+        n_bytes = fname.stat().st_size - args.offset
+        frame_bytes = n_channels * dtype.itemsize
+        if n_bytes < 0 or n_bytes % frame_bytes != 0:
+            raise ValueError(
+                f"The size of {fname} ({n_bytes} bytes after the offset) is not a "
+                f"multiple of the size of one time point of all channels "
+                f"({frame_bytes} bytes)"
+            )
+        layout = args.layout or "times-first"
+        n_times = n_bytes // frame_bytes
+        if n_times == 0:  # empty files can not be memory-mapped
+            data = np.empty((n_channels, 0), dtype=dtype)
+            layout = "channels-first"
+        else:
+            shape = (n_channels, n_times)
+            data = np.memmap(
+                fname,
+                dtype=dtype,
+                mode="r",
+                offset=args.offset,
+                shape=shape[::-1] if layout == "times-first" else shape,
+            )
+
+    if data.ndim != 2:
+        raise ValueError(f"The data in {fname} must be 2D, but has shape {data.shape}")
+    return data.T if layout == "times-first" else data
+
+
+def _memmap_npz_member(fname, member=None):
+    """Memory-map an uncompressed member of a .npz file.
+
+    Members of .npz files are .npy files in a zip archive, which can be memory-mapped
+    from the offset of their data if they are stored without compression.
+    """
+    import numpy as np
+
+    with zipfile.ZipFile(fname) as archive:
+        names = [name.removesuffix(".npy") for name in archive.namelist()]
+        if member is None and len(names) == 1:
+            member = names[0]
+        if member not in names:
+            raise ValueError(
+                f"Use --member to choose one of the arrays in {fname}: "
+                f"{', '.join(names)}"
+            )
+        info = archive.getinfo(archive.namelist()[names.index(member)])
+    if info.compress_type != zipfile.ZIP_STORED:
+        raise ValueError(
+            f"The array {member} in {fname} is compressed and can not be "
+            "memory-mapped, use numpy.savez instead of numpy.savez_compressed"
+        )
+
+    with open(fname, "rb") as fin:
+        # the local file header has a fixed size of 30 bytes, followed by the name of
+        # the file and an extra field of variable sizes
+        fin.seek(info.header_offset + 26)
+        name_len, extra_len = struct.unpack("<HH", fin.read(4))
+        fin.seek(info.header_offset + 30 + name_len + extra_len)
+        version = np.lib.format.read_magic(fin)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(fin)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(fin)
+        offset = fin.tell()
+    if dtype.hasobject:
+        raise ValueError(f"The array {member} in {fname} holds Python objects")
+    return np.memmap(
+        fname,
+        dtype=dtype,
+        mode="r",
+        shape=shape,
+        order="F" if fortran_order else "C",
+        offset=offset,
+    )
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
@@ -0,0 +1,912 @@
+"""Editing of existing BrainVision files."""
+
+# Authors: pybv developers
+# SPDX-License-Identifier: BSD-3-Clause
+
+import datetime
+import os
+import shutil
+import sys
+import tempfile
+from collections.abc import Iterator
+from pathlib import Path
+
+import numpy as np
+
+from pybv._read import (
+    _get_eeg_dtype,
+    _get_n_times,
+    _get_pick_idxs,
+    _read_vhdr,
+    read_markers,
+)
+from pybv.io import (
+    SUPPORTED_EVENT_TYPES,
+    EventTable,
+    _chk_ch_names,
+    _chk_events,
+    _chk_meas_date,
+    _chk_overwrite,
+    _chk_ref_ch_names,
+    _chk_units,
+    _get_ch_index,
+    _get_twidth,
+    _make_out_fnames,
+    _remove_out_files,
+    _write_buffer,
+    _write_vhdr_file,
+    _write_vmrk_events,
+    _write_vmrk_file,
+    _write_vmrk_header,
+)
+
+# number of bytes at the end of a marker file that are read to find the last marker,
+# which is increased as needed
+_TAIL_BYTES = 64 * 1024
+
+# size (in bytes) of the blocks that are read and written when data files can not be
+# copied in the kernel, or when channels are picked from multiplexed data
+_COPY_BYTES = 1024**2
+
+
+def update_brainvision(
+    vhdr_fname,
+    *,
+    ch_names=None,
+    ref_ch_names=None,
+    unit=None,
+    events=None,
+    meas_date=None,
+):
+    """Update the metadata of a BrainVision recording without rewriting its data.
+
+    Only the header file (*.vhdr*) and, if `events` or `meas_date` are changed, the
+    marker file (*.vmrk*) are written again. The data file (*.eeg*) is left as is, such
+    that updating even very large recordings takes milliseconds. Each file is first
+    written to a temporary file in the same folder, which then replaces the file, such
+    that readers never see a partially written file.
+
+    Parameters
+    ----------
+    vhdr_fname : str | pathlib.Path
+        The header file (*.vhdr*) of the recording.
+    ch_names : list of {str | int}, len (n_channels) | None
+        The new channel names. If ``None`` (default), the channel names are unchanged.
+    ref_ch_names : str | list of str, len (n_channels) | None
+        The new reference channel names. If ``None`` (default), the reference channel
+        names are unchanged. Note that, unlike in :func:`pybv.write_brainvision`, the
+        data of reference channels is not checked to be zero.
+    unit : str | list of str | None
+        The new unit of all channels, or of each channel. The data is not scaled, so
+        this only fixes wrongly specified units. If ``None`` (default), the units are
+        unchanged.
+    events : np.ndarray | EventTable | list of dict | iterator | None
+        The new events, which replace all markers in the marker file. See
+        :func:`pybv.write_brainvision` for the supported types. Onsets are validated
+        against the number of time points in the data file. If ``None`` (default), the
+        markers are unchanged.
+    meas_date : datetime.datetime | str | False | None
+        The new measurement date. If ``False``, the measurement date is removed (e.g.,
+        to anonymize the recording). If ``None`` (default), the measurement date is
+        unchanged.
+
+    See Also
+    --------
+    write_brainvision, read_brainvision
+
+    Notes
+    -----
+    When rewriting the marker file, only markers of the types ``"Stimulus"``,
+    ``"Response"``, and ``"Comment"`` are kept (see :func:`pybv.read_markers`), as well
+    as the measurement date. The header file is written like by
+    :func:`pybv.write_brainvision`, so comments and other information of header files
+    not written by ``pybv`` are not kept.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from pybv import read_brainvision, write_brainvision
+    >>> write_brainvision(
+    ...     data=np.zeros((2, 5)),
+    ...     sfreq=1,
+    ...     ch_names=["A1", "A2"],
+    ...     folder_out="./",
+    ...     fname_base="pybv_test_file",
+    ... )
+    >>> update_brainvision("pybv_test_file.vhdr", ch_names=["Fz", "Cz"])
+    >>> read_brainvision("pybv_test_file.vhdr").ch_names
+    ['Fz', 'Cz']
+    >>> # remove the files
+    >>> for ext in [".vhdr", ".vmrk", ".eeg"]:
+    ...     os.remove("pybv_test_file" + ext)
+
+    """
+    header = _read_vhdr(vhdr_fname)
+    vhdr_fname = header["vhdr_fname"]
+    eeg_fname = header["eeg_fname"]
+    vmrk_fname = header["vmrk_fname"] or vhdr_fname.with_suffix(".vmrk")
+    nchan = len(header["ch_names"])
+    n_times = _get_n_times(eeg_fname, nchan, _get_eeg_dtype(header["fmt"]))
+
+    # input checks, everything unspecified is taken from the existing files
+    if ch_names is None:
+        ch_names = header["ch_names"]
+    ch_names = _chk_ch_names(ch_names, nchan=nchan)
+    if ref_ch_names is None:
+        ref_ch_names = header["ref_ch_names"]  # empty if unspecified
+    else:
+        ref_ch_names = _chk_ref_ch_names(ref_ch_names, ch_names)
+    units = _chk_units(header["units"] if unit is None else unit, nchan)
+
+    writes = dict()
+    if events is not None or meas_date is not None:
+        if meas_date is None:
+            meas_date = _read_meas_date(vmrk_fname)
+        elif meas_date is False:
+            meas_date = None
+        meas_date = _chk_meas_date(meas_date)
+        if events is None:
+            # markers refer to channels by their number, so they keep referring to the
+            # same channels after renaming them
+            events = read_markers(vmrk_fname, ch_names=ch_names)
+        events = _chk_events(events, _get_ch_index(ch_names), n_times)
+        writes[vmrk_fname] = lambda fname: _write_vmrk_file(
+            fname, eeg_fname, events, meas_date
+        )
+    writes[vhdr_fname] = lambda fname: _write_vhdr_file(
+        vhdr_fname=fname,
+        vmrk_fname=vmrk_fname,
+        eeg_fname=eeg_fname,
+        sfreq=header["sfreq"],
+        ch_names=ch_names,
+        ref_ch_names=ref_ch_names,
+        orientation=header["orientation"],
+        format=header["fmt"],
+        resolution=header["resolution"],
+        units=units,
+        n_times=n_times,
+        quantization=header["quantization"],
+    )
+    _write_replacing(writes, like=eeg_fname)
+
+
+def append_markers(vmrk_fname, events, *, vhdr_fname=None):
+    """Append markers to the marker file (*.vmrk*) of a BrainVision recording.
+
+    The new markers are numbered after the last marker in the file, which is found by
+    reading only the end of the file. The time it takes therefore depends only on the
+    number of new markers, and not on the number of markers in the file (unless the
+    file ends with many markers of type ``"Comment"``, see below).
+
+    Parameters
+    ----------
+    vmrk_fname : str | pathlib.Path
+        The marker file.
+    events : np.ndarray | EventTable | list of dict | iterator
+        The events to append. See :func:`pybv.write_brainvision` for the supported
+        types. Channels and onsets are validated against the channel names and the
+        number of time points of the recording. Descriptions of ``"Stimulus"`` and
+        ``"Response"`` events are formatted with the same width as those of the last
+        such markers in the file (e.g., ``"S  1"`` for a width of three digits), which
+        are searched from the end of the file. If there are none, the width is
+        determined from the new descriptions, as by :func:`pybv.write_brainvision`.
+    vhdr_fname : str | pathlib.Path | None
+        The header file (*.vhdr*) of the recording. If ``None`` (default), it is the
+        file with the name of `vmrk_fname` and the extension *.vhdr*.
+
+    See Also
+    --------
+    read_markers, update_brainvision
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from pybv import read_markers, write_brainvision
+    >>> write_brainvision(
+    ...     data=np.zeros((2, 5)),
+    ...     sfreq=1,
+    ...     ch_names=["A1", "A2"],
+    ...     folder_out="./",
+    ...     fname_base="pybv_test_file",
+    ...     events=[dict(onset=1, description=1)],
+    ... )
+    >>> append_markers("pybv_test_file.vmrk", [dict(onset=3, description=2)])
+    >>> read_markers("pybv_test_file.vmrk").onset
+    array([1, 3])
+    >>> # remove the files
+    >>> for ext in [".vhdr", ".vmrk", ".eeg"]:
+    ...     os.remove("pybv_test_file" + ext)
+
+    """
+    vmrk_fname = Path(vmrk_fname)
+    if vhdr_fname is None:
+        vhdr_fname = vmrk_fname.with_suffix(".vhdr")
+    header = _read_vhdr(vhdr_fname)
+    nchan = len(header["ch_names"])
+    n_times = _get_n_times(header["eeg_fname"], nchan, _get_eeg_dtype(header["fmt"]))
+    ch_index = _get_ch_index(header["ch_names"])
+    if events is None:
+        raise ValueError("events must be given, but got None")
+    if isinstance(events, Iterator):
+        # all events are validated before appending, so that nothing is appended if
+        # any of them is invalid
+        events = list(events)
+
+    last_marker, ends_with_newline, twidth = _read_last_marker(vmrk_fname)
+    events = _chk_events(events, ch_index, n_times, twidth=twidth)
+    is_stim = events.type_code != SUPPORTED_EVENT_TYPES.index("Comment")
+    if twidth is not None and any(
+        len(description) != twidth + 1
+        for description in set(events.description[is_stim].tolist())
+    ):
+        raise ValueError(
+            f"The descriptions of the markers in {vmrk_fname} have a width of "
+            f"{twidth} digits, which some of the new descriptions do not fit into"
+        )
+    with open(vmrk_fname, "a", encoding="utf-8") as fout:
+        if not ends_with_newline:
+            fout.write("\n")
+        _write_vmrk_events(fout.write, events, last_marker + 1)
+
+
+def concatenate_brainvision(vhdr_fnames, *, fname_base, folder_out, overwrite=False):
+    """Concatenate BrainVision recordings without decoding their data.
+
+    The recordings must have the same channels, references, units, resolutions,
+    sampling frequency, and binary format, and their data must be multiplexed. Their
+    data files (*.eeg*) are then concatenated byte by byte, which is done in the kernel
+    where supported (with :func:`os.copy_file_range` or :func:`os.sendfile` on Linux),
+    such that concatenating runs at the speed of copying files.
+
+    The markers of all recordings are merged, with onsets shifted by the number of
+    time points of the preceding recordings. A ``"New Segment"`` marker (with the
+    measurement date of the recording, if known) is written at the start of each
+    recording after the first.
+
+    Parameters
+    ----------
+    vhdr_fnames : list of {str | pathlib.Path}
+        The header files (*.vhdr*) of the recordings, in the order in which they are
+        concatenated.
+    fname_base : str
+        The base name for the output files. Three files will be created (*.vhdr*,
+        *.vmrk*, *.eeg*), and all will share this base name.
+    folder_out : str | pathlib.Path
+        The folder where output files will be saved. Will be created if it does not
+        exist.
+    overwrite : bool
+        Whether or not to overwrite existing files. Defaults to ``False``.
+
+    See Also
+    --------
+    read_brainvision, write_brainvision
+
+    Notes
+    -----
+    Only markers of the types ``"Stimulus"``, ``"Response"``, and ``"Comment"`` are
+    kept (see :func:`pybv.read_markers`), in addition to the ``"New Segment"`` markers.
+    If the header files hold the maximum quantization errors of the channels (see
+    :func:`pybv.write_brainvision`), the largest of these errors is written.
+    """
+    folder_out = Path(folder_out)
+    _chk_overwrite(overwrite)
+    if isinstance(vhdr_fnames, str | os.PathLike) or len(vhdr_fnames) == 0:
+        raise ValueError("vhdr_fnames must be a list of at least one header file")
+    headers = [_read_vhdr(vhdr_fname) for vhdr_fname in vhdr_fnames]
+    first = headers[0]
+    for header in headers:
+        if header["orientation"] != "multiplexed":
+            raise ValueError(
+                f"Only multiplexed data can be concatenated, but "
+                f"{header['vhdr_fname']} is {header['orientation']}"
+            )
+        for key in ("ch_names", "ref_ch_names", "units", "sfreq", "fmt", "resolution"):
+            if not np.array_equal(header[key], first[key]):
+                raise ValueError(
+                    f"Recordings with different {key} can not be concatenated, but "
+                    f"{header['vhdr_fname']} differs from {first['vhdr_fname']}"
+                )
+    nchan = len(first["ch_names"])
+    dtype = _get_eeg_dtype(first["fmt"])
+    n_times = [_get_n_times(header["eeg_fname"], nchan, dtype) for header in headers]
+    offsets = np.concatenate([[0], np.cumsum(n_times)])
+
+    # markers refer to channels by their number, which are the same in all recordings
+    ch_index = _get_ch_index(first["ch_names"])
+    meas_dates, events = [], []
+    for header, offset in zip(headers, offsets):
+        vmrk_fname = header["vmrk_fname"]
+        meas_dates.append(_read_meas_date(vmrk_fname) if vmrk_fname else None)
+        if vmrk_fname is None or not vmrk_fname.exists():
+            events.append(None)
+            continue
+        part_events = read_markers(vmrk_fname, ch_names=first["ch_names"])
+        part_events.onset = part_events.onset + offset
+        events.append(part_events)
+    # descriptions are formatted with the same width in all parts, as if all markers
+    # were written at once
+    max_descr = (_get_max_description(table) for table in events if table is not None)
+    twidth = _get_twidth(max(max_descr, default=1))
+    events = [
+        None
+        if part_events is None
+        else _chk_events(part_events, ch_index, offsets[-1], twidth=twidth)
+        for part_events in events
+    ]
+
+    quantization = None
+    if all(header["quantization"] is not None for header in headers):
+        quantization = np.max([header["quantization"] for header in headers], axis=0)
+
+    folder_out_created, fnames = _make_out_fnames(folder_out, fname_base, overwrite)
+    eeg_fname, vmrk_fname, vhdr_fname = fnames
+    _chk_not_input(eeg_fname, [header["eeg_fname"] for header in headers])
+    try:
+        with open(eeg_fname, "wb", buffering=0) as fdst:
+            for header, size in zip(headers, n_times):
+                with open(header["eeg_fname"], "rb", buffering=0) as fsrc:
+                    _copy_range(fsrc, fdst, 0, size * nchan * dtype.itemsize)
+
+        with open(vmrk_fname, "w", encoding="utf-8") as fout:
+            _write_vmrk_header(fout, eeg_fname.name, meas_dates[0])
+            iev = 1 if meas_dates[0] is None else 2
+            for idx, part_events in enumerate(events):
+                if idx > 0:
+                    date = "" if meas_dates[idx] is None else f",{meas_dates[idx]}"
+                    fout.write(f"Mk{iev}=New Segment,,{offsets[idx] + 1},1,0{date}\n")
+                    iev += 1
+                if part_events is not None:
+                    iev = _write_vmrk_events(fout.write, part_events, iev)
+
+        _write_vhdr_file(
+            vhdr_fname=vhdr_fname,
+            vmrk_fname=vmrk_fname,
+            eeg_fname=eeg_fname,
+            sfreq=first["sfreq"],
+            ch_names=first["ch_names"],
+            ref_ch_names=first["ref_ch_names"],
+            orientation="multiplexed",
+            format=first["fmt"],
+            resolution=first["resolution"],
+            units=first["units"],
+            quantization=quantization,
+        )
+    except (ValueError, OSError):
+        _remove_out_files(folder_out, folder_out_created, fnames)
+        raise
+
+
+def crop_brainvision(
+    vhdr_fname, *, fname_base, folder_out, tmin=0.0, tmax=None, overwrite=False
+):
+    """Crop a BrainVision recording to a time window without decoding its data.
+
+    The data of a time window is a single range of bytes of a multiplexed data file
+    (*.eeg*), or one range per channel of a vectorized data file. These ranges are
+    copied in the kernel where supported (see :func:`pybv.concatenate_brainvision`),
+    so no values are decoded, and the time it takes depends only on the length of the
+    window. Markers are filtered and shifted to the window, and the measurement date is
+    shifted to the start of the window.
+
+    Parameters
+    ----------
+    vhdr_fname : str | pathlib.Path
+        The header file (*.vhdr*) of the recording.
+    fname_base : str
+        The base name for the output files. Three files will be created (*.vhdr*,
+        *.vmrk*, *.eeg*), and all will share this base name.
+    folder_out : str | pathlib.Path
+        The folder where output files will be saved. Will be created if it does not
+        exist.
+    tmin : float
+        The start of the window in seconds. Defaults to ``0.0``.
+    tmax : float | None
+        The end of the window in seconds, which is not included in the window. If
+        ``None`` (default), the window ends with the recording. Times are rounded to
+        the nearest time point.
+    overwrite : bool
+        Whether or not to overwrite existing files. Defaults to ``False``.
+
+    See Also
+    --------
+    split_brainvision, read_window
+
+    Notes
+    -----
+    Markers with onsets in the window are kept, and their durations are shortened to
+    end with the window if necessary. Only markers of the types ``"Stimulus"``,
+    ``"Response"``, and ``"Comment"`` are kept (see :func:`pybv.read_markers`).
+    """
+    folder_out = Path(folder_out)
+    _chk_overwrite(overwrite)
+    header, n_times, events, meas_date = _read_recording(vhdr_fname)
+    start, stop = _get_time_idxs([tmin, tmax], header["sfreq"], n_times, "tmin, tmax")
+    if stop <= start:
+        raise ValueError(
+            f"tmin ({tmin}) and tmax ({tmax}) must be at least one time point apart, "
+            "so that the cropped recording has at least one time point"
+        )
+    _write_crop(
+        header,
+        n_times,
+        start,
+        stop,
+        events=events,
+        meas_date=meas_date,
+        fname_base=fname_base,
+        folder_out=folder_out,
+        overwrite=overwrite,
+    )
+
+
+def split_brainvision(vhdr_fname, times, *, fname_base, folder_out, overwrite=False):
+    """Split a BrainVision recording at some times without decoding its data.
+
+    Each part of the recording is written like by :func:`pybv.crop_brainvision`, to
+    files named ``fname_base + "_split-01"``, ``fname_base + "_split-02"``, and so on.
+
+    Parameters
+    ----------
+    vhdr_fname : str | pathlib.Path
+        The header file (*.vhdr*) of the recording.
+    times : list of float
+        The increasing times in seconds at which the recording is split, which are
+        rounded to the nearest time point. Each time is the start of a part, such that
+        there is one more part than times.
+    fname_base : str
+        The base name for the output files, to which the number of each part is
+        appended.
+    folder_out : str | pathlib.Path
+        The folder where output files will be saved. Will be created if it does not
+        exist.
+    overwrite : bool
+        Whether or not to overwrite existing files. Defaults to ``False``.
+
+    Returns
+    -------
+    vhdr_fnames : list of pathlib.Path
+        The header files (*.vhdr*) of the parts.
+
+    See Also
+    --------
+    crop_brainvision, concatenate_brainvision
+    """
+    folder_out = Path(folder_out)
+    _chk_overwrite(overwrite)
+    header, n_times, events, meas_date = _read_recording(vhdr_fname)
+    bounds = [0, *_get_time_idxs(times, header["sfreq"], n_times, "times"), n_times]
+    if (np.diff(bounds) <= 0).any():
+        raise ValueError(
+            f"times must increase and be within the recording, so that each part has "
+            f"at least one time point, but got {times}"
+        )
+
+    width = max(2, len(str(len(bounds) - 1)))
+    folder_out_created = not folder_out.exists()
+    fnames = []
+    try:
+        for idx, (start, stop) in enumerate(zip(bounds[:-1], bounds[1:])):
+            fnames += _write_crop(
+                header,
+                n_times,
+                start,
+                stop,
+                events=events,
+                meas_date=meas_date,
+                fname_base=f"{fname_base}_split-{idx + 1:0{width}}",
+                folder_out=folder_out,
+                overwrite=overwrite,
+            )
+    except (ValueError, OSError):
+        _remove_out_files(folder_out, folder_out_created, fnames)
+        raise
+    return fnames[2::3]
+
+
+def pick_channels_brainvision(
+    vhdr_fname, picks, *, fname_base, folder_out, overwrite=False
+):
+    """Write some channels of a BrainVision recording without decoding its data.
+
+    The values of the picked channels are copied in the binary format of the data file
+    (*.eeg*), so they are neither scaled nor converted. For vectorized data, each
+    picked channel is a single range of bytes that is copied in the kernel where
+    supported (see :func:`pybv.concatenate_brainvision`). For multiplexed data, blocks
+    of time points are memory-mapped and the picked channels are gathered into a
+    buffer of a fixed size, such that the memory used does not depend on the size of
+    the recording.
+
+    Parameters
+    ----------
+    vhdr_fname : str | pathlib.Path
+        The header file (*.vhdr*) of the recording.
+    picks : list of str | list of int
+        The names or (zero-based) indices of the channels to keep, in the order in
+        which they are written.
+    fname_base : str
+        The base name for the output files. Three files will be created (*.vhdr*,
+        *.vmrk*, *.eeg*), and all will share this base name.
+    folder_out : str | pathlib.Path
+        The folder where output files will be saved. Will be created if it does not
+        exist.
+    overwrite : bool
+        Whether or not to overwrite existing files. Defaults to ``False``.
+
+    See Also
+    --------
+    crop_brainvision, read_window
+
+    Notes
+    -----
+    Markers of specific channels are kept for the picked channels and renumbered, and
+    markers of only channels that are not picked are dropped. Markers of all channels
+    are kept. Only markers of the types ``"Stimulus"``, ``"Response"``, and
+    ``"Comment"`` are kept (see :func:`pybv.read_markers`).
+    """
+    folder_out = Path(folder_out)
+    _chk_overwrite(overwrite)
+    header, n_times, events, meas_date = _read_recording(vhdr_fname)
+    if picks is None or isinstance(picks, str) or not len(picks):
+        raise ValueError(
+            f"picks must be a list of at least one channel name or index, but got "
+            f"{picks!r}"
+        )
+    picks = _get_pick_idxs(picks, header["ch_names"])
+    if len(np.unique(picks)) != len(picks):
+        raise ValueError("picks must not contain a channel more than once")
+
+    nchan = len(header["ch_names"])
+    dtype = _get_eeg_dtype(header["fmt"])
+    ch_names = [header["ch_names"][pick] for pick in picks]
+    if events is not None:
+        events = _pick_events(events, ch_names)
+        events = _chk_events(events, _get_ch_index(ch_names), n_times)
+
+    folder_out_created, fnames = _make_out_fnames(folder_out, fname_base, overwrite)
+    eeg_fname, vmrk_fname, vhdr_fname = fnames
+    _chk_not_input(eeg_fname, [header["eeg_fname"]])
+    try:
+        if header["orientation"] == "vectorized":
+            with (
+                open(header["eeg_fname"], "rb", buffering=0) as fsrc,
+                open(eeg_fname, "wb", buffering=0) as fdst,
+            ):
+                count = n_times * dtype.itemsize
+                for pick in picks:
+                    _copy_range(fsrc, fdst, pick * count, count)
+        else:
+            frame_bytes = nchan * dtype.itemsize
+            block_size = max(1, _COPY_BYTES // frame_bytes)
+            buffer = np.empty((min(block_size, n_times), len(picks)), dtype=dtype)
+            with open(eeg_fname, "wb", buffering=0) as fdst:
+                for start in range(0, n_times, block_size):
+                    # each block is mapped on its own, so that the pages of blocks that
+                    # were written are released and memory use is bounded
+                    block = np.memmap(
+                        header["eeg_fname"],
+                        dtype=dtype,
+                        mode="r",
+                        offset=start * frame_bytes,
+                        shape=(min(block_size, n_times - start), nchan),
+                    )
+                    out = buffer[: len(block)]
+                    np.take(block, picks, axis=1, out=out)
+                    del block
+                    _write_buffer(fdst, out)
+        _write_vmrk_file(vmrk_fname, eeg_fname, events, meas_date)
+        quantization = header["quantization"]
+        _write_vhdr_file(
+            vhdr_fname=vhdr_fname,
+            vmrk_fname=vmrk_fname,
+            eeg_fname=eeg_fname,
+            sfreq=header["sfreq"],
+            ch_names=ch_names,
+            ref_ch_names=[header["ref_ch_names"][pick] for pick in picks],
+            orientation=header["orientation"],
+            format=header["fmt"],
+            resolution=header["resolution"][picks],
+            units=[header["units"][pick] for pick in picks],
+            n_times=n_times,
+            quantization=None if quantization is None else quantization[picks],
+        )
+    except (ValueError, OSError):
+        _remove_out_files(folder_out, folder_out_created, fnames)
+        raise
+
+
+def _read_recording(vhdr_fname):
+    """Read the header, number of time points, markers, and date of a recording."""
+    header = _read_vhdr(vhdr_fname)
+    nchan = len(header["ch_names"])
+    n_times = _get_n_times(header["eeg_fname"], nchan, _get_eeg_dtype(header["fmt"]))
+    vmrk_fname = header["vmrk_fname"]
+    if vmrk_fname is None or not vmrk_fname.exists():
+        return header, n_times, None, None
+    events = read_markers(vmrk_fname, ch_names=header["ch_names"])
+    return header, n_times, events, _read_meas_date(vmrk_fname)
+
+
+def _get_time_idxs(times, sfreq, n_times, name):
+    """Convert times in seconds to indices of the nearest time points.
+
+    ``None`` is converted to `n_times`, and all indices must be in ``[0, n_times]``.
+    """
+    idxs = []
+    for time in times:
+        if time is None:
+            idxs.append(n_times)
+            continue
+        if isinstance(time, bool) or not isinstance(time, int | float | np.number):
+            raise ValueError(f"{name} must be times in seconds, but got {time!r}")
+        idxs.append(int(round(time * sfreq)))
+    if any(idx < 0 or idx > n_times for idx in idxs) or idxs != sorted(idxs):
+        raise ValueError(
+            f"{name} must be increasing times in seconds within the recording "
+            f"(0 to {n_times / sfreq:g} s), but got {times}"
+        )
+    return idxs
+
+
+def _write_crop(
+    header,
+    n_times,
+    start,
+    stop,
+    *,
+    events,
+    meas_date,
+    fname_base,
+    folder_out,
+    overwrite,
+):
+    """Write the time points ``start:stop`` of a recording by copying byte ranges.
+
+    `events` (an :class:`EventTable` or ``None``) and `meas_date` are those of the
+    whole recording. Returns the (eeg, vmrk, vhdr) file names.
+    """
+    nchan = len(header["ch_names"])
+    itemsize = _get_eeg_dtype(header["fmt"]).itemsize
+    if events is not None:
+        events = _crop_events(events, start, stop)
+        events = _chk_events(events, _get_ch_index(header["ch_names"]), stop - start)
+    if meas_date is not None:
+        date = datetime.datetime.strptime(meas_date, "%Y%m%d%H%M%S%f")
+        date += datetime.timedelta(seconds=start / header["sfreq"])
+        meas_date = date.strftime("%Y%m%d%H%M%S%f")
+
+    folder_out_created, fnames = _make_out_fnames(folder_out, fname_base, overwrite)
+    eeg_fname, vmrk_fname, vhdr_fname = fnames
+    _chk_not_input(eeg_fname, [header["eeg_fname"]])
+    try:
+        with (
+            open(header["eeg_fname"], "rb", buffering=0) as fsrc,
+            open(eeg_fname, "wb", buffering=0) as fdst,
+        ):
+            if header["orientation"] == "multiplexed":
+                offset, count = start * nchan * itemsize, (stop - start) * nchan
+                _copy_range(fsrc, fdst, offset, count * itemsize)
+            else:
+                for ch in range(nchan):
+                    offset = (ch * n_times + start) * itemsize
+                    _copy_range(fsrc, fdst, offset, (stop - start) * itemsize)
+        _write_vmrk_file(vmrk_fname, eeg_fname, events, meas_date)
+        _write_vhdr_file(
+            vhdr_fname=vhdr_fname,
+            vmrk_fname=vmrk_fname,
+            eeg_fname=eeg_fname,
+            sfreq=header["sfreq"],
+            ch_names=header["ch_names"],
+            ref_ch_names=header["ref_ch_names"],
+            orientation=header["orientation"],
+            format=header["fmt"],
+            resolution=header["resolution"],
+            units=header["units"],
+            n_times=stop - start,
+            quantization=header["quantization"],
+        )
+    except (ValueError, OSError):
+        _remove_out_files(folder_out, folder_out_created, fnames)
+        raise
+    return list(fnames)
+
+
+def _crop_events(events, start, stop):
+    """Get the events with onsets in ``start:stop``, shifted to start at `start`.
+
+    Durations are shortened to end at `stop` if necessary.
+    """
+    idxs = np.flatnonzero((events.onset >= start) & (events.onset < stop))
+    onset = events.onset[idxs]
+    cropped = EventTable(
+        onset=onset - start,
+        description=events.description[idxs],
+        duration=np.minimum(events.duration[idxs], stop - onset),
+    )
+    # set the columns of types and channels directly, as in `read_markers`
+    cropped.type_code = events.type_code[idxs]
+    n_channels = np.diff(events.ch_indptr)[idxs]
+    cropped.ch_indptr = np.concatenate([[0], np.cumsum(n_channels)])
+    ch_positions = np.repeat(
+        events.ch_indptr[idxs] - cropped.ch_indptr[:-1], n_channels
+    )
+    cropped.ch_data = events.ch_data[ch_positions + np.arange(cropped.ch_indptr[-1])]
+    return cropped
+
+
+def _pick_events(events, ch_names):
+    """Get the events of all channels or of any of `ch_names`, for these channels."""
+    picked = np.isin(events.ch_data, ch_names)
+    n_picked = np.concatenate([[0], np.cumsum(picked)])[events.ch_indptr]
+    n_picked = np.diff(n_picked)
+    idxs = np.flatnonzero((np.diff(events.ch_indptr) == 0) | (n_picked > 0))
+    picked_events = EventTable(
+        onset=events.onset[idxs],
+        description=events.description[idxs],
+        duration=events.duration[idxs],
+    )
+    # set the columns of types and channels directly, as in `read_markers`
+    picked_events.type_code = events.type_code[idxs]
+    picked_events.ch_indptr = np.concatenate([[0], np.cumsum(n_picked[idxs])])
+    picked_events.ch_data = events.ch_data[picked]
+    return picked_events
+
+
+def _get_max_description(events):
+    """Get the largest int description of `events` as read by `read_markers`, or 1."""
+    descriptions = events.description
+    if descriptions.dtype.kind not in "iu":
+        is_int = [isinstance(descr, int) for descr in descriptions.tolist()]
+        descriptions = descriptions[np.array(is_int, dtype=bool)].astype(np.int64)
+    return int(descriptions.max(initial=1))
+
+
+def _read_last_marker(vmrk_fname):
+    """Find the number of the last marker of a marker file by reading its end.
+
+    Returns the number of the last marker (0 if there are none), whether the file ends
+    with a newline, and the width of the descriptions of the last ``"Stimulus"`` and
+    ``"Response"`` markers (``None`` if there are none). The end of the file is read in
+    blocks of growing size until such markers or the ``[Marker Infos]`` section are
+    found.
+    """
+    with open(vmrk_fname, "rb") as fin:
+        size = fin.seek(0, os.SEEK_END)
+        tail_bytes = _TAIL_BYTES
+        while True:
+            start = max(0, size - tail_bytes)
+            fin.seek(start)
+            tail = fin.read(size - start)
+            lines = tail.splitlines()
+            if start > 0:  # the first line may be incomplete
+                lines = lines[1:]
+            last_marker, twidths = None, []
+            for line in reversed(lines):
+                if line.startswith(b"Mk") and b"=" in line:
+                    number = line[2 : line.index(b"=")]
+                    if not number.isdigit():
+                        raise ValueError(f"{vmrk_fname} has invalid marker entries")
+                    if last_marker is None:
+                        last_marker = int(number)
+                    twidth = _get_marker_twidth(line)
+                    if twidth is not None:
+                        twidths.append(twidth)
+                elif line.startswith(b"[Marker Infos]"):
+                    twidth = min(twidths) if twidths else None
+                    return last_marker or 0, tail.endswith(b"\n"), twidth
+                elif line.startswith(b"["):
+                    raise ValueError(
+                        f"Markers can only be appended to {vmrk_fname} if the "
+                        "[Marker Infos] section is the last section of the file"
+                    )
+            if twidths:
+                return last_marker, tail.endswith(b"\n"), min(twidths)
+            if start == 0:
+                raise ValueError(f"{vmrk_fname} has no [Marker Infos] section")
+            tail_bytes *= 8
+
+
+def _get_marker_twidth(line):
+    """Get the width of the description of a marker line.
+
+    Returns ``None`` if the marker is not of type ``"Stimulus"`` or ``"Response"``.
+    Descriptions with more digits than the width of the file are not padded, so the
+    width of a file is the smallest width of its descriptions.
+    """
+    fields = line.split(b"=", 1)[1].split(b",")
+    if len(fields) < 2 or fields[0] not in (b"Stimulus", b"Response"):
+        return None
+    description = fields[1]
+    if description[:1] not in (b"S", b"R") or not description[1:].strip().isdigit():
+        return None
+    return len(description) - 1
+
+
+def _read_meas_date(vmrk_fname):
+    """Read the measurement date of a marker file, return it as str or None.
+
+    The measurement date is the date of the first marker, if that is a ``"New
+    Segment"`` marker. Reading stops at the first marker, so only the header of the
+    marker file is read.
+    """
+    if not Path(vmrk_fname).exists():
+        return None
+    with open(vmrk_fname, "rb") as fin:
+        for line in fin:
+            if line.startswith(b"Mk"):
+                fields = line.rstrip(b"\r\n").split(b"=", 1)[-1].split(b",")
+                if fields[0] == b"New Segment" and len(fields) > 5:
+                    return fields[5].decode("ascii", errors="replace") or None
+                return None
+    return None
+
+
+def _write_replacing(writes, like):
+    """Write files via temporary files, replacing the files only if all are written.
+
+    `writes` is a dict mapping the file names to functions that write the content of
+    each file to the file name they are called with. Temporary files are created in
+    the folder of each file, so that replacing the files is atomic. The permissions of
+    the replaced files are kept, and new files get the permissions of the file `like`.
+    """
+    tmp_fnames = dict()
+    try:
+        for fname, write in writes.items():
+            fd, tmp_fname = tempfile.mkstemp(
+                suffix=".tmp", prefix=f".{fname.name}.", dir=fname.parent
+            )
+            os.close(fd)
+            tmp_fnames[fname] = Path(tmp_fname)
+            write(tmp_fnames[fname])
+            shutil.copymode(fname if fname.exists() else like, tmp_fnames[fname])
+        for fname, tmp_fname in tmp_fnames.items():
+            os.replace(tmp_fname, fname)
+    finally:
+        for tmp_fname in tmp_fnames.values():
+            tmp_fname.unlink(missing_ok=True)
+
+
+def _chk_not_input(out_fname, in_fnames):
+    """Check that the output file is none of the input files, which it would destroy."""
+    for in_fname in in_fnames:
+        if in_fname.exists() and out_fname.exists() and out_fname.samefile(in_fname):
+            raise ValueError(f"The output file {out_fname} is an input file")
+
+
+def _copy_range(fsrc, fdst, offset, count):
+    """Copy `count` bytes from `offset` of `fsrc` to the current position of `fdst`.
+
+    `fsrc` and `fdst` are unbuffered files. The bytes are copied in the kernel with
+    :func:`os.copy_file_range` or :func:`os.sendfile` where supported (e.g., not across
+    file systems on older Linux kernels), and otherwise read and written in blocks.
+    """
+    end = offset + count
+    if hasattr(os, "copy_file_range"):
+        try:
+            while offset < end:
+                n_copied = os.copy_file_range(
+                    fsrc.fileno(), fdst.fileno(), end - offset, offset
+                )
+                if n_copied == 0:
+                    break
+                offset += n_copied
+        except OSError:
+            pass
+    # sendfile only copies between files on Linux
+    if offset < end and sys.platform.startswith("linux"):
+        try:
+            while offset < end:
+                n_copied = os.sendfile(
+                    fdst.fileno(), fsrc.fileno(), offset, end - offset
+                )
+                if n_copied == 0:
+                    break
+                offset += n_copied
+        except OSError:
+            pass
+    fsrc.seek(offset)
+    while offset < end:
+        block = fsrc.read(min(_COPY_BYTES, end - offset))
+        if not block:
+            raise ValueError(f"{fsrc.name} ended before the requested data")
+        _write_buffer(fdst, block)
+        offset += len(block)
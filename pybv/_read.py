@@ -0,0 +1,608 @@
+"""BrainVision reader."""
+
+# Authors: pybv developers
+# SPDX-License-Identifier: BSD-3-Clause
+
+import configparser
+import os
+from pathlib import Path
+
+import numpy as np
+
+from pybv.io import (
+    SUPPORTED_EVENT_TYPES,
+    SUPPORTED_FORMATS,
+    SUPPORTED_ORIENTS,
+    SUPPORTED_VOLTAGE_SCALINGS,
+    EventTable,
+)
+
+
+def read_brainvision(vhdr_fname):
+    """Open a BrainVision recording without loading its data.
+
+    The header file (*.vhdr*) is parsed, and the data file (*.eeg*) is memory-mapped.
+    Data are only read from disk (and scaled to Volts) when they are accessed, such that
+    opening even very large recordings is fast and memory is only used for the data
+    that is actually needed.
+
+    Parameters
+    ----------
+    vhdr_fname : str | pathlib.Path
+        The header file (*.vhdr*) of the recording.
+
+    Returns
+    -------
+    raw : BrainVisionRaw
+        The recording.
+
+    See Also
+    --------
+    write_brainvision
+
+    Examples
+    --------
+    >>> from pybv import write_brainvision
+    >>> write_brainvision(
+    ...     data=np.ones((2, 5)),
+    ...     sfreq=1,
+    ...     ch_names=["A1", "A2"],
+    ...     folder_out="./",
+    ...     fname_base="pybv_test_file",
+    ...     unit="V",
+    ... )
+    >>> raw = read_brainvision("pybv_test_file.vhdr")
+    >>> raw.ch_names, raw.data.shape
+    (['A1', 'A2'], (2, 5))
+    >>> raw.data[1, :3]
+    array([1., 1., 1.])
+    >>> # remove the files
+    >>> del raw
+    >>> for ext in [".vhdr", ".vmrk", ".eeg"]:
+    ...     os.remove("pybv_test_file" + ext)
+
+    """
+    return BrainVisionRaw(vhdr_fname)
+
+
+class BrainVisionRaw:
+    """A BrainVision recording, see :func:`pybv.read_brainvision`.
+
+    Parameters
+    ----------
+    vhdr_fname : str | pathlib.Path
+        The header file (*.vhdr*) of the recording.
+
+    Attributes
+    ----------
+    vhdr_fname : pathlib.Path
+        The header file.
+    eeg_fname : pathlib.Path
+        The data file.
+    vmrk_fname : pathlib.Path | None
+        The marker file, if any.
+    sfreq : float
+        The sampling frequency in Hz.
+    ch_names : list of str, len (n_channels)
+        The channel names.
+    ref_ch_names : list of str, len (n_channels)
+        The reference channel names, which are empty if unspecified.
+    resolution : np.ndarray, shape (n_channels,)
+        The resolution of each channel in its unit.
+    units : list of str, len (n_channels)
+        The unit of each channel.
+    fmt : str
+        The binary format of the data, ``"binary_float32"`` or ``"binary_int16"``.
+    orientation : str
+        The data orientation, ``"multiplexed"`` or ``"vectorized"``.
+    n_times : int
+        The number of time points.
+    memmap : np.ndarray, shape (n_times, n_channels)
+        The memory-mapped values in the data file, without scaling. For vectorized
+        data, this is a transposed view of the file.
+    data : array-like, shape (n_channels, n_times)
+        The data in Volts (or in their unit, for non-voltage channels). Indexing it
+        (e.g., ``raw.data[:, 1000:2000]``) reads and scales only the requested data,
+        and returns an array of float64. It can be passed as `data` to
+        :func:`pybv.write_brainvision`.
+    """
+
+    def __init__(self, vhdr_fname):
+        header = _read_vhdr(vhdr_fname)
+        self.vhdr_fname = header["vhdr_fname"]
+        self.eeg_fname = header["eeg_fname"]
+        self.vmrk_fname = header["vmrk_fname"]
+        self.sfreq = header["sfreq"]
+        self.ch_names = header["ch_names"]
+        self.ref_ch_names = header["ref_ch_names"]
+        self.resolution = header["resolution"]
+        self.units = header["units"]
+        self.fmt = header["fmt"]
+        self.orientation = header["orientation"]
+
+        self.memmap = _memmap_eeg(
+            self.eeg_fname, len(self.ch_names), self.fmt, self.orientation
+        )
+        self.n_times = self.memmap.shape[0]
+        self.data = _ScaledData(
+            self.memmap.T, _get_volt_scales(self.resolution, self.units)
+        )
+
+    def __repr__(self):
+        """Return a summary of the recording."""
+        return (
+            f"<BrainVisionRaw | {self.vhdr_fname.name} | {len(self.ch_names)} channels "
+            f"x {self.n_times} time points, {self.sfreq:g} Hz>"
+        )
+
+
+def read_markers(vmrk_fname, ch_names=None):
+    """Read the markers of a BrainVision marker file (*.vmrk*).
+
+    The marker entries are parsed with vectorized operations on the bytes of the file,
+    such that millions of markers can be read per second. Markers of the types
+    ``"Stimulus"``, ``"Response"``, and ``"Comment"`` are returned as
+    :class:`pybv.EventTable`, which can be passed as `events` to
+    :func:`pybv.write_brainvision`. Other markers (e.g., ``"New Segment"``) are
+    skipped.
+
+    Parameters
+    ----------
+    vmrk_fname : str | pathlib.Path
+        The marker file.
+    ch_names : list of str | None
+        The channel names of the recording (e.g., ``BrainVisionRaw.ch_names``), used to
+        convert the channel numbers of markers to channel names. If ``None`` (default),
+        channel numbers are converted to str (e.g., ``"1"`` for the first channel).
+
+    Returns
+    -------
+    events : EventTable
+        The markers, with zero-based onsets. Descriptions of ``"Stimulus"`` and
+        ``"Response"`` markers are converted to int (e.g., ``"S  1"`` to ``1``) where
+        possible, that is, if they are a number with the prefix of their type (``"S"``
+        or ``"R"``). Other descriptions are kept as str. Markers that are related to
+        more than one but less than all channels are stored once per channel, as in the
+        marker file.
+
+    See Also
+    --------
+    read_brainvision
+    """
+    content = Path(vmrk_fname).read_bytes()
+    section = content.find(b"[Marker Infos]")
+    if section < 0:
+        raise ValueError(f"{vmrk_fname} has no [Marker Infos] section")
+    section_end = content.find(b"\n[", section)
+    section_end = len(content) if section_end < 0 else section_end
+    buf = np.frombuffer(content, dtype=np.uint8)[section:section_end]
+
+    # split the entries (Mk<n>=<type>,<description>,<position>,<size>,<channel>) of
+    # all markers at once
+    starts, ends = _get_marker_lines(buf)
+    fields = _split_marker_fields(buf, starts, ends, vmrk_fname)
+
+    # types are compared with the supported types (all of up to 8 bytes, which are
+    # packed into a uint64), markers of other types are skipped
+    type_starts, type_ends = fields[0]
+    packed = _pack_fields(buf, type_starts, type_ends, 8).view(np.uint64).reshape(-1)
+    packed[type_ends - type_starts > 8] = 0
+    type_codes = np.full(len(starts), -1, dtype=np.int8)
+    for code, event_type in enumerate(SUPPORTED_EVENT_TYPES):
+        event_type = np.frombuffer(event_type.encode().ljust(8, b"\0"), np.uint64)
+        type_codes[packed == event_type] = code
+    keep = type_codes >= 0
+    type_codes = type_codes[keep]
+    fields = [
+        (field_starts[keep], field_ends[keep]) for field_starts, field_ends in fields
+    ]
+
+    # only the few unique descriptions need to be decoded
+    unique_descr, descr_inverse = _unique_fields(buf, *fields[1])
+    texts = _decode_fields(unique_descr)
+    ints = np.array([_parse_stim_description(text) for text in texts], dtype=np.int64)
+    # the type that the prefix of each description belongs to ("S" for "Stimulus", "R"
+    # for "Response"), such that descriptions like "R  1" of "Stimulus" markers are
+    # kept as they are, instead of being read as a different event
+    prefix_codes = {
+        event_type[0]: code
+        for code, event_type in enumerate(SUPPORTED_EVENT_TYPES)
+        if event_type != "Comment"
+    }
+    prefixes = np.array([prefix_codes.get(text[:1], -1) for text in texts], np.int8)
+    descr_ints = ints[descr_inverse]
+    is_int = (type_codes == prefixes[descr_inverse]) & (descr_ints >= 0)
+    if is_int.all():
+        descriptions = descr_ints
+    else:
+        descriptions = np.array(texts, dtype=object)[descr_inverse]
+        descriptions[is_int] = descr_ints[is_int].tolist()
+
+    onsets = _get_fields_int(buf, *fields[2], default=-1, fname=vmrk_fname) - 1
+    durations = _get_fields_int(buf, *fields[3], default=1, fname=vmrk_fname)
+    channels = _get_fields_int(buf, *fields[4], default=0, fname=vmrk_fname)
+    if ch_names is None:
+        ch_names = [str(idx + 1) for idx in range(channels.max(initial=0))]
+    if (onsets < 0).any() or (channels > len(ch_names)).any():
+        raise ValueError(f"{vmrk_fname} has markers with invalid positions or channels")
+
+    events = EventTable(onset=onsets, description=descriptions, duration=durations)
+    # set the columns of types and channels directly, without a conversion per event
+    events.type_code = type_codes
+    has_channel = channels > 0
+    events.ch_indptr = np.concatenate([[0], np.cumsum(has_channel)])
+    events.ch_data = np.array(ch_names, dtype=str)[channels[has_channel] - 1]
+    return events
+
+
+def read_window(vhdr_fname, start=0, stop=None, picks=None):
+    """Read a time window of some channels of a BrainVision recording.
+
+    Only the bytes of the data file (*.eeg*) that hold the requested window are read,
+    with a single read into a preallocated buffer (or one read per channel, for
+    vectorized data), such that the time it takes depends on the size of the window
+    and not on the size of the file. Use this function for
+    single windows, and :func:`pybv.read_brainvision` for repeated access to the same
+    recording.
+
+    Parameters
+    ----------
+    vhdr_fname : str | pathlib.Path
+        The header file (*.vhdr*) of the recording.
+    start : int
+        The first time point (zero-based) of the window. Defaults to ``0``.
+    stop : int | None
+        The time point after the last time point of the window. If ``None`` (default),
+        the window ends with the recording.
+    picks : list of str | list of int | None
+        The names or (zero-based) indices of the channels to read. If ``None``
+        (default), all channels are read.
+
+    Returns
+    -------
+    data : np.ndarray, shape (n_picks, stop - start)
+        The data in Volts (or in their unit, for non-voltage channels), in the order of
+        `picks`.
+
+    See Also
+    --------
+    read_brainvision
+    """
+    header = _read_vhdr(vhdr_fname)
+    nchan = len(header["ch_names"])
+    dtype = _get_eeg_dtype(header["fmt"])
+    n_times = _get_n_times(header["eeg_fname"], nchan, dtype)
+    stop = n_times if stop is None else stop
+    for name, value in (("start", start), ("stop", stop)):
+        if isinstance(value, bool) or not isinstance(value, int | np.integer):
+            raise ValueError(
+                f"{name} must be an int (the index of a time point), but got {value!r}"
+            )
+    if not (0 <= start <= stop <= n_times):
+        raise ValueError(
+            f"start ({start}) and stop ({stop}) must be time points with "
+            f"0 <= start <= stop <= {n_times}"
+        )
+    picks = _get_pick_idxs(picks, header["ch_names"])
+    scales = _get_volt_scales(header["resolution"], header["units"])[picks]
+
+    if header["orientation"] == "vectorized":
+        # the time points of each channel are contiguous, so each picked channel is
+        # read as one span
+        values = np.empty((len(picks), stop - start), dtype=dtype)
+        if values.size:
+            with open(header["eeg_fname"], "rb", buffering=0) as fid:
+                for row, pick in zip(values, picks):
+                    _read_span(fid, row, (pick * n_times + start) * dtype.itemsize)
+        return np.multiply(values, scales[:, np.newaxis], dtype=np.float64)
+
+    values = np.empty((stop - start, nchan), dtype=dtype)
+    if values.size and len(picks):
+        # the span begins with the first picked channel of the first time point and
+        # ends with the last picked channel of the last time point
+        first, last = picks.min(), picks.max()
+        span = values.reshape(-1)[first : values.size - (nchan - 1 - last)]
+        with open(header["eeg_fname"], "rb", buffering=0) as fid:
+            _read_span(fid, span, (start * nchan + first) * dtype.itemsize)
+
+    if len(picks) and (np.diff(picks) == 1).all():
+        selection = values[:, picks[0] : picks[-1] + 1]  # strided view, no copy
+    else:
+        selection = values[:, picks]
+    return np.multiply(selection.T, scales[:, np.newaxis], dtype=np.float64)
+
+
+class _ScaledData:
+    """Lazily scaled view of unscaled data of shape (n_channels, n_times).
+
+    Indexing works like for NumPy arrays, and only reads and scales the selection.
+    """
+
+    def __init__(self, values, scales):
+        self._values = values
+        self._scales = scales
+        self.shape = values.shape
+        self.ndim = 2
+        self.dtype = np.dtype(np.float64)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, key):
+        # broadcasting the per-channel scales to the full shape costs no memory, and
+        # indexing them like the data selects the scale of each selected value
+        scales = np.broadcast_to(self._scales[:, np.newaxis], self.shape)[key]
+        return np.multiply(self._values[key], scales, dtype=np.float64)
+
+    def __array__(self, dtype=None, copy=None):
+        data = self[:, :]
+        return data if dtype is None else data.astype(dtype, copy=False)
+
+
+def _read_vhdr(vhdr_fname):
+    """Parse a header file (*.vhdr*), return a dict of its contents."""
+    vhdr_fname = Path(vhdr_fname)
+    raw = vhdr_fname.read_bytes()
+    try:
+        text = raw.decode("utf-8")
+    except UnicodeDecodeError:  # Codepage=ANSI
+        text = raw.decode("latin-1")
+
+    first_line, *lines = text.lstrip("\ufeff").splitlines() or [""]
+    if not first_line.startswith("Brain Vision Data Exchange Header File"):
+        raise ValueError(f"{vhdr_fname} is not a BrainVision header file")
+
+    config = configparser.ConfigParser(
+        delimiters=("=",), comment_prefixes=(";",), interpolation=None, strict=False
+    )
+    config.optionxform = str  # keys are case sensitive
+    # the free text in the [Comment] section can not be parsed
+    comment = []
+    if "[Comment]" in lines:
+        comment = lines[lines.index("[Comment]") + 1 :]
+        lines = lines[: lines.index("[Comment]")]
+    config.read_string("\n".join(lines))
+
+    common = config["Common Infos"]
+    folder = vhdr_fname.parent
+    orientation = common.get("DataOrientation", "MULTIPLEXED").lower()
+    if orientation not in SUPPORTED_ORIENTS:
+        raise ValueError(f"Data orientation {orientation} is not supported")
+
+    bvfmts = {bvfmt: fmt for fmt, (bvfmt, _) in SUPPORTED_FORMATS.items()}
+    bvfmt = config.get("Binary Infos", "BinaryFormat", fallback=None)
+    if common.get("DataFormat", "BINARY") != "BINARY" or bvfmt not in bvfmts:
+        raise ValueError(
+            f"Data format {bvfmt} is not supported. Supported formats are: "
+            f"{', '.join(bvfmts)}"
+        )
+
+    nchan = int(common["NumberOfChannels"])
+    ch_names, ref_ch_names, resolution, units = [], [], np.ones(nchan), []
+    for idx in range(nchan):
+        props = config["Channel Infos"][f"Ch{idx + 1}"].split(",")
+        props += [""] * (4 - len(props))
+        ch_names.append(props[0].replace(r"\1", ","))
+        ref_ch_names.append(props[1].replace(r"\1", ","))
+        if props[2]:
+            resolution[idx] = float(props[2])
+        units.append(props[3] or "µV")
+
+    vmrk_fname = common.get("MarkerFile", None)
+    return dict(
+        vhdr_fname=vhdr_fname,
+        eeg_fname=folder / common["DataFile"],
+        vmrk_fname=None if vmrk_fname is None else folder / vmrk_fname,
+        sfreq=1e6 / float(common["SamplingInterval"]),
+        ch_names=ch_names,
+        ref_ch_names=ref_ch_names,
+        resolution=resolution,
+        units=units,
+        fmt=bvfmts[bvfmt],
+        orientation=orientation,
+        quantization=_parse_quantization(comment, nchan),
+    )
+
+
+def _parse_quantization(comment, nchan):
+    """Parse the maximum quantization error of each channel from the comment lines.
+
+    These are written by `pybv.write_brainvision` if the format or resolution is chosen
+    automatically. Returns ``None`` if the comment has no (valid) quantization errors.
+    """
+    for idx, line in enumerate(comment):
+        if line.startswith("Maximum quantization error per channel"):
+            entries = comment[idx + 1 : idx + 1 + nchan]
+            break
+    else:
+        return None
+    try:
+        errors = [float(value) for _, value in (line.split("=") for line in entries)]
+    except ValueError:
+        return None
+    return np.array(errors) if len(errors) == nchan else None
+
+
+def _get_eeg_dtype(fmt):
+    """Get the little-endian dtype of the data file for `fmt`."""
+    return np.dtype(SUPPORTED_FORMATS[fmt][1]).newbyteorder("<")
+
+
+def _memmap_eeg(eeg_fname, nchan, fmt, orientation="multiplexed"):
+    """Memory-map a data file as array of shape (n_times, n_channels)."""
+    dtype = _get_eeg_dtype(fmt)
+    n_times = _get_n_times(eeg_fname, nchan, dtype)
+    if n_times == 0:  # empty files can not be memory-mapped
+        return np.empty((0, nchan), dtype=dtype)
+    if orientation == "vectorized":
+        return np.memmap(eeg_fname, dtype=dtype, mode="r", shape=(nchan, n_times)).T
+    return np.memmap(eeg_fname, dtype=dtype, mode="r", shape=(n_times, nchan))
+
+
+def _get_n_times(eeg_fname, nchan, dtype):
+    """Get the number of time points in a data file from its size."""
+    n_bytes = os.path.getsize(eeg_fname)
+    frame_bytes = nchan * dtype.itemsize
+    if n_bytes % frame_bytes != 0:
+        raise ValueError(
+            f"The size of the data file ({n_bytes} bytes) is not a multiple of the "
+            f"size of one time point of all channels ({frame_bytes} bytes)"
+        )
+    return n_bytes // frame_bytes
+
+
+def _get_pick_idxs(picks, ch_names):
+    """Get the channel indices of `picks` (channel names or indices) as array."""
+    if picks is None:
+        return np.arange(len(ch_names))
+    ch_index = {ch_name: idx for idx, ch_name in enumerate(ch_names)}
+    idxs = []
+    for pick in picks:
+        if isinstance(pick, str):
+            if pick not in ch_index:
+                raise ValueError(f"Channel {pick} is not in the recording")
+            pick = ch_index[pick]
+        elif not isinstance(pick, int | np.integer) or not (
+            -len(ch_names) <= pick < len(ch_names)
+        ):
+            raise ValueError(
+                f"picks must be channel names or indices, got {pick!r} for "
+                f"{len(ch_names)} channels"
+            )
+        idxs.append(pick % len(ch_names))
+    return np.array(idxs, dtype=np.intp)
+
+
+def _read_span(fid, buffer, offset):
+    """Read ``buffer.nbytes`` bytes starting at `offset` of `fid` into `buffer`."""
+    view = memoryview(buffer.view(np.uint8))
+    fid.seek(offset)
+    n_read = 0
+    while n_read < len(view):  # reads may return fewer bytes than requested
+        n = fid.readinto(view[n_read:])
+        if not n:
+            raise ValueError(f"{fid.name} ended before the requested data")
+        n_read += n
+
+
+def _get_volt_scales(resolution, units):
+    """Get the per-channel factors scaling values in the data file to Volts."""
+    scales = resolution.copy()
+    for idx, unit in enumerate(units):
+        unit = "µV" if unit == "μV" else unit  # Greek mu μ (U+03BC)
+        # non-voltage units are not scaled, as when writing
+        scales[idx] /= SUPPORTED_VOLTAGE_SCALINGS.get(unit, 1.0)
+    return scales
+
+
+def _get_marker_lines(buf):
+    """Get the start and end offsets of all lines with marker entries in `buf`."""
+    newlines = np.flatnonzero(buf == ord("\n"))
+    starts = newlines + 1
+    ends = np.append(newlines[1:], len(buf))
+    is_marker = ends - starts >= 3
+    is_marker[is_marker] = (buf[starts[is_marker]] == ord("M")) & (
+        buf[starts[is_marker] + 1] == ord("k")
+    )
+    starts, ends = starts[is_marker], ends[is_marker]
+    # ignore the carriage returns of Windows line endings
+    ends -= buf[ends - 1] == ord("\r")
+    return starts, ends
+
+
+def _split_marker_fields(buf, starts, ends, fname):
+    """Get the start and end offsets of the first five fields of marker entries.
+
+    Fields follow the first ``"="`` of each entry and are delimited by commas. Omitted
+    fields are empty.
+    """
+    equals = np.flatnonzero(buf == ord("="))
+    commas = np.flatnonzero(buf == ord(","))
+    first_equal = np.searchsorted(equals, starts)
+    if (first_equal == len(equals)).any() or (
+        equals[np.minimum(first_equal, len(equals) - 1)] >= ends
+    ).any():
+        raise ValueError(f"{fname} has invalid marker entries")
+
+    delimiters = [equals[first_equal]]
+    first_comma = np.searchsorted(commas, delimiters[0])
+    n_commas = np.searchsorted(commas, ends) - first_comma
+    for k in range(5):
+        comma = (
+            commas[np.minimum(first_comma + k, len(commas) - 1)] if len(commas) else 0
+        )
+        delimiters.append(np.where(k < n_commas, comma, ends))
+    return [(np.minimum(delimiters[k] + 1, ends), delimiters[k + 1]) for k in range(5)]
+
+
+def _pack_fields(buf, starts, ends, width):
+    """Get the fields between the offsets `starts` and `ends` as 2D array of bytes.
+
+    Fields are truncated or padded with zeros to `width` bytes.
+    """
+    offsets = np.arange(width)
+    chars = buf[np.minimum(starts[:, np.newaxis] + offsets, len(buf) - 1)]
+    chars[offsets >= (ends - starts)[:, np.newaxis]] = 0
+    return chars
+
+
+def _unique_fields(buf, starts, ends):
+    """Get the unique fields between the offsets `starts` and `ends`.
+
+    Returns the unique fields as list of bytes, and the indices of the unique fields
+    that reconstruct all fields.
+    """
+    lengths = ends - starts
+    width = lengths.max(initial=0)
+    if width > 256:  # a few very long fields should not inflate all others
+        fields = [buf[start:end].tobytes() for start, end in zip(starts, ends)]
+        unique, inverse = np.unique(np.array(fields, dtype=object), return_inverse=True)
+        return unique.tolist(), inverse.reshape(-1)
+
+    # fields of up to 8 bytes are packed into a uint64, which is faster to sort
+    width = max(8, width)
+    chars = _pack_fields(buf, starts, ends, width)
+    packed = chars.view(np.uint64 if width == 8 else f"S{width}").reshape(-1)
+    unique, inverse = np.unique(packed, return_inverse=True)
+    return unique.view(f"S{width}").tolist(), inverse.reshape(-1)
+
+
+def _get_fields_int(buf, starts, ends, *, default, fname):
+    """Parse the fields between the offsets `starts` and `ends` as non-negative ints.
+
+    Empty fields are set to `default`.
+    """
+    lengths = ends - starts
+    if lengths.max(initial=0) > 18:
+        raise ValueError(f"{fname} has markers with invalid numbers")
+
+    # accumulate the digits of all fields at once, one digit position at a time
+    values = np.zeros(len(starts), dtype=np.int64)
+    for offset in range(lengths.max(initial=0)):
+        in_field = offset < lengths
+        digits = buf[np.minimum(starts + offset, len(buf) - 1)] - ord("0")
+        if (digits[in_field] > 9).any():  # uint8, so other characters are > 9
+            raise ValueError(f"{fname} has markers with invalid numbers")
+        values = np.where(in_field, values * 10 + digits, values)
+    values[lengths == 0] = default
+    return values
+
+
+def _decode_fields(fields):
+    """Decode unique fields of marker entries to str, unescaping commas."""
+    texts = []
+    for field in fields:
+        try:
+            text = field.decode("utf-8")
+        except UnicodeDecodeError:  # Codepage=ANSI
+            text = field.decode("latin-1")
+        texts.append(text.replace(r"\1", ","))
+    return texts
+
+
+def _parse_stim_description(text):
+    """Parse descriptions like ``"S  1"`` to int, return -1 if not possible."""
+    number = text[1:].lstrip(" ")
+    if text[:1] in ("S", "R") and number.isascii() and number.isdigit():
+        return int(number)
+    return -1
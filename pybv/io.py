@@ -3,11 +3,16 @@
 # Authors: pybv developers
 # SPDX-License-Identifier: BSD-3-Clause
 
-import copy
 import datetime
+import io
+import itertools
 import os
 import shutil
-import sys
+import threading
+import time
+import traceback
+from collections.abc import Iterator
+from concurrent.futures import CancelledError, Executor, ThreadPoolExecutor
 from pathlib import Path
 from warnings import warn
 
@@ -21,10 +26,27 @@ SUPPORTED_FORMATS = {
     "binary_int16": ("INT_16", np.int16),
 }
 
-SUPPORTED_ORIENTS = {"multiplexed"}
+SUPPORTED_ORIENTS = {"multiplexed", "vectorized"}
 
 SUPPORTED_VOLTAGE_SCALINGS = {"V": 1e0, "mV": 1e3, "µV": 1e6, "uV": 1e6, "nV": 1e9}
 
+SUPPORTED_EVENT_TYPES = ["Stimulus", "Response", "Comment"]
+
+# upper bound (in bytes) for the temporary buffers used when writing the data file in
+# blocks of samples, if the block size is not specified by the user
+_CHUNK_BYTES = 16 * 1024**2
+
+# size (in bytes) of the float64 blocks that are validated, scaled, range checked, and
+# converted in a single sweep while they reside in the CPU cache
+_BLOCK_BYTES = 512 * 1024
+
+# number of events that are validated and written to the marker file at a time
+_MARKER_BATCH = 2**16
+
+# thread pool for writing in the background, see `submit_write`
+_executor = None
+_executor_lock = threading.Lock()
+
 
 def write_brainvision(
     *,
@@ -39,16 +61,28 @@ def write_brainvision(
     resolution=0.1,
     unit="µV",
     fmt="binary_float32",
+    max_error=None,
     meas_date=None,
+    chunk_samples=None,
+    orientation="multiplexed",
+    instrument=False,
+    progress=None,
+    cancel=None,
 ):
     """Write raw data to the BrainVision format [1]_.
 
     Parameters
     ----------
-    data : np.ndarray, shape (n_channels, n_times)
+    data : np.ndarray | array-like, shape (n_channels, n_times)
         The raw data to export. Voltage data is assumed to be in **volts** and will be
         scaled as specified by `unit`. Non-voltage channels (as specified by `unit`) are
         never scaled (e.g., `"°C"`).
+
+        Besides NumPy arrays (including :class:`numpy.memmap`), any object that
+        exposes a ``shape`` attribute and supports slicing (e.g., HDF5 datasets) is
+        accepted, as well as objects supporting the buffer protocol or DLPack. Such
+        data is read in blocks of `chunk_samples` time points, so that data stored on
+        disk is never loaded into memory as a whole.
     sfreq : int | float
         The sampling frequency of the data in Hz.
     ch_names : list of {str | int}, len (n_channels)
@@ -71,7 +105,7 @@ def write_brainvision(
         exist.
     overwrite : bool
         Whether or not to overwrite existing files. Defaults to ``False``.
-    events : np.ndarray, shape (n_events, {2, 3}) | list of dict, len (n_events) | None
+    events : np.ndarray | EventTable | list of dict | iterator | None
         Events to write in the marker file (*.vmrk*). Defaults to ``None`` (not writing
         any events).
 
@@ -110,6 +144,17 @@ def write_brainvision(
 
         Note that ``"onset"`` and ``"description"`` MUST be specified in each dict.
 
+        If an :class:`pybv.EventTable` is passed, the same entries are given as columns,
+        which is the most efficient way to write many events. Use
+        :meth:`pybv.EventTable.from_columns` to write events from a
+        ``pandas.DataFrame`` or a structured array, which can also be passed directly.
+
+        If an iterator of dict (e.g., a generator) is passed, events are validated and
+        written in batches while iterating, such that the full list of events never
+        needs to be held in memory. In that case, descriptions of ``"Stimulus"`` and
+        ``"Response"`` events are formatted with a width of at least three digits per
+        event (e.g., ``"S  1"``), instead of a width shared by all events.
+
         .. note:: When specifying more than one but less than "all" channels that are
                   impacted by an event, ``pybv`` will write the same event for as many
                   times as channels are specified (see :gh:`77` for a discussion). This
@@ -117,7 +162,7 @@ def write_brainvision(
                   compatibility with other BrainVision readers, we do not recommend
                   using this feature yet.
 
-    resolution : float | np.ndarray, shape (n_channels,)
+    resolution : float | np.ndarray, shape (n_channels,) | "auto"
         The resolution in `unit` in which you'd like the data to be stored. If float,
         the same resolution is applied to all channels. If array with `n_channels`
         elements, each channel is scaled with its own corresponding resolution from the
@@ -129,6 +174,10 @@ def write_brainvision(
         supports floating points up to 1e-6 resolution, and writing data in µV with 0.1
         resolution will thus guarantee accurate writing for all values ≥ 1e-7 µV
         (``1e-6 * 0.1``).
+
+        If ``"auto"``, the finest resolution (rounded up to four significant digits)
+        with which the data of each channel fits into ``"binary_int16"`` is chosen,
+        based on the per-channel minimum and maximum of `data`.
     unit : str | list of str
         The unit of the exported data. This can be one of ``"V"``, ``"mV"``, ``"µV"``
         (or equivalently ``"uV"``), or ``"nV"``, which will scale the data accordingly.
@@ -137,13 +186,65 @@ def write_brainvision(
         available in ``"°C"``, which ``pybv`` will not scale.
     fmt : str
         Binary format the data should be written as. Valid choices are
-        ``"binary_float32"`` (default) and ``"binary_int16"``.
+        ``"binary_float32"`` (default), ``"binary_int16"``, and ``"auto"``. If
+        ``"auto"``, the data is written as ``"binary_int16"`` (half the size of
+        ``"binary_float32"``) if it fits into that format with `resolution` and the
+        quantization error does not exceed `max_error`, and as ``"binary_float32"``
+        otherwise. If `fmt` or `resolution` is ``"auto"``, the maximum quantization
+        error of each channel is written to the ``[Comment]`` section of the *.vhdr*
+        file.
+    max_error : float | np.ndarray, shape (n_channels,) | None
+        The largest acceptable quantization error in `unit` if ``fmt="auto"``, for all
+        channels or per channel. Values written as ``"binary_int16"`` are truncated
+        to multiples of the resolution, such that the error is less than
+        `resolution`. If ``None`` (default), any quantization error is acceptable.
     meas_date : datetime.datetime | str | None
         The measurement date specified as a :class:`datetime.datetime` object.
         Alternatively, can be a string in the format "YYYYMMDDhhmmssuuuuuu" ("u" stands
         for microseconds). Note that setting a measurement date implies that one
         additional event is created in the *.vmrk* file. To prevent this, set this
         parameter to ``None`` (default).
+    chunk_samples : int | None
+        The number of time points that are scaled, checked, converted to `fmt`, and
+        written to the *.eeg* file at a time. The temporary memory needed for writing
+        is bounded by the size of such a block, irrespective of the length of `data`.
+        If ``None`` (default), the block size is chosen such that the temporary memory
+        does not exceed about 16 MB. With ``orientation="vectorized"``, blocks hold
+        the same number of values, but consist of whole channels where possible.
+    orientation : str
+        The data orientation of the *.eeg* file. Valid choices are ``"multiplexed"``
+        (default), where the values of all channels are stored time point after time
+        point, and ``"vectorized"``, where all time points are stored channel after
+        channel. Writing C-contiguous `data` as ``"vectorized"`` requires no
+        transposition, and reading single channels of such files is faster.
+    instrument : bool | callable
+        If ``True``, the time spent in each stage of writing is measured, and a
+        :class:`pybv.WriteReport` is returned. If a callable, it is additionally called
+        with the report when writing is done (e.g., to export the report as metrics).
+        Defaults to ``False``, which does not measure anything.
+    progress : callable | None
+        A function that is called as
+        ``progress(stage, done, total, n_bytes, total_bytes)`` after each block of data
+        and each batch of markers that was written. For ``stage="eeg"``, `done` and
+        `total` are numbers of time points (for ``orientation="vectorized"``, where
+        channels are written one after the other, `done` is the number of values
+        written divided by the number of channels), and `total_bytes` is the size of
+        the data file. For ``stage="vmrk"``, `done` and `total` are numbers of marker
+        entries (where `total` is ``None`` if `events` is an iterator), and
+        `total_bytes` is ``None``, as the size of the marker file is not known in
+        advance. `n_bytes` is the number of bytes written to the file so far. Defaults
+        to ``None``.
+    cancel : threading.Event | None
+        An event (or any object with an ``is_set()`` method) that is checked between
+        blocks of data and batches of markers. If it is set, writing stops, all files
+        written so far are removed, and :class:`concurrent.futures.CancelledError` is
+        raised. Defaults to ``None``.
+
+    Returns
+    -------
+    report : WriteReport | None
+        The report of the stage times, bytes written, and event counts, if `instrument`
+        is not ``False``.
 
     Notes
     -----
@@ -184,38 +285,1295 @@ def write_brainvision(
     ...     os.remove("pybv_test_file" + ext)
 
     """
+    timer = _StageTimer(enabled=bool(instrument))
+    reporter = _WriteProgress(progress, cancel)
+
     # input checks
     folder_out = Path(folder_out)
+    _chk_overwrite(overwrite)
+    params = _chk_write_params(
+        data=data,
+        sfreq=sfreq,
+        ch_names=ch_names,
+        ref_ch_names=ref_ch_names,
+        events=events,
+        resolution=resolution,
+        unit=unit,
+        fmt=fmt,
+        max_error=max_error,
+        meas_date=meas_date,
+        chunk_samples=chunk_samples,
+        orientation=orientation,
+        timer=timer,
+        reporter=reporter,
+    )
+
+    # create output file names/paths, checking if they already exist
+    folder_out_created, fnames = _make_out_fnames(folder_out, fname_base, overwrite)
+    eeg_fname, vmrk_fname, vhdr_fname = fnames
+    timer.lap("check_inputs")
+
+    # write output files, but delete everything if we come across an error
+    try:
+        with (
+            open(eeg_fname, "wb") as eeg,
+            open(vmrk_fname, "w", encoding="utf-8") as vmrk,
+            open(vhdr_fname, "w", encoding="utf-8") as vhdr,
+        ):
+            temp_bytes, n_markers = _write_parts(
+                eeg,
+                vmrk,
+                vhdr,
+                fname_base=fname_base,
+                timer=timer,
+                reporter=reporter,
+                **params,
+            )
+    except (ValueError, OSError, CancelledError):
+        _remove_out_files(folder_out, folder_out_created, fnames)
+        raise
+
+    if not timer.enabled:
+        return None
+    events = params["events"]
+    report = WriteReport(
+        stage_times=timer.times,
+        bytes_written={
+            ext: os.path.getsize(fname)
+            for ext, fname in zip(("eeg", "vmrk", "vhdr"), fnames)
+        },
+        temp_bytes=temp_bytes,
+        n_events=len(events) if isinstance(events, _MarkerColumns) else timer.n_events,
+        n_markers=n_markers,
+        fmt=params["fmt"],
+        resolution=np.broadcast_to(
+            params["resolution"], (len(params["ch_names"]),)
+        ).copy(),
+        max_errors=params["quantization"],
+    )
+    if callable(instrument):
+        instrument(report)
+    return report
+
+
+def write_brainvision_streams(
+    *,
+    data,
+    sfreq,
+    ch_names,
+    ref_ch_names=None,
+    fname_base,
+    streams=None,
+    events=None,
+    resolution=0.1,
+    unit="µV",
+    fmt="binary_float32",
+    max_error=None,
+    meas_date=None,
+    chunk_samples=None,
+    orientation="multiplexed",
+    progress=None,
+    cancel=None,
+):
+    """Write raw data to the BrainVision format in streams or in-memory buffers.
+
+    Like :func:`pybv.write_brainvision`, but instead of creating files, the three parts
+    of the recording are written to writable binary streams (e.g., sockets, pipes, or
+    uploads), and no temporary files are created. The *.eeg* data are written to their
+    stream in blocks of `chunk_samples` time points.
+
+    Parameters
+    ----------
+    data : np.ndarray | array-like, shape (n_channels, n_times)
+        The raw data to export. See :func:`pybv.write_brainvision` for details.
+    sfreq : int | float
+        The sampling frequency of the data in Hz.
+    ch_names : list of {str | int}, len (n_channels)
+        The names of the channels. Integer channel names are converted to string.
+    ref_ch_names : str | list of str, len (n_channels) | None
+        The name of the channel used as a reference during the recording. See
+        :func:`pybv.write_brainvision` for details.
+    fname_base : str
+        The base name of the files the streams will be stored as. The *.vhdr* and
+        *.vmrk* parts refer to the other parts by their file names, so the parts must
+        be stored as ``fname_base + ".vhdr"``, ``fname_base + ".vmrk"``, and
+        ``fname_base + ".eeg"`` to be read as a BrainVision recording.
+    streams : dict | None
+        The writable binary streams to write the parts to, with the keys ``"vhdr"``,
+        ``"vmrk"``, and ``"eeg"``. Parts without a stream (or all parts, if ``None``,
+        the default) are written to new :class:`io.BytesIO` buffers. Streams are not
+        closed, and need not be seekable.
+    events : np.ndarray | EventTable | list of dict | iterator | None
+        Events to write in the marker file. See :func:`pybv.write_brainvision` for
+        details.
+    resolution : float | np.ndarray, shape (n_channels,) | "auto"
+        The resolution in `unit` in which you'd like the data to be stored. See
+        :func:`pybv.write_brainvision` for details.
+    unit : str | list of str
+        The unit of the exported data. See :func:`pybv.write_brainvision` for details.
+    fmt : str
+        Binary format the data should be written as. See
+        :func:`pybv.write_brainvision` for details.
+    max_error : float | np.ndarray, shape (n_channels,) | None
+        The largest acceptable quantization error in `unit` if ``fmt="auto"``. See
+        :func:`pybv.write_brainvision` for details.
+    meas_date : datetime.datetime | str | None
+        The measurement date. See :func:`pybv.write_brainvision` for details.
+    chunk_samples : int | None
+        The number of time points written to the *.eeg* stream at a time. See
+        :func:`pybv.write_brainvision` for details.
+    orientation : str
+        The data orientation of the *.eeg* part. See :func:`pybv.write_brainvision`
+        for details.
+    progress : callable | None
+        A function that is called with the progress of writing. See
+        :func:`pybv.write_brainvision` for details. `n_bytes` is the number of bytes
+        written to the stream so far.
+    cancel : threading.Event | None
+        An event that stops writing if it is set. See
+        :func:`pybv.write_brainvision` for details.
+
+    Returns
+    -------
+    streams : dict
+        The streams the parts were written to, with the keys ``"vhdr"``, ``"vmrk"``,
+        and ``"eeg"``. New :class:`io.BytesIO` buffers are positioned at their start,
+        such that they can be read directly.
+
+    Notes
+    -----
+    All inputs are validated before anything is written. If writing fails while
+    checking the data (e.g., if the data can not be represented in `fmt`) or is
+    cancelled, the streams hold incomplete parts.
+
+    Examples
+    --------
+    >>> parts = write_brainvision_streams(
+    ...     data=np.zeros((2, 5)),
+    ...     sfreq=1,
+    ...     ch_names=["A1", "A2"],
+    ...     fname_base="pybv_test_file",
+    ... )
+    >>> len(parts["eeg"].getvalue())  # 2 channels x 5 time points x 4 bytes
+    40
+    """
+    reporter = _WriteProgress(progress, cancel)
+    if streams is None:
+        streams = dict()
+    if not isinstance(streams, dict) or not set(streams) <= {"vhdr", "vmrk", "eeg"}:
+        raise ValueError(
+            'streams must be a dict with the keys "vhdr", "vmrk", and "eeg", or None'
+        )
+    params = _chk_write_params(
+        data=data,
+        sfreq=sfreq,
+        ch_names=ch_names,
+        ref_ch_names=ref_ch_names,
+        events=events,
+        resolution=resolution,
+        unit=unit,
+        fmt=fmt,
+        max_error=max_error,
+        meas_date=meas_date,
+        chunk_samples=chunk_samples,
+        orientation=orientation,
+        reporter=reporter,
+    )
+
+    buffers = {
+        part: io.BytesIO() for part in ("vhdr", "vmrk", "eeg") if part not in streams
+    }
+    streams = streams | buffers
+    # the text of the header and marker parts is encoded like files opened for writing
+    vmrk = io.TextIOWrapper(streams["vmrk"], encoding="utf-8", write_through=True)
+    vhdr = io.TextIOWrapper(streams["vhdr"], encoding="utf-8", write_through=True)
+    try:
+        _write_parts(
+            streams["eeg"],
+            vmrk,
+            vhdr,
+            fname_base=fname_base,
+            reporter=reporter,
+            **params,
+        )
+    finally:
+        # detach the wrappers, which would otherwise close the streams
+        for wrapper in (vmrk, vhdr):
+            wrapper.flush()
+            wrapper.detach()
+    for buffer in buffers.values():
+        buffer.seek(0)
+    return streams
+
+
+def submit_write(**kwargs):
+    """Write raw data to the BrainVision format in a background thread.
+
+    The conversion of the data and the disk I/O mostly release the GIL, so that they
+    can overlap with computations in the calling thread. Writes are executed in a
+    thread pool that is managed by ``pybv``.
+
+    Parameters
+    ----------
+    **kwargs
+        Keyword arguments passed to :func:`pybv.write_brainvision`.
+
+    Returns
+    -------
+    future : concurrent.futures.Future
+        The future representing the write. Errors are raised when calling
+        :meth:`~concurrent.futures.Future.result`, after incomplete output files have
+        been removed (as in :func:`pybv.write_brainvision`).
+
+    See Also
+    --------
+    write_brainvision_async
+    """
+    return _get_executor().submit(write_brainvision, **kwargs)
+
+
+async def write_brainvision_async(**kwargs):
+    """Write raw data to the BrainVision format without blocking the event loop.
+
+    The write is executed in the thread pool used by :func:`pybv.submit_write`. If the
+    task awaiting the write is cancelled, the write is cancelled like with the `cancel`
+    parameter of :func:`pybv.write_brainvision`, and the cancellation is propagated
+    after the incomplete output files have been removed.
+
+    Parameters
+    ----------
+    **kwargs
+        Keyword arguments passed to :func:`pybv.write_brainvision`.
+
+    See Also
+    --------
+    submit_write
+
+    Examples
+    --------
+    >>> import asyncio
+    >>> asyncio.run(
+    ...     write_brainvision_async(
+    ...         data=np.random.random((3, 5)),
+    ...         sfreq=1,
+    ...         ch_names=["A1", "A2", "A3"],
+    ...         folder_out="./",
+    ...         fname_base="pybv_test_file",
+    ...     )
+    ... )
+    >>> # remove the files
+    >>> for ext in [".vhdr", ".vmrk", ".eeg"]:
+    ...     os.remove("pybv_test_file" + ext)
+
+    """
+    import asyncio  # only imported when needed, as importing it takes a while
+
+    cancel = _CancelEvent(kwargs.get("cancel"))
+    future = asyncio.wrap_future(submit_write(**kwargs | dict(cancel=cancel)))
+    try:
+        # the future is shielded, so that it is not cancelled with the awaiting task
+        # and the write can stop and remove its files
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        cancel.set()
+        await asyncio.wait([future])
+        if not future.cancelled():
+            future.exception()  # retrieved, the cancellation is raised instead
+        raise
+
+
+def write_brainvision_batch(jobs, *, executor="thread", max_workers=None):
+    """Write many datasets to the BrainVision format in parallel.
+
+    Each job is executed with :func:`pybv.write_brainvision` in a thread or process
+    pool. Errors do not stop the other jobs, but are reported per job after incomplete
+    output files of the failed job have been removed (as in
+    :func:`pybv.write_brainvision`).
+
+    Parameters
+    ----------
+    jobs : iterable of dict
+        The keyword arguments for :func:`pybv.write_brainvision`, one dict per job. To
+        avoid copying (or pickling, when using processes) large arrays, the ``"data"``
+        of each job may also be passed by reference, as:
+
+            - a path (str or pathlib.Path) to a ``.npy`` file, which is
+              memory-mapped when writing the job.
+            - a :class:`multiprocessing.shared_memory.SharedMemory` block, in which
+              case the job must also contain the keys ``"data_shape"`` (a tuple of
+              ``(n_channels, n_times)``) and ``"data_dtype"`` (defaults to
+              ``"float64"``) describing the array in the block.
+
+    executor : "thread" | "process" | concurrent.futures.Executor
+        Whether to run the jobs in a :class:`~concurrent.futures.ThreadPoolExecutor`
+        (default) or a :class:`~concurrent.futures.ProcessPoolExecutor`, which are
+        shut down when all jobs are done. Can also be an existing executor, which is
+        not shut down.
+    max_workers : int | None
+        The number of workers of the thread or process pool. If ``None`` (default),
+        the default of the pool is used. Ignored if `executor` is an existing executor.
+
+    Returns
+    -------
+    results : list of dict, len (n_jobs)
+        The results in the order of `jobs`, each a dict with the keys:
+
+            - ``"vhdr_fname"`` : pathlib.Path
+                The header file of the job.
+            - ``"error"`` : Exception | None
+                The error raised by the job, or ``None`` if it succeeded.
+            - ``"time"`` : float
+                The time in seconds it took to run the job (excluding time spent
+                waiting for a worker).
+
+    See Also
+    --------
+    write_brainvision
+    submit_write
+
+    Examples
+    --------
+    >>> jobs = [
+    ...     dict(
+    ...         data=np.random.random((3, 5)),
+    ...         sfreq=1,
+    ...         ch_names=["A1", "A2", "A3"],
+    ...         folder_out="./",
+    ...         fname_base=f"pybv_test_file_{i}",
+    ...     )
+    ...     for i in range(2)
+    ... ]
+    >>> results = write_brainvision_batch(jobs)
+    >>> [result["error"] for result in results]
+    [None, None]
+    >>> # remove the files
+    >>> for i in range(2):
+    ...     for ext in [".vhdr", ".vmrk", ".eeg"]:
+    ...         os.remove(f"pybv_test_file_{i}" + ext)
+
+    """
+    jobs = list(jobs)
+    for job in jobs:
+        if not isinstance(job, dict):
+            raise ValueError("jobs must be an iterable of dict")
+
+    if isinstance(executor, Executor):
+        pool = executor
+    elif executor == "thread":
+        pool = ThreadPoolExecutor(max_workers, thread_name_prefix="pybv")
+    elif executor == "process":
+        # multiprocessing is only imported when needed, as importing it takes a while
+        from concurrent.futures import ProcessPoolExecutor
+
+        pool = ProcessPoolExecutor(max_workers)
+    else:
+        raise ValueError(
+            "executor must be 'thread', 'process', or a concurrent.futures.Executor, "
+            f"but got: {executor}"
+        )
+
+    try:
+        futures = [pool.submit(_run_batch_job, job) for job in jobs]
+        results = []
+        for job, future in zip(jobs, futures):
+            try:
+                result = future.result()
+            except Exception as error:  # e.g., the process pool broke
+                result = dict(error=error, time=np.nan)
+            vhdr_fname = Path(job.get("folder_out", ".")) / (
+                f"{job.get('fname_base', '')}.vhdr"
+            )
+            results.append(dict(vhdr_fname=vhdr_fname, **result))
+    finally:
+        if pool is not executor:
+            pool.shutdown()
+    return results
 
+
+def _get_executor():
+    """Get the thread pool for background writes, creating it if necessary."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(thread_name_prefix="pybv")
+    return _executor
+
+
+def _run_batch_job(job):
+    """Run a job of :func:`pybv.write_brainvision_batch` and time it.
+
+    Returns a dict with the error raised by the job (or ``None``) and the time it took.
+    """
+    start = time.perf_counter()
+    try:
+        kwargs = dict(job)
+        kwargs["data"] = _load_batch_data(
+            kwargs["data"],
+            kwargs.pop("data_shape", None),
+            kwargs.pop("data_dtype", "float64"),
+        )
+        write_brainvision(**kwargs)
+        error = None
+    except Exception as exc:
+        # keep the traceback, but do not keep the data of the job alive through it
+        traceback.clear_frames(exc.__traceback__)
+        error = exc
+    finally:
+        kwargs = None
+    return dict(error=error, time=time.perf_counter() - start)
+
+
+def _load_batch_data(data, shape, dtype):
+    """Get the data of a job of :func:`pybv.write_brainvision_batch` as an array."""
+    from multiprocessing import shared_memory
+
+    if isinstance(data, str | Path):
+        return np.load(data, mmap_mode="r", allow_pickle=False)
+    if isinstance(data, shared_memory.SharedMemory):
+        if shape is None:
+            raise ValueError("When data is SharedMemory, data_shape must be specified")
+        return np.ndarray(shape, dtype=dtype, buffer=data.buf)
+    return data
+
+
+class BrainVisionWriter:
+    """Write data to the BrainVision format incrementally, e.g., during acquisition.
+
+    The channel layout, units, and resolution are validated once upon creation of the
+    writer. Afterwards, chunks of data can be written with :meth:`append` and events
+    can be written with :meth:`add_marker`. The header file (*.vhdr*) is written
+    immediately, the data file (*.eeg*) grows with each call to :meth:`append`, and
+    markers are written to the marker file (*.vmrk*) with each :meth:`flush`. Files are
+    flushed to disk at least every `flush_interval` seconds, so that after a crash,
+    at most the data and markers of one flush interval are lost, and the files on disk
+    remain a valid BrainVision recording.
+
+    The writer is best used as a context manager, which closes it on exit.
+
+    Parameters
+    ----------
+    fname_base : str
+        The base name for the output files. Three files will be created (*.vhdr*,
+        *.vmrk*, *.eeg*), and all will share this base name.
+    folder_out : str | pathlib.Path
+        The folder where output files will be saved. Will be created if it does not
+        exist.
+    sfreq : int | float
+        The sampling frequency of the data in Hz.
+    ch_names : list of {str | int}, len (n_channels)
+        The names of the channels. Integer channel names are converted to string.
+    ref_ch_names : str | list of str, len (n_channels) | None
+        The name of the channel used as a reference during the recording. See
+        :func:`pybv.write_brainvision` for details.
+    overwrite : bool
+        Whether or not to overwrite existing files. Defaults to ``False``.
+    resolution : float | np.ndarray, shape (n_channels,)
+        The resolution in `unit` in which you'd like the data to be stored. See
+        :func:`pybv.write_brainvision` for details.
+    unit : str | list of str
+        The unit of the exported data. See :func:`pybv.write_brainvision` for details.
+    fmt : str
+        Binary format the data should be written as. Valid choices are
+        ``"binary_float32"`` (default) and ``"binary_int16"``.
+    meas_date : datetime.datetime | str | None
+        The measurement date. See :func:`pybv.write_brainvision` for details.
+    flush_interval : float | None
+        The maximum time in seconds between two flushes of the files to disk. Flushes
+        are triggered by calls to :meth:`append` and :meth:`add_marker`. If ``None``,
+        files are only flushed when calling :meth:`flush` or :meth:`close`. Defaults to
+        ``1.0``.
+
+    Attributes
+    ----------
+    n_times : int
+        The number of time points written so far.
+
+    Notes
+    -----
+    In contrast to :func:`pybv.write_brainvision`, the final number of events is not
+    known in advance. Descriptions of ``"Stimulus"`` and ``"Response"`` events are
+    therefore formatted with a width of at least three digits per event (e.g.,
+    ``"S  1"``), instead of a width that is shared by all events.
+
+    Examples
+    --------
+    >>> with BrainVisionWriter(
+    ...     fname_base="pybv_test_file",
+    ...     folder_out="./",
+    ...     sfreq=1,
+    ...     ch_names=["A1", "A2"],
+    ... ) as writer:
+    ...     writer.append(np.zeros((2, 5)))
+    ...     writer.add_marker(onset=3, description=1)
+    ...     writer.append(np.zeros((2, 5)))
+    >>> writer.n_times
+    10
+    >>> # remove the files
+    >>> for ext in [".vhdr", ".vmrk", ".eeg"]:
+    ...     os.remove("pybv_test_file" + ext)
+
+    """
+
+    def __init__(
+        self,
+        *,
+        fname_base,
+        folder_out,
+        sfreq,
+        ch_names,
+        ref_ch_names=None,
+        overwrite=False,
+        resolution=0.1,
+        unit="µV",
+        fmt="binary_float32",
+        meas_date=None,
+        flush_interval=1.0,
+    ):
+        folder_out = Path(folder_out)
+        _chk_overwrite(overwrite)
+        self._ch_names = _chk_ch_names(ch_names)
+        self._ch_index = _get_ch_index(self._ch_names)
+        self._ref_ch_names = _chk_ref_ch_names(ref_ch_names, self._ch_names)
+        sfreq = _chk_sfreq(sfreq)
+        self._resolution = _chk_resolution(resolution, len(self._ch_names))
+        self._units = _chk_units(unit, len(self._ch_names))
+        meas_date = _chk_meas_date(meas_date)
+        _chk_fmt(fmt)
+        self._fmt = fmt
+        if flush_interval is not None and not (
+            isinstance(flush_interval, int | float) and flush_interval >= 0
+        ):
+            raise ValueError(
+                f"flush_interval must be a non-negative number or None, but got "
+                f"{flush_interval}"
+            )
+        self._flush_interval = flush_interval
+
+        # per-channel factors scaling Volts to `units` in the desired resolution
+        self._scales = _get_data_scales(self._units, self._resolution)
+        self._ref_chs = _get_ref_chs(self._ch_index, self._ref_ch_names)
+
+        self.n_times = 0
+        self._pending_markers = []
+        self._imarker = 1 if meas_date is None else 2
+        self._eeg = None
+        self._vmrk = None
+
+        folder_out_created, fnames = _make_out_fnames(folder_out, fname_base, overwrite)
+        eeg_fname, vmrk_fname, vhdr_fname = fnames
+        try:
+            self._eeg = open(eeg_fname, "wb")
+            self._vmrk = open(vmrk_fname, "w", encoding="utf-8")
+            _write_vmrk_header(self._vmrk, eeg_fname.name, meas_date)
+            _write_vhdr_file(
+                vhdr_fname=vhdr_fname,
+                vmrk_fname=vmrk_fname,
+                eeg_fname=eeg_fname,
+                sfreq=sfreq,
+                ch_names=self._ch_names,
+                ref_ch_names=self._ref_ch_names,
+                orientation="multiplexed",
+                format=fmt,
+                resolution=self._resolution,
+                units=self._units,
+            )
+        except (ValueError, OSError):  # pragma: no cover
+            self._close_files()
+            _remove_out_files(folder_out, folder_out_created, fnames)
+            raise
+        self.flush()
+
+    def __enter__(self):
+        """Enter the context, returning the writer."""
+        return self
+
+    def __exit__(self, *args):
+        """Exit the context, closing the writer."""
+        self.close()
+
+    @property
+    def closed(self):
+        """Whether the writer has been closed."""
+        return self._eeg is None
+
+    def _chk_open(self):
+        if self.closed:
+            raise ValueError("I/O operation on closed BrainVisionWriter.")
+
+    def append(self, samples):
+        """Append samples to the data file.
+
+        Parameters
+        ----------
+        samples : np.ndarray, shape (n_channels, n_samples)
+            The samples to write. Voltage data is assumed to be in **volts**, see
+            :func:`pybv.write_brainvision` for details.
+        """
+        self._chk_open()
+        samples = np.asarray(samples)
+        if samples.ndim != 2 or len(samples) != len(self._ch_names):
+            raise ValueError(
+                f"samples must be 2D with shape ({len(self._ch_names)}, n_samples), "
+                f"but found {samples.shape}"
+            )
+
+        # convert all samples in one block, so that no samples are written if they
+        # can not be represented in the desired format, or if reference channels are
+        # not zero
+        _write_bveeg_samples(
+            self._eeg,
+            samples,
+            scales=self._scales,
+            format=self._fmt,
+            resolution=self._resolution,
+            units=self._units,
+            ref_chs=self._ref_chs,
+            chunk_samples=samples.shape[1],
+        )
+        self.n_times += samples.shape[1]
+        self._maybe_flush()
+
+    def add_marker(
+        self,
+        *,
+        onset,
+        description,
+        duration=1,
+        type="Stimulus",  # noqa: A002
+        channels="all",
+    ):
+        """Add a marker to the marker file.
+
+        Markers can only refer to samples that have already been appended.
+
+        Parameters
+        ----------
+        onset : int
+            The zero-based index of the marker onset.
+        description : str | int
+            The description of the marker.
+        duration : int
+            The duration of the marker in samples. Defaults to ``1``.
+        type : str
+            The type of the marker, one of ``{"Stimulus", "Response", "Comment"}``.
+            Defaults to ``"Stimulus"``.
+        channels : str | list of {str | int}
+            The channels that are impacted by the marker. Defaults to ``"all"``.
+
+        See Also
+        --------
+        pybv.write_brainvision : For details on the marker entries.
+        """
+        self._chk_open()
+        event = dict(
+            onset=onset,
+            description=description,
+            duration=duration,
+            type=type,
+            channels=channels,
+        )
+        events = _chk_events([event], self._ch_index, self.n_times)
+        self._imarker = _write_vmrk_events(
+            self._pending_markers.append, events, self._imarker
+        )
+        self._maybe_flush()
+
+    def _maybe_flush(self):
+        if self._flush_interval is None:
+            return
+        if time.monotonic() - self._last_flush >= self._flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Write pending markers and flush all files to disk."""
+        self._chk_open()
+        self._vmrk.writelines(self._pending_markers)
+        self._pending_markers.clear()
+        for fid in (self._eeg, self._vmrk):
+            fid.flush()
+            os.fsync(fid.fileno())
+        self._last_flush = time.monotonic()
+
+    def _close_files(self):
+        for fid in (self._eeg, self._vmrk):
+            if fid is not None:
+                fid.close()
+        self._eeg = self._vmrk = None
+
+    def close(self):
+        """Flush and close the writer. Closing a closed writer has no effect."""
+        if self.closed:
+            return
+        try:
+            self.flush()
+        finally:
+            self._close_files()
+
+
+class EventTable:
+    """Events in columnar form, to be written to the BrainVision marker file.
+
+    Storing events as columns needs much less memory than a list of dict, and allows
+    validating and writing millions of events with vectorized operations. Pass an
+    :class:`EventTable` as `events` to :func:`pybv.write_brainvision`.
+
+    Parameters
+    ----------
+    onset : array-like of int, shape (n_events,)
+        The zero-based index of each event onset, corresponding to the time dimension
+        of the data.
+    description : array-like of {str | int}, shape (n_events,)
+        The description of each event. Must be non-negative int for events of type
+        ``"Stimulus"`` and ``"Response"``, and may also be str for events of type
+        ``"Comment"``.
+    duration : int | array-like of int, shape (n_events,)
+        The duration of each event in samples (defaults to ``1``).
+    type : str | array-like of str, shape (n_events,)
+        The type of each event, one of ``{"Stimulus", "Response", "Comment"}``
+        (defaults to ``"Stimulus"``).
+    channels : None | list of {str | int | list of {str | int}}, len (n_events)
+        The channels that are impacted by each event. ``None`` (default) means all
+        channels for every event. Else, for each event, a channel name, a list of
+        channel names, or ``"all"``. An empty list also means all channels. To refer
+        to a channel that is named ``"all"``, use ``["all"]``.
+
+    Attributes
+    ----------
+    onset : np.ndarray of int, shape (n_events,)
+        The onsets.
+    duration : np.ndarray of int, shape (n_events,)
+        The durations.
+    type_code : np.ndarray of int, shape (n_events,)
+        The event types as indices into ``["Stimulus", "Response", "Comment"]``.
+    description : np.ndarray, shape (n_events,)
+        The descriptions. An int array if all descriptions are int.
+    ch_indptr : np.ndarray of int, shape (n_events + 1,)
+        The channel names of event ``i`` are
+        ``ch_data[ch_indptr[i]:ch_indptr[i + 1]]``.
+    ch_data : np.ndarray of str
+        The channel names of all events, where no channel names mean all channels.
+
+    See Also
+    --------
+    write_brainvision
+
+    Notes
+    -----
+    Use :meth:`EventTable.from_columns` to create an :class:`EventTable` from a
+    ``pandas.DataFrame``, a structured array, or a dict of columns without copying
+    each row.
+
+    Examples
+    --------
+    >>> events = EventTable(
+    ...     onset=[100, 200, 300],
+    ...     description=[1, 2, "start"],
+    ...     type=["Stimulus", "Response", "Comment"],
+    ... )
+    >>> len(events)
+    3
+    """
+
+    def __init__(
+        self,
+        onset,
+        description,
+        duration=1,
+        type="Stimulus",  # noqa: A002
+        channels=None,
+    ):
+        onset = np.asarray(onset)
+        if onset.ndim != 1:
+            raise ValueError(f"events: `onset` must be 1D, but got {onset.ndim}D")
+        n_events = len(onset)
+        self.onset = _as_int_column(onset, "onset", n_events)
+        self.duration = _as_int_column(duration, "duration", n_events)
+        self.type_code = _get_event_type_codes(type, n_events)
+        self.description = _as_description_column(description, n_events)
+        self.ch_indptr, self.ch_data = _get_event_channels(channels, n_events)
+
+    def __len__(self):
+        """Return the number of events."""
+        return len(self.onset)
+
+    def __repr__(self):
+        """Return a summary of the events."""
+        return f"<EventTable | {len(self)} events>"
+
+    @classmethod
+    def from_records(cls, records):
+        """Create an :class:`EventTable` from a list of dict.
+
+        Parameters
+        ----------
+        records : list of dict
+            The events, each a dict with the keys described in
+            :func:`pybv.write_brainvision`.
+
+        Returns
+        -------
+        events : EventTable
+            The events.
+        """
+        for record in records:
+            if not isinstance(record, dict):
+                raise ValueError(
+                    "When list, events must be a list of dict, but found non-dict "
+                    "element in list"
+                )
+
+        columns = dict(onset=[], description=[], duration=[], type=[], channels=[])
+        for record in records:
+            if "onset" not in record or "description" not in record:
+                raise ValueError(
+                    "When list of dict, each dict in events must have the keys 'onset' "
+                    "and 'description'"
+                )
+            columns["onset"].append(record["onset"])
+            columns["description"].append(record["description"])
+            columns["duration"].append(record.get("duration", 1))
+            columns["type"].append(record.get("type", "Stimulus"))
+            columns["channels"].append(record.get("channels", "all"))
+
+        for key in ["onset", "duration"]:
+            if not all(isinstance(value, int | np.integer) for value in columns[key]):
+                raise ValueError(f"events: `{key}` must be int")
+            columns[key] = np.array(columns[key], dtype=np.int64)
+
+        return cls(**columns)
+
+    @classmethod
+    def from_array(cls, array):
+        """Create an :class:`EventTable` from an array of ints.
+
+        Parameters
+        ----------
+        array : np.ndarray, shape (n_events, {2, 3})
+            The events as described in :func:`pybv.write_brainvision`.
+
+        Returns
+        -------
+        events : EventTable
+            The events.
+        """
+        duration = array[:, 2] if array.shape[1] == 3 else 1
+        return cls(onset=array[:, 0], description=array[:, 1], duration=duration)
+
+    @classmethod
+    def from_columns(cls, columns):
+        """Create an :class:`EventTable` from columns.
+
+        Parameters
+        ----------
+        columns : dict | pandas.DataFrame | np.ndarray
+            The columns ``"onset"`` and ``"description"``, and optionally
+            ``"duration"``, ``"type"``, and ``"channels"`` (see
+            :class:`EventTable`), as a dict of array-likes, a ``pandas.DataFrame``,
+            or a structured array. Numeric columns are used without copying them
+            where possible.
+
+        Returns
+        -------
+        events : EventTable
+            The events.
+        """
+        if isinstance(columns, np.ndarray):
+            names = columns.dtype.names or ()
+        else:
+            names = list(columns.keys())
+        if "onset" not in names or "description" not in names:
+            raise ValueError("events must have the columns 'onset' and 'description'")
+
+        kwargs = {
+            key: columns[key]
+            for key in ["onset", "description", "duration", "type", "channels"]
+            if key in names
+        }
+        if "channels" in kwargs:
+            kwargs["channels"] = list(kwargs["channels"])
+        return cls(**kwargs)
+
+
+class WriteReport:
+    """Report of writing BrainVision files, see :func:`pybv.write_brainvision`.
+
+    Parameters
+    ----------
+    stage_times : dict of str to float
+        The time in seconds spent in each stage, see Attributes.
+    bytes_written : dict of str to int
+        The size in bytes of the ``"eeg"``, ``"vmrk"``, and ``"vhdr"`` files.
+    temp_bytes : int
+        The size in bytes of the temporary buffers used to convert the data.
+    n_events : int
+        The number of events.
+    n_markers : int
+        The number of marker entries.
+    fmt : str
+        The binary format of the data.
+    resolution : np.ndarray, shape (n_channels,)
+        The resolution of each channel.
+    max_errors : np.ndarray, shape (n_channels,) | None
+        The maximum quantization error of each channel.
+
+    Attributes
+    ----------
+    stage_times : dict of str to float
+        The time in seconds spent in each stage of writing, in the order in which the
+        stages were first entered:
+
+            - ``"check_inputs"`` : Checking all inputs except `events`.
+            - ``"check_events"`` : Checking `events` (which happens while writing the
+              markers, if `events` is an iterator).
+            - ``"auto_format"`` : Choosing the format or resolutions, if ``"auto"``.
+            - ``"read_data"`` : Getting blocks of `data` (e.g., reading them from an
+              HDF5 dataset).
+            - ``"check_ref"`` : Checking that reference channels are zero. This
+              includes reading memory-mapped data from disk, which happens when it
+              is first accessed.
+            - ``"scale"`` : Scaling the data to their units and resolutions.
+            - ``"check_range"`` : Checking that the data can be represented in `fmt`.
+            - ``"convert"`` : Converting the data to `fmt` (and to multiplexed
+              orientation).
+            - ``"write_eeg"``, ``"write_vmrk"``, ``"write_vhdr"`` : Writing the files.
+    total_time : float
+        The total time of writing in seconds.
+    bytes_written : dict of str to int
+        The size in bytes of the ``"eeg"``, ``"vmrk"``, and ``"vhdr"`` files.
+    temp_bytes : int
+        The size in bytes of the temporary buffers used to convert the data, which is
+        bounded by `chunk_samples`.
+    n_events : int
+        The number of events.
+    n_markers : int
+        The number of marker entries, which includes the ``"New Segment"`` marker and
+        one marker per channel of events with more than one but less than all channels.
+    fmt : str
+        The binary format of the data, which is the format chosen if ``fmt="auto"``.
+    resolution : np.ndarray, shape (n_channels,)
+        The resolution of each channel, which is the resolution chosen if
+        ``resolution="auto"``.
+    max_errors : np.ndarray, shape (n_channels,) | None
+        The maximum quantization error of each channel in its unit, if `fmt` or
+        `resolution` is ``"auto"``.
+    """
+
+    def __init__(
+        self,
+        *,
+        stage_times,
+        bytes_written,
+        temp_bytes,
+        n_events,
+        n_markers,
+        fmt,
+        resolution,
+        max_errors=None,
+    ):
+        self.stage_times = stage_times
+        self.total_time = sum(stage_times.values())
+        self.bytes_written = bytes_written
+        self.temp_bytes = temp_bytes
+        self.n_events = n_events
+        self.n_markers = n_markers
+        self.fmt = fmt
+        self.resolution = resolution
+        self.max_errors = max_errors
+
+    def __repr__(self):
+        """Return a summary of the report."""
+        n_bytes = sum(self.bytes_written.values())
+        return (
+            f"<WriteReport | {self.total_time:.3f} s, {n_bytes / 1e6:.1f} MB written, "
+            f"{self.n_markers} markers>"
+        )
+
+
+class _StageTimer:
+    """Measure the time spent in stages of writing.
+
+    `lap` adds the time since the previous lap to a stage. If not `enabled`, nothing
+    is measured, and `lap` returns immediately.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.times = dict()
+        self.n_events = 0
+        self._last = time.perf_counter() if enabled else None
+
+    def lap(self, stage):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.times[stage] = self.times.get(stage, 0.0) + now - self._last
+        self._last = now
+
+    def count_events(self, batches):
+        """Count the events of lazily validated batches, attributing their time."""
+        batches = iter(batches)
+        while True:
+            self.lap("write_vmrk")  # writing the previous batch
+            batch = next(batches, None)
+            self.lap("check_events")
+            if batch is None:
+                return
+            self.n_events += len(batch)
+            yield batch
+
+
+class _CancelEvent(threading.Event):
+    """Event that is also set if the `cancel` event passed by the user is set."""
+
+    def __init__(self, cancel=None):
+        super().__init__()
+        self._cancel = cancel
+
+    def is_set(self):
+        return super().is_set() or (self._cancel is not None and self._cancel.is_set())
+
+
+class _WriteProgress:
+    """Report the progress of writing to the callable `progress`, and check `cancel`.
+
+    Both may be ``None``, in which case nothing is reported or checked.
+    """
+
+    def __init__(self, progress=None, cancel=None):
+        self.progress = progress
+        self.cancel = cancel
+
+    def check_cancel(self):
+        if self.cancel is not None and self.cancel.is_set():
+            raise CancelledError("Writing was cancelled")
+
+    def update(self, stage, done, total, n_bytes, total_bytes=None):
+        if self.progress is not None:
+            self.progress(stage, done, total, n_bytes, total_bytes)
+
+
+def _chk_data(data):
+    """Check that data is a 2D array or array-like, return it without copying.
+
+    NumPy arrays and objects exposing ``shape`` and slicing are returned as is, and
+    are converted to arrays only in blocks while writing (see `_asarray`). Objects
+    supporting the buffer protocol or DLPack are wrapped in an array without copying.
+    """
     if not isinstance(data, np.ndarray):
-        raise ValueError(f"data must be np.ndarray, but found: {type(data)}")
+        try:
+            # buffer protocol (e.g., memoryview) does not support 2D slicing
+            data = np.asarray(memoryview(data))
+        except TypeError:
+            if hasattr(data, "shape") and hasattr(data, "__getitem__"):
+                pass
+            elif hasattr(data, "__dlpack__"):
+                data = np.from_dlpack(data)
+            else:
+                raise ValueError(
+                    "data must be np.ndarray or an array-like exposing `shape` and "
+                    f"slicing, but found: {type(data)}"
+                )
 
-    if not data.ndim == 2:
+    ndim = len(data.shape)
+    if not ndim == 2:
         raise ValueError(
-            f"data must be 2D: shape (n_channels, n_times), but found {data.ndim}"
+            f"data must be 2D: shape (n_channels, n_times), but found {ndim}"
+        )
+    return data
+
+
+def _asarray(data):
+    """Convert a (block of an) array-like to an array, avoiding copies if possible."""
+    if isinstance(data, np.ndarray):
+        return data
+    if not hasattr(data, "__array__") and hasattr(data, "__dlpack__"):
+        return np.from_dlpack(data)
+    return np.asarray(data)
+
+
+def _chk_write_params(
+    *,
+    data,
+    sfreq,
+    ch_names,
+    ref_ch_names,
+    events,
+    resolution,
+    unit,
+    fmt,
+    max_error,
+    meas_date,
+    chunk_samples,
+    orientation,
+    timer=None,
+    reporter=None,
+):
+    """Check the parameters of `write_brainvision`, return them as a dict.
+
+    The returned parameters are those of `_write_parts`, with the checked `data`,
+    channel names, events, and so on. If `fmt` or `resolution` is ``"auto"``, they are
+    determined from the data (see `_get_auto_format`), and the maximum quantization
+    errors are returned as ``"quantization"``.
+    """
+    timer = _StageTimer(enabled=False) if timer is None else timer
+    data = _chk_data(data)
+
+    if chunk_samples is not None:
+        if not isinstance(chunk_samples, int | np.integer) or chunk_samples <= 0:
+            raise ValueError(
+                f"chunk_samples must be a positive int or None, but got {chunk_samples}"
+            )
+
+    _chk_multiplexed(orientation)
+
+    ch_names = _chk_ch_names(ch_names, nchan=data.shape[0])
+
+    ch_index = _get_ch_index(ch_names)
+    timer.lap("check_inputs")
+    events = _chk_events(events, ch_index, data.shape[1])
+    timer.lap("check_events")
+
+    ref_ch_names = _chk_ref_ch_names(ref_ch_names, ch_names)
+
+    sfreq = _chk_sfreq(sfreq)
+    auto_resolution = isinstance(resolution, str) and resolution == "auto"
+    if not auto_resolution:
+        resolution = _chk_resolution(resolution, len(ch_names))
+    units = _chk_units(unit, len(ch_names))
+    meas_date = _chk_meas_date(meas_date)
+    quantization = None
+    if fmt == "auto" or auto_resolution:
+        timer.lap("check_inputs")
+        fmt, resolution, quantization = _get_auto_format(
+            data,
+            fmt=fmt,
+            resolution=None if auto_resolution else resolution,
+            units=units,
+            max_error=_chk_max_error(max_error, len(ch_names)),
+            chunk_samples=chunk_samples,
+            reporter=reporter,
         )
+        timer.lap("auto_format")
+    if timer.enabled and not isinstance(events, _MarkerColumns):
+        events = timer.count_events(events)
+    return dict(
+        data=data,
+        sfreq=sfreq,
+        ch_names=ch_names,
+        ref_ch_names=ref_ch_names,
+        ref_chs=_get_ref_chs(ch_index, ref_ch_names),
+        events=events,
+        resolution=resolution,
+        units=units,
+        fmt=fmt,
+        quantization=quantization,
+        meas_date=meas_date,
+        chunk_samples=chunk_samples,
+        orientation=orientation,
+    )
+
+
+def _write_parts(
+    eeg,
+    vmrk,
+    vhdr,
+    *,
+    fname_base,
+    data,
+    sfreq,
+    ch_names,
+    ref_ch_names,
+    ref_chs,
+    events,
+    resolution,
+    units,
+    fmt,
+    quantization,
+    meas_date,
+    chunk_samples,
+    orientation,
+    timer=None,
+    reporter=None,
+):
+    """Write the data, marker, and header parts to the streams `eeg`, `vmrk`, `vhdr`.
 
+    `eeg` is a binary stream, `vmrk` and `vhdr` are text streams. The parameters are
+    those checked by `_chk_write_params`. Returns the size of the temporary buffers
+    and the number of marker entries.
+    """
+    timer = _StageTimer(enabled=False) if timer is None else timer
+    eeg_name, vmrk_name = f"{fname_base}.eeg", f"{fname_base}.vmrk"
+    temp_bytes = _write_bveeg(
+        eeg,
+        data,
+        orientation=orientation,
+        format=fmt,
+        resolution=resolution,
+        units=units,
+        ref_chs=ref_chs,
+        chunk_samples=chunk_samples,
+        timer=timer,
+        reporter=reporter,
+    )
+    n_markers = _write_vmrk(vmrk, eeg_name, events, meas_date, reporter=reporter)
+    timer.lap("write_vmrk")
+    _write_vhdr(
+        vhdr,
+        vmrk_name=vmrk_name,
+        eeg_name=eeg_name,
+        sfreq=sfreq,
+        ch_names=ch_names,
+        ref_ch_names=ref_ch_names,
+        orientation=orientation,
+        format=fmt,
+        resolution=resolution,
+        units=units,
+        n_times=data.shape[1],
+        quantization=quantization,
+    )
+    timer.lap("write_vhdr")
+    return temp_bytes, n_markers
+
+
+def _chk_overwrite(overwrite):
+    """Check that the overwrite parameter is a bool."""
     if not isinstance(overwrite, bool):
         raise ValueError("overwrite must be a boolean (True or False).")
 
-    nchan = len(ch_names)
+
+def _chk_ch_names(ch_names, nchan=None):
+    """Check the channel names, return them as list of str.
+
+    If `nchan` is not None, also check that it matches the number of channel names.
+    """
     for ch in ch_names:
         if not isinstance(ch, str | int):
             raise ValueError("ch_names must be a list of str or list of int.")
     ch_names = [str(ch) for ch in ch_names]
 
-    if len(data) != nchan:
+    if nchan is not None and nchan != len(ch_names):
         raise ValueError(
-            f"Number of channels in data ({len(data)}) does not match number of "
+            f"Number of channels in data ({nchan}) does not match number of "
             f"channel names ({len(ch_names)})."
         )
 
-    if len(set(ch_names)) != nchan:
+    if len(set(ch_names)) != len(ch_names):
         raise ValueError("Channel names must be unique, found duplicate name.")
+    return ch_names
+
+
+def _get_ch_index(ch_names):
+    """Get a dict mapping each of the (unique) `ch_names` to its 0-based index.
+
+    This avoids linear searches through `ch_names` in the checks, which would scale
+    badly with many channels.
+    """
+    return {ch: idx for idx, ch in enumerate(ch_names)}
 
-    events = _chk_events(events, ch_names, data.shape[1])
 
-    # ensure we have a list of strings as reference channel names
+def _chk_ref_ch_names(ref_ch_names, ch_names):
+    """Check the reference channel names, return them as list of str (one per ch)."""
+    nchan = len(ch_names)
     if ref_ch_names is None:
         ref_ch_names = [""] * nchan  # common but unspecified reference
     elif isinstance(ref_ch_names, str):
@@ -234,22 +1592,27 @@ def write_brainvision(
             f"The number of reference channel names ({len(ref_ch_names)}) must match "
             f"the number of channels in your data ({nchan})."
         )
+    return ref_ch_names
 
-    # ensure ref chs that are in data are zero
-    for ref_ch_name in list(set(ref_ch_names) & set(ch_names)):
-        if not np.allclose(data[ch_names.index(ref_ch_name), :], 0):
-            raise ValueError(
-                f"The provided data for the reference channel {ref_ch_name} does not "
-                "appear to be zero across all time points. This indicates that this "
-                "channel either did not serve as a reference during the recording, or "
-                "the data has been altered since. Please either pick a different "
-                "reference channel, or omit the ref_ch_name parameter."
-            )
 
+def _get_ref_chs(ch_index, ref_ch_names):
+    """Get a dict mapping reference channels that are in the data to their index.
+
+    `ch_index` is as returned by `_get_ch_index`. The data of these channels must be
+    zero, which is checked while writing.
+    """
+    return {name: ch_index[name] for name in set(ref_ch_names) if name in ch_index}
+
+
+def _chk_sfreq(sfreq):
+    """Check the sampling frequency, return it as float."""
     if not isinstance(sfreq, int | float):
         raise ValueError("sfreq must be one of (float | int)")
-    sfreq = float(sfreq)
+    return float(sfreq)
+
 
+def _chk_resolution(resolution, nchan):
+    """Check the resolution, return it as array of shape (1,) or (n_channels,)."""
     resolution = np.atleast_1d(resolution)
     if not np.issubdtype(resolution.dtype, np.number):
         raise ValueError(f"Resolution should be numeric, is {resolution.dtype}")
@@ -259,7 +1622,28 @@ def write_brainvision(
 
     if np.any(resolution <= 0):
         raise ValueError("Resolution should be > 0")
+    return resolution
+
+
+def _chk_max_error(max_error, nchan):
+    """Check the maximum quantization error, return it as array of shape (n_channels,).
 
+    Returns ``None`` if `max_error` is ``None``.
+    """
+    if max_error is None:
+        return None
+    max_error = np.atleast_1d(max_error)
+    if not np.issubdtype(max_error.dtype, np.number):
+        raise ValueError(f"max_error should be numeric, is {max_error.dtype}")
+    if max_error.shape != (1,) and max_error.shape != (nchan,):
+        raise ValueError("max_error should be one or n_channels floats")
+    if np.any(max_error <= 0):
+        raise ValueError("max_error should be > 0")
+    return np.broadcast_to(max_error, (nchan,))
+
+
+def _chk_units(unit, nchan):
+    """Check the unit parameter, return a list of units (one per channel)."""
     # check unit is single str
     if isinstance(unit, str):
         # convert unit to list, assuming all units are the same
@@ -269,7 +1653,7 @@ def write_brainvision(
             f"Number of channels in unit ({len(unit)}) does not match number of channel"
             f" names ({nchan})"
         )
-    units = unit
+    units = list(unit)
 
     # check units for compatibility with greek lettering
     show_warning = False
@@ -286,8 +1670,11 @@ def write_brainvision(
             f"Encountered small Greek letter mu 'μ' or 'u' in unit: {unit}. Converting "
             "to micro sign 'µ'."
         )
+    return units
+
 
-    # measurement date
+def _chk_meas_date(meas_date):
+    """Check the measurement date, return it as str or None."""
     if not isinstance(meas_date, str | datetime.datetime | type(None)):
         raise ValueError(
             f"`meas_date` must be of type str, datetime.datetime, or None but is of "
@@ -302,8 +1689,14 @@ def write_brainvision(
             "Got a str for `meas_date`, but it was not formatted as expected. Please "
             'supply a str in the format: "YYYYMMDDhhmmssuuuuuu".'
         )
+    return meas_date
 
-    # create output file names/paths, checking if they already exist
+
+def _make_out_fnames(folder_out, fname_base, overwrite):
+    """Create the output folder and file names, checking if the files already exist.
+
+    Returns whether the folder was created, and the (eeg, vmrk, vhdr) file names.
+    """
     folder_out_created = not folder_out.exists()
     folder_out.mkdir(parents=True, exist_ok=True)
     eeg_fname = folder_out / f"{fname_base}.eeg"
@@ -314,86 +1707,72 @@ def write_brainvision(
             raise OSError(
                 f"File already exists: {fname}.\nConsider setting overwrite=True."
             )
+    return folder_out_created, (eeg_fname, vmrk_fname, vhdr_fname)
 
-    # write output files, but delete everything if we come across an error
-    try:
-        _write_bveeg_file(
-            eeg_fname,
-            data,
-            orientation="multiplexed",
-            format=fmt,
-            resolution=resolution,
-            units=units,
-        )
-        _write_vmrk_file(vmrk_fname, eeg_fname, events, meas_date)
-        _write_vhdr_file(
-            vhdr_fname=vhdr_fname,
-            vmrk_fname=vmrk_fname,
-            eeg_fname=eeg_fname,
-            data=data,
-            sfreq=sfreq,
-            ch_names=ch_names,
-            ref_ch_names=ref_ch_names,
-            orientation="multiplexed",
-            format=fmt,
-            resolution=resolution,
-            units=units,
-        )
-    except ValueError:
-        if folder_out_created:
-            # if this is a new folder, remove everything
-            shutil.rmtree(folder_out)
-        else:
-            # else, only remove the files we might have created
-            for fname in (eeg_fname, vmrk_fname, vhdr_fname):
-                if fname.exists():  # pragma: no cover
-                    os.remove(fname)
 
-        raise
+def _remove_out_files(folder_out, folder_out_created, fnames):
+    """Remove incomplete output files after an error during writing."""
+    if folder_out_created:
+        # if this is a new folder, remove everything
+        shutil.rmtree(folder_out)
+    else:
+        # else, only remove the files we might have created
+        for fname in fnames:
+            if fname.exists():  # pragma: no cover
+                os.remove(fname)
 
 
-def _chk_events(events, ch_names, n_times):
+def _chk_events(events, ch_index, n_times, twidth=None):
     """Check that the events parameter is as expected.
 
-    This function will always return `events` as a list of dicts. If `events` is
-    ``None``, it will be an empty list. If `events` is a list of dict, it will add
-    missing keys to each dict with default values, and it will, for each ith event, turn
-    ``events[i]["channels"]`` into a list of 1-based channel name indices, where ``0``
-    equals ``"all"``. Event descriptions for ``"Stimulus"`` and ``"Response"`` will be
-    reformatted to a str of the format ``"S{:>n}"`` (or with a leading ``"R"`` for
-    ``"Response"``), where ``n`` is determined by the description with the most digits
-    (minimum 3). For each ith event, the onset (``events[i]["onset"]``) will be
-    incremented by 1 to comply with the 1-based indexing used in BrainVision marker
-    files (*.vmrk*).
+    Events are converted to an :class:`EventTable` (if they are not one already),
+    validated with vectorized checks, and returned as :class:`_MarkerColumns`, where
+    ``None`` means no events. For each ith event, the channels are turned into a sorted
+    array of 1-based channel name indices, where ``0`` equals ``"all"``. Event
+    descriptions for ``"Stimulus"`` and ``"Response"`` will be reformatted to a str of
+    the format ``"S{:>n}"`` (or with a leading ``"R"`` for ``"Response"``), where ``n``
+    is determined by the description with the most digits (minimum 3). For each ith
+    event, the onset will be incremented by 1 to comply with the 1-based indexing used
+    in BrainVision marker files (*.vmrk*).
+
+    If `events` is an iterator of dict, a generator is returned that lazily validates
+    and yields batches of events, each as :class:`_MarkerColumns`.
 
     Parameters
     ----------
-    events : np.ndarray, shape (n_events, {2, 3}) | list of dict, len (n_events) | None
+    events : np.ndarray | EventTable | list of dict | iterator | None
         The events parameter as passed to :func:`pybv.write_brainvision`.
-    ch_names : list of str, len (n_channels)
-        The channel names, preprocessed in :func:`pybv.write_brainvision`.
+    ch_index : dict, len (n_channels)
+        The channel names mapped to their 0-based index, see `_get_ch_index`.
     n_times : int
         The length of the data in samples.
+    twidth : int | None
+        The width ``n`` of descriptions for ``"Stimulus"`` and ``"Response"``. If
+        ``None`` (default), it is determined from the events as described above.
 
     Returns
     -------
-    events_out : list of dict, len (n_events)
-        The preprocessed events, always provided as list of dict.
+    events_out : _MarkerColumns | generator
+        The preprocessed events.
 
     """
-    if not isinstance(events, type(None) | np.ndarray | list):
-        raise ValueError("events must be an array, a list of dict, or None")
+    if isinstance(events, Iterator):
+        return _iter_chk_events(events, ch_index, n_times)
+
+    if not isinstance(events, type(None) | np.ndarray | list | EventTable):
+        raise ValueError(
+            "events must be an array, an EventTable, a list of dict, an iterator of "
+            "dict, or None"
+        )
 
     # validate input: None
     if isinstance(events, type(None)):
-        events_out = []
-
-    # default events
-    # NOTE: using "ch_names" as default for channels translates directly into "all" but
-    # is robust with respect to channels named "all"
-    event_defaults = dict(duration=1, type="Stimulus", channels=ch_names)
+        events = EventTable(onset=[], description=[])
 
     # validate input: ndarray
+    if isinstance(events, np.ndarray) and events.dtype.names is not None:
+        events = EventTable.from_columns(events)
+
     if isinstance(events, np.ndarray):
         if events.ndim != 2:
             raise ValueError(f"When array, events must be 2D, but got {events.ndim}")
@@ -406,177 +1785,322 @@ def _chk_events(events, ch_names, n_times):
             raise ValueError(
                 "When array, all entries in events must be int, but found other types"
             )
-
-        # convert array to list of dict
-        durations = np.ones(events.shape[0], dtype=int) * event_defaults["duration"]
-        if events.shape[1] == 3:
-            durations = events[:, -1]
-        events_out = []
-        for irow, row in enumerate(events[:, 0:2]):
-            events_out.append(
-                dict(
-                    onset=int(row[0]),
-                    duration=int(durations[irow]),
-                    description=int(row[1]),
-                    type=event_defaults["type"],
-                    channels=event_defaults["channels"],
-                )
-            )
+        events = EventTable.from_array(events)
 
     # validate input: list of dict
     if isinstance(events, list):
-        # we must not edit the original parameter
-        events_out = [copy.deepcopy(i) for i in events]
-
-    # now always list of dict
-    for event in events_out:
-        # each item must be dict
-        if not isinstance(event, dict):
+        if "all" in ch_index and any(
+            isinstance(event, dict) and _is_all(event.get("channels"))
+            for event in events
+        ):
             raise ValueError(
-                "When list, events must be a list of dict, but found non-dict element "
-                "in list"
+                "Found channel named 'all'. Your `channels` specification in events is "
+                "also 'all'. This is ambiguous, because 'all' is a reserved keyword. "
+                "Either rename the channel called 'all', or explicitly list all "
+                "ch_names in `channels` in each event instead of using 'all'."
             )
+        events = EventTable.from_records(events)
 
-    # NOTE: We format 1 -> "S  1", 10 -> "S 10", 100 -> "S100", etc.,
-    # https://github.com/bids-standard/pybv/issues/24#issuecomment-512746677
-    max_event_descr = max(
-        [1]
-        + [
-            ev.get("description", "n/a")
-            for ev in events_out
-            if isinstance(ev.get("description", "n/a"), int)
-        ]
-    )
-    twidth = max(3, int(np.ceil(np.log10(max_event_descr))))
+    return _chk_event_table(events, ch_index, n_times, twidth=twidth)
 
-    # do full validation
-    for event in events_out:
-        # required keys
-        for required_key in ["onset", "description"]:
-            if required_key not in event:
-                raise ValueError(
-                    "When list of dict, each dict in events must have the keys 'onset' "
-                    "and 'description'"
-                )
 
-        # populate keys with default if missing (in-place)
-        for optional_key, default in event_defaults.items():
-            event[optional_key] = event.get(optional_key, default)
+def _iter_chk_events(events, ch_index, n_times):
+    """Lazily validate an iterator of dict events in batches, see `_chk_events`.
 
-        # validate key types
-        # `onset`, `duration`
-        for key in ["onset", "duration"]:
-            if not isinstance(event[key], int | np.integer):
-                raise ValueError(f"events: `{key}` must be int")
+    As the events are not known in advance, descriptions are formatted with a width of
+    at least three digits per event.
+    """
+    while True:
+        batch = list(itertools.islice(events, _MARKER_BATCH))
+        if len(batch) == 0:
+            return
+        yield _chk_events(batch, ch_index, n_times, twidth=3)
 
-        if not (0 <= event["onset"] < n_times):
-            raise ValueError(
+
+class _MarkerColumns:
+    """Preprocessed events in columnar form, see `_chk_events`.
+
+    Parameters
+    ----------
+    onset : np.ndarray of int, shape (n_events,)
+        The 1-based onsets.
+    duration : np.ndarray of int, shape (n_events,)
+        The durations in samples.
+    type_code : np.ndarray of int, shape (n_events,)
+        Indices into ``SUPPORTED_EVENT_TYPES``.
+    description : np.ndarray of str, shape (n_events,)
+        The formatted descriptions.
+    ch_indptr : np.ndarray of int, shape (n_events + 1,)
+        The channel indices of event ``i`` are ``ch_idxs[ch_indptr[i]:ch_indptr[i+1]]``.
+    ch_idxs : np.ndarray of int
+        The 1-based channel indices, where ``0`` equals ``"all"``.
+    """
+
+    def __init__(self, onset, duration, type_code, description, ch_indptr, ch_idxs):
+        self.onset = onset
+        self.duration = duration
+        self.type_code = type_code
+        self.description = description
+        self.ch_indptr = ch_indptr
+        self.ch_idxs = ch_idxs
+
+    def __len__(self):
+        return len(self.onset)
+
+
+def _chk_event_table(events, ch_index, n_times, twidth=None):
+    """Validate and preprocess an :class:`EventTable`, see `_chk_events`."""
+    n_events = len(events)
+    onsets = events.onset
+    durations = events.duration
+    type_codes = events.type_code
+    descriptions = events.description
+    is_comment = type_codes == SUPPORTED_EVENT_TYPES.index("Comment")
+
+    # int descriptions are needed for the checks and formatting
+    if descriptions.dtype.kind in "iu":
+        is_int = np.ones(n_events, dtype=bool)
+        is_str = np.zeros(n_events, dtype=bool)
+        int_descr = descriptions.astype(np.int64)
+    elif descriptions.dtype.kind == "U":
+        is_int = np.zeros(n_events, dtype=bool)
+        is_str = np.ones(n_events, dtype=bool)
+        int_descr = np.zeros(n_events, dtype=np.int64)
+    else:
+        is_int = np.array(
+            [isinstance(d, int | np.integer) for d in descriptions], dtype=bool
+        )
+        is_str = np.array([isinstance(d, str) for d in descriptions], dtype=bool)
+        int_descr = np.zeros(n_events, dtype=np.int64)
+        int_descr[is_int] = descriptions[is_int].astype(np.int64)
+
+    # look up the 1-based index of each channel name, 0 for unknown names
+    ch_idxs = 1 + np.array(
+        [ch_index.get(ch, -1) for ch in events.ch_data.tolist()], dtype=np.int64
+    )
+    n_channels = np.diff(events.ch_indptr)
+    ch_rows = np.repeat(np.arange(n_events), n_channels)
+    unknown_ch = np.zeros(n_events, dtype=bool)
+    unknown_ch[ch_rows[ch_idxs == 0]] = True
+    order = np.lexsort((ch_idxs, ch_rows))
+    sorted_rows, sorted_idxs = ch_rows[order], ch_idxs[order]
+    dup = (sorted_rows[1:] == sorted_rows[:-1]) & (sorted_idxs[1:] == sorted_idxs[:-1])
+    duplicate_ch = np.zeros(n_events, dtype=bool)
+    duplicate_ch[sorted_rows[1:][dup]] = True
+
+    # the checks are ordered as in the validation of a single event, and the error is
+    # raised for the first event that fails any of them
+    def _type_name(i):
+        return SUPPORTED_EVENT_TYPES[type_codes[i]]
+
+    def _unknown_ch_name(i):
+        chs = events.ch_data[events.ch_indptr[i] : events.ch_indptr[i + 1]]
+        return chs[ch_idxs[events.ch_indptr[i] : events.ch_indptr[i + 1]] == 0][0]
+
+    checks = [
+        (
+            (onsets < 0) | (onsets >= n_times),
+            lambda i: (
                 "events: at least one onset sample is not in range of data (0-"
                 f"{n_times - 1})"
-            )
+            ),
+        ),
+        (
+            durations < 0,
+            lambda i: (
+                "events: at least one duration is negative. Durations must be "
+                ">= 0 samples."
+            ),
+        ),
+        (
+            onsets + durations > n_times,
+            lambda i: (
+                "events: at least one event has a duration that exceeds the "
+                f"range of data (0-{n_times - 1})"
+            ),
+        ),
+        (
+            ~is_comment & ~is_int,
+            lambda i: (
+                f"events: when `type` is {_type_name(i)}, `description` must be "
+                "non-negative int"
+            ),
+        ),
+        (
+            ~is_comment & (int_descr < 0),
+            lambda i: (
+                f"events: when `type` is {_type_name(i)}, descriptions must be "
+                "non-negative ints."
+            ),
+        ),
+        (
+            is_comment & ~is_int & ~is_str,
+            lambda i: (
+                f"events: when `type` is {_type_name(i)}, `description` must be "
+                "str or int"
+            ),
+        ),
+        (
+            unknown_ch,
+            lambda i: (
+                "events: found channel name that is not present in the data: "
+                f"{_unknown_ch_name(i)}"
+            ),
+        ),
+        (duplicate_ch, lambda i: "events: found duplicate channel names"),
+    ]
+    first_bad = [
+        (np.argmax(bad), icheck) for icheck, (bad, _) in enumerate(checks) if bad.any()
+    ]
+    n_valid = min(first_bad)[0] if len(first_bad) > 0 else n_events
+
+    # warn if more than one but less than all channels are specified (experimental)
+    partial_chs = (n_channels > 1) & (n_channels < len(ch_index))
+    if partial_chs[:n_valid].any():
+        warn(
+            "events: you specified at least one event that impacts more than one "
+            "but less than all channels in the data. Such events will be written to"
+            " .vmrk for as many times as channels are specified.\n\nThis feature "
+            "may not be supported by all BrainVision readers."
+        )
 
-        if event["duration"] < 0:
-            raise ValueError(
-                "events: at least one duration is negative. Durations must be >= 0 "
-                "samples."
-            )
+    if len(first_bad) > 0:
+        i, icheck = min(first_bad)
+        raise ValueError(checks[icheck][1](i))
 
-        if not (0 <= event["onset"] + event["duration"] <= n_times):
-            raise ValueError(
-                "events: at least one event has a duration that exceeds the range of "
-                f"data (0-{n_times - 1})"
-            )
+    # NOTE: We format 1 -> "S  1", 10 -> "S 10", 100 -> "S100", etc.,
+    # https://github.com/bids-standard/pybv/issues/24#issuecomment-512746677
+    # only the few unique descriptions need to be formatted
+    if twidth is None:
+        twidth = _get_twidth(int_descr[is_int].max(initial=1))
+    formatted = np.empty(n_events, dtype=object)
+    unique_descr, inverse = np.unique(
+        int_descr[~is_comment] * 2 + type_codes[~is_comment], return_inverse=True
+    )
+    unique_formatted = np.array(
+        [
+            f"{SUPPORTED_EVENT_TYPES[key % 2][0]}{key // 2:>{twidth}}"
+            for key in unique_descr.tolist()
+        ],
+        dtype=object,
+    )
+    formatted[~is_comment] = unique_formatted[inverse.reshape(-1)]
+    # commas in descriptions would be read as delimiters, and are coded as "\1"
+    if is_comment.any():
+        formatted[is_comment] = np.char.replace(
+            descriptions[is_comment].astype(str), ",", r"\1"
+        )
 
-        event["onset"] = event["onset"] + 1  # VMRK uses 1-based indexing
+    # convert channels to indices (1-based, 0="all"), events that are not related to
+    # any channel or related to all channels are related to "all"
+    all_chs = (n_channels == 0) | (n_channels == len(ch_index))
+    keep = ~np.repeat(all_chs, n_channels)
+    n_channels_out = np.where(all_chs, 1, n_channels)
+    ch_indptr = np.concatenate([[0], np.cumsum(n_channels_out)])
+    ch_idxs_out = np.zeros(ch_indptr[-1], dtype=np.int64)
+    ch_idxs_out[np.repeat(~all_chs, n_channels_out)] = sorted_idxs[keep]
+
+    return _MarkerColumns(
+        onset=onsets + 1,  # VMRK uses 1-based indexing
+        duration=durations,
+        type_code=type_codes,
+        description=formatted,
+        ch_indptr=ch_indptr,
+        ch_idxs=ch_idxs_out,
+    )
 
-        # `type`
-        event_types = ["Stimulus", "Response", "Comment"]
-        if event["type"] not in event_types:
-            raise ValueError(f"events: `type` must be one of {event_types}")
 
-        # `description`
-        if event["type"] in ["Stimulus", "Response"]:
-            if not isinstance(event["description"], int):
-                raise ValueError(
-                    f"events: when `type` is {event['type']}, `description` must be "
-                    "non-negative int"
-                )
+def _get_twidth(max_event_descr):
+    """Get the width of formatted int descriptions, given the largest description."""
+    return max(3, int(np.ceil(np.log10(max_event_descr))))
 
-            if event["description"] < 0:
-                raise ValueError(
-                    f"events: when `type` is {event['type']}, descriptions must be "
-                    "non-negative ints."
-                )
 
-            tformat = event["type"][0] + "{:>" + str(twidth) + "}"
-            event["description"] = tformat.format(event["description"])
+def _is_all(channels):
+    """Check whether `channels` of a single event is the str ``"all"``."""
+    return isinstance(channels, str) and channels == "all"
 
-        else:
-            assert event["type"] == "Comment"
-            if not isinstance(event["description"], int | str):
-                raise ValueError(
-                    f"events: when `type` is {event['type']}, `description` must be str"
-                    " or int"
-                )
-            event["description"] = str(event["description"])
 
-        # `channels`
-        # "all" becomes ch_names (list of all channel names), single str 'ch_name'
-        # becomes [ch_name]
-        if not isinstance(event["channels"], list | str):
-            raise ValueError("events: `channels` must be str or list of str")
+def _as_int_column(values, key, n_events):
+    """Return `values` as an int64 column of length `n_events`, see `EventTable`."""
+    values = np.asarray(values)
+    if n_events == 0 and values.ndim == 1:
+        values = values.astype(np.int64)
+    if not np.issubdtype(values.dtype, np.integer):
+        raise ValueError(f"events: `{key}` must be int")
+    if values.ndim > 1 or values.ndim == 1 and len(values) != n_events:
+        raise ValueError(f"events: `{key}` must have one entry per event")
+    return np.broadcast_to(values.astype(np.int64, copy=False), (n_events,))
 
-        if isinstance(event["channels"], str):
-            if event["channels"] == "all":
-                if "all" in ch_names:
-                    raise ValueError(
-                        "Found channel named 'all'. Your `channels` specification in "
-                        "events is also 'all'. This is ambiguous, because 'all' is a "
-                        "reserved keyword. Either rename the channel called 'all', or "
-                        "explicitly list all ch_names in `channels` in each event "
-                        "instead of using 'all'."
-                    )
-                event["channels"] = ch_names
-            else:
-                event["channels"] = [event["channels"]]
 
-        # now channels is a list
-        for ch in event["channels"]:
-            if not isinstance(ch, str | int):
+def _get_event_type_codes(types, n_events):
+    """Convert event `types` to indices into ``SUPPORTED_EVENT_TYPES``."""
+    if isinstance(types, str):
+        types = [types]
+    types = np.asarray(types, dtype=object).reshape(-1)
+    if len(types) not in (1, n_events):
+        raise ValueError("events: `type` must have one entry per event")
+
+    # only the few unique types need to be looked up
+    unique_types, inverse = np.unique(types.astype(str), return_inverse=True)
+    for event_type in unique_types.tolist():
+        if event_type not in SUPPORTED_EVENT_TYPES:
+            raise ValueError(f"events: `type` must be one of {SUPPORTED_EVENT_TYPES}")
+    codes = np.array(
+        [SUPPORTED_EVENT_TYPES.index(t) for t in unique_types.tolist()], dtype=np.int8
+    )
+    return np.broadcast_to(codes[inverse.reshape(-1)], (n_events,))
+
+
+def _as_description_column(descriptions, n_events):
+    """Return event `descriptions` as an int array if possible, else object array."""
+    if not isinstance(descriptions, np.ndarray) and not hasattr(
+        descriptions, "__array__"
+    ):
+        # a list of Python objects, where str and int must not be mixed up
+        descriptions = list(descriptions)
+        if all(isinstance(d, int | np.integer) for d in descriptions):
+            descriptions = np.array(descriptions, dtype=np.int64).reshape(-1)
+        else:
+            out = np.empty(len(descriptions), dtype=object)
+            for i, description in enumerate(descriptions):
+                out[i] = description
+            descriptions = out
+    descriptions = np.asarray(descriptions)
+    if n_events == 0:
+        descriptions = descriptions.astype(np.int64)
+    if descriptions.ndim != 1 or len(descriptions) != n_events:
+        raise ValueError("events: `description` must have one entry per event")
+    if descriptions.dtype.kind not in "iuUO":
+        descriptions = descriptions.astype(object)
+    return descriptions
+
+
+def _get_event_channels(channels, n_events):
+    """Convert `channels` of each event to CSR form, see `EventTable`."""
+    if channels is None:
+        return np.zeros(n_events + 1, dtype=np.int64), np.array([], dtype=str)
+    if len(channels) != n_events:
+        raise ValueError("events: `channels` must have one entry per event")
+
+    n_channels = np.zeros(n_events, dtype=np.int64)
+    ch_data = []
+    for i, chs in enumerate(channels):
+        if isinstance(chs, str):
+            chs = [] if chs == "all" else [chs]
+        elif not isinstance(chs, list | tuple | np.ndarray):
+            raise ValueError("events: `channels` must be str or list of str")
+
+        for ch in chs:
+            if not isinstance(ch, str | int | np.integer):
                 raise ValueError(
                     "events: `channels` must be list of str or list of int "
                     "corresponding to ch_names"
                 )
+        ch_data.extend(str(ch) for ch in chs)
+        n_channels[i] = len(chs)
 
-            if str(ch) not in ch_names:
-                raise ValueError(
-                    f"events: found channel name that is not present in the data: {ch}"
-                )
-
-        # check for duplicates
-        event["channels"] = [str(ch) for ch in event["channels"]]
-        if len(set(event["channels"])) != len(event["channels"]):
-            raise ValueError("events: found duplicate channel names")
-
-        # warn if more than one but less than all channels are specified (experimental)
-        if len(event["channels"]) > 1 and len(event["channels"]) < len(ch_names):
-            warn(
-                "events: you specified at least one event that impacts more than one "
-                "but less than all channels in the data. Such events will be written to"
-                " .vmrk for as many times as channels are specified.\n\nThis feature "
-                "may not be supported by all BrainVision readers."
-            )
-
-        # convert channels to indices (1-based, 0="all")
-        ch_idxs = [ch_names.index(ch) + 1 for ch in event["channels"]]
-        if set(ch_idxs) == {i + 1 for i in range(len(ch_names))}:
-            ch_idxs = [0]
-        elif len(ch_idxs) == 0:
-            # if not related to any channel: same as related to all channels
-            ch_idxs = [0]
-        event["channels"] = sorted(ch_idxs)
-
-    return events_out
+    ch_indptr = np.concatenate([[0], np.cumsum(n_channels)])
+    return ch_indptr, np.array(ch_data, dtype=str)
 
 
 def _chk_fmt(fmt):
@@ -595,61 +2119,119 @@ def _chk_multiplexed(orientation):
     if orientation not in SUPPORTED_ORIENTS:
         errmsg = (
             f"Orientation {orientation} not supported. Currently supported orientations"
-            f"are: {', '.join(SUPPORTED_ORIENTS)}"
+            f"are: {', '.join(sorted(SUPPORTED_ORIENTS))}"
         )
         raise ValueError(errmsg)
     return orientation == "multiplexed"
 
 
-def _write_vmrk_file(vmrk_fname, eeg_fname, events, meas_date):
-    """Write BrainvVision marker file."""
+def _write_vmrk_file(vmrk_fname, eeg_fname, events, meas_date, reporter=None):
+    """Write BrainvVision marker file, return the number of marker entries."""
     with open(vmrk_fname, "w", encoding="utf-8") as fout:
-        print("Brain Vision Data Exchange Marker File, Version 1.0", file=fout)
-        print(f"; Exported using pybv {__version__}", file=fout)
-        print("", file=fout)
-        print("[Common Infos]", file=fout)
-        print("Codepage=UTF-8", file=fout)
-        print(f"DataFile={eeg_fname.name}", file=fout)
-        print("", file=fout)
-        print("[Marker Infos]", file=fout)
-        print(
-            "; Each entry: Mk<Marker number>=<Type>,<Description>,"
-            "<Position in data points>,",
-            file=fout,
-        )
-        print(
-            ";             <Size in data points>, <Channel number "
-            "(0 = marker is related to all channels)>",
-            file=fout,
-        )
-        print(";             <Date (YYYYMMDDhhmmssuuuuuu)>", file=fout)
-        print(
-            "; Fields are delimited by commas, some fields might be omitted (empty).",
-            file=fout,
+        return _write_vmrk(fout, Path(eeg_fname).name, events, meas_date, reporter)
+
+
+def _write_vmrk(fout, eeg_name, events, meas_date, reporter=None):
+    """Write a BrainVision marker file to the text stream `fout`.
+
+    Returns the number of marker entries.
+    """
+    # the header is assembled first to count its bytes, as `fout` may not support tell
+    header = io.StringIO()
+    _write_vmrk_header(header, eeg_name, meas_date)
+    fout.write(header.getvalue())
+    n_bytes = len(header.getvalue().encode("utf-8"))
+    iev = 1 if meas_date is None else 2
+    return _write_vmrk_events(fout.write, events, iev, reporter, n_bytes) - 1
+
+
+def _write_vmrk_header(fout, eeg_name, meas_date):
+    """Write the header of a BrainVision marker file to the open file `fout`."""
+    print("Brain Vision Data Exchange Marker File, Version 1.0", file=fout)
+    print(f"; Exported using pybv {__version__}", file=fout)
+    print("", file=fout)
+    print("[Common Infos]", file=fout)
+    print("Codepage=UTF-8", file=fout)
+    print(f"DataFile={eeg_name}", file=fout)
+    print("", file=fout)
+    print("[Marker Infos]", file=fout)
+    print(
+        "; Each entry: Mk<Marker number>=<Type>,<Description>,"
+        "<Position in data points>,",
+        file=fout,
+    )
+    print(
+        ";             <Size in data points>, <Channel number "
+        "(0 = marker is related to all channels)>",
+        file=fout,
+    )
+    print(";             <Date (YYYYMMDDhhmmssuuuuuu)>", file=fout)
+    print(
+        "; Fields are delimited by commas, some fields might be omitted (empty).",
+        file=fout,
+    )
+    print(r'; Commas in type or description text are coded as "\1".', file=fout)
+    if meas_date is not None:
+        print(f"Mk1=New Segment,,1,1,0,{meas_date}", file=fout)
+
+
+def _write_vmrk_events(write, events, iev, reporter=None, n_bytes=0):
+    """Write marker entries for preprocessed `events`, starting at marker `iev`.
+
+    `events` is :class:`_MarkerColumns` or an iterable of these (as returned by
+    `_chk_events`). Entries are assembled in batches of lines, and each batch is passed
+    as a single str to the callable `write`. Returns the next marker number.
+
+    After each batch, the progress is reported to `reporter` (a `_WriteProgress`),
+    counting the bytes written from `n_bytes` on.
+    """
+    reporter = _WriteProgress() if reporter is None else reporter
+    total = None
+    if isinstance(events, _MarkerColumns):
+        # each event has one entry per channel, or one for all channels
+        total = iev - 1 + len(events.ch_idxs)
+        events = [events]
+
+    for batch in events:
+        for lines in _format_marker_columns(batch, iev):
+            reporter.check_cancel()
+            text = "".join(lines)
+            write(text)
+            iev += len(lines)
+            if reporter.progress is not None:
+                n_bytes += len(text.encode("utf-8"))
+                reporter.update("vmrk", iev - 1, total, n_bytes)
+    return iev
+
+
+def _format_marker_columns(events, iev):
+    """Yield lists of marker lines for preprocessed :class:`_MarkerColumns`."""
+    type_names = np.array(SUPPORTED_EVENT_TYPES, dtype=object)
+    n_channels = np.diff(events.ch_indptr)
+    for start in range(0, len(events), _MARKER_BATCH):
+        stop = min(start + _MARKER_BATCH, len(events))
+
+        # Write event once for each channel that this event is relevant for
+        # https://github.com/bids-standard/pybv/pull/77
+        rows = np.repeat(np.arange(start, stop), n_channels[start:stop])
+        chs = events.ch_idxs[events.ch_indptr[start] : events.ch_indptr[stop]]
+        columns = zip(
+            range(iev, iev + len(rows)),
+            type_names[events.type_code[rows]].tolist(),
+            events.description[rows].tolist(),
+            events.onset[rows].tolist(),
+            events.duration[rows].tolist(),
+            chs.tolist(),
         )
-        print(r'; Commas in type or description text are coded as "\1".', file=fout)
-        if meas_date is not None:
-            print(f"Mk1=New Segment,,1,1,0,{meas_date}", file=fout)
-
-        iev = 1 if meas_date is None else 2
-        for ev in events:
-            # Write event once for each channel that this event is relevant for
-            # https://github.com/bids-standard/pybv/pull/77
-            for ch in ev["channels"]:
-                print(
-                    f"Mk{iev}={ev['type']},{ev['description']},"
-                    f"{ev['onset']},{ev['duration']},{ch}",
-                    file=fout,
-                )
-                iev += 1
+        yield [f"Mk{i}={t},{d},{o},{dur},{ch}\n" for i, t, d, o, dur, ch in columns]
+        iev += len(rows)
 
 
-def _scale_data_to_unit(data, units, extra_scale=None):
-    """Scale `data` in Volts to `data` in `units`.
+def _get_unit_scales(units):
+    """Get the per-channel factors scaling data in Volts to `units`.
 
-    If `extra_scale` (a per-channel column vector, shape (n_channels, 1) or (1, 1)) is
-    provided, it is folded into the per-channel unit scaling so that the data array is
-    scaled by both factors in a single multiplication (saving one full-array copy).
+    Returns a column vector of shape (n_channels, 1) to play nice with numpy
+    broadcasting.
     """
     # only µV is supported by the BrainVision specs, but we support additional voltage
     # prefixes (e.g., V, mV, nV); if such voltage units are used, we issue a warning
@@ -686,19 +2268,25 @@ def _scale_data_to_unit(data, units, extra_scale=None):
         )
         warn(msg)
 
-    # fold an optional extra per-channel factor (e.g. the resolution scaling) into the
-    # tiny (n_channels, 1) scales vector so the large data array is scaled only once
-    if extra_scale is not None:
-        scales = scales * extra_scale
-    return data * scales
+    return scales
+
+
+def _write_vhdr_file(*, vhdr_fname, vmrk_fname, eeg_fname, **kwargs):
+    """Write BrainvVision header file, see `_write_vhdr` for the parameters."""
+    with open(vhdr_fname, "w", encoding="utf-8") as fout:
+        _write_vhdr(
+            fout,
+            vmrk_name=Path(vmrk_fname).name,
+            eeg_name=Path(eeg_fname).name,
+            **kwargs,
+        )
 
 
-def _write_vhdr_file(
+def _write_vhdr(
+    fout,
     *,
-    vhdr_fname,
-    vmrk_fname,
-    eeg_fname,
-    data,
+    vmrk_name,
+    eeg_name,
     sfreq,
     ch_names,
     ref_ch_names,
@@ -706,66 +2294,85 @@ def _write_vhdr_file(
     format,  # noqa: A002
     resolution,
     units,
+    n_times=None,
+    quantization=None,
 ):
-    """Write BrainvVision header file."""
+    """Write a BrainVision header file to the text stream `fout`.
+
+    `n_times` is written as the number of data points of vectorized data, which readers
+    need to know where the data of each channel starts. `quantization` (the maximum
+    quantization error of each channel, see `_get_auto_format`) is written as comment.
+    """
     bvfmt, _ = _chk_fmt(format)
 
     multiplexed = _chk_multiplexed(orientation)
 
-    with open(vhdr_fname, "w", encoding="utf-8") as fout:
-        print("Brain Vision Data Exchange Header File Version 1.0", file=fout)
-        print(f"; Written using pybv {__version__}", file=fout)
-        print("", file=fout)
-        print("[Common Infos]", file=fout)
-        print("Codepage=UTF-8", file=fout)
-        print(f"DataFile={eeg_fname.name}", file=fout)
-        print(f"MarkerFile={vmrk_fname.name}", file=fout)
-
-        if format.startswith("binary"):
-            print("DataFormat=BINARY", file=fout)
+    print("Brain Vision Data Exchange Header File Version 1.0", file=fout)
+    print(f"; Written using pybv {__version__}", file=fout)
+    print("", file=fout)
+    print("[Common Infos]", file=fout)
+    print("Codepage=UTF-8", file=fout)
+    print(f"DataFile={eeg_name}", file=fout)
+    print(f"MarkerFile={vmrk_name}", file=fout)
 
-        if multiplexed:
-            print("; Data orientation: MULTIPLEXED=ch1,pt1, ch2,pt1 ...", file=fout)
-            print("DataOrientation=MULTIPLEXED", file=fout)
+    if format.startswith("binary"):
+        print("DataFormat=BINARY", file=fout)
 
-        print(f"NumberOfChannels={len(data)}", file=fout)
-        print("; Sampling interval in microseconds", file=fout)
-        print(f"SamplingInterval={1e6 / sfreq}", file=fout)
+    if multiplexed:
+        print("; Data orientation: MULTIPLEXED=ch1,pt1, ch2,pt1 ...", file=fout)
+        print("DataOrientation=MULTIPLEXED", file=fout)
+    else:
+        print("; Data orientation: VECTORIZED=ch1,pt1, ch1,pt2 ...", file=fout)
+        print("DataOrientation=VECTORIZED", file=fout)
+        if n_times is not None:
+            print(f"DataPoints={n_times}", file=fout)
+
+    print(f"NumberOfChannels={len(ch_names)}", file=fout)
+    print("; Sampling interval in microseconds", file=fout)
+    print(f"SamplingInterval={1e6 / sfreq}", file=fout)
+    print("", file=fout)
+
+    if format.startswith("binary"):
+        print("[Binary Infos]", file=fout)
+        print(f"BinaryFormat={bvfmt}", file=fout)
         print("", file=fout)
 
-        if format.startswith("binary"):
-            print("[Binary Infos]", file=fout)
-            print(f"BinaryFormat={bvfmt}", file=fout)
-            print("", file=fout)
+    print("[Channel Infos]", file=fout)
+    print(
+        "; Each entry: Ch<Channel number>=<Name>,<Reference channel name>,",
+        file=fout,
+    )
+    print('; <Resolution in "Unit">,<Unit>, Future extensions..', file=fout)
+    print(
+        "; Fields are delimited by commas, some fields might be omitted (empty).",
+        file=fout,
+    )
+    print(r'; Commas in channel names are coded as "\1".', file=fout)
 
-        print("[Channel Infos]", file=fout)
-        print(
-            "; Each entry: Ch<Channel number>=<Name>,<Reference channel name>,",
-            file=fout,
-        )
-        print('; <Resolution in "Unit">,<Unit>, Future extensions..', file=fout)
-        print(
-            "; Fields are delimited by commas, some fields might be omitted (empty).",
-            file=fout,
-        )
-        print(r'; Commas in channel names are coded as "\1".', file=fout)
+    nchan = len(ch_names)
+    # broadcast to nchan elements if necessary
+    resolutions = resolution * np.ones((nchan,))
 
-        nchan = len(ch_names)
-        # broadcast to nchan elements if necessary
-        resolutions = resolution * np.ones((nchan,))
+    for i in range(nchan):
+        # take care of commas in the channel names
+        _ch_name = ch_names[i].replace(",", r"\1")
+        _ref_ch_name = ref_ch_names[i].replace(",", r"\1")
 
-        for i in range(nchan):
-            # take care of commas in the channel names
-            _ch_name = ch_names[i].replace(",", r"\1")
-            _ref_ch_name = ref_ch_names[i].replace(",", r"\1")
+        resolution = np.format_float_positional(resolutions[i], trim="-")
+        unit = units[i]
+        print(f"Ch{i + 1}={_ch_name},{_ref_ch_name},{resolution},{unit}", file=fout)
 
-            resolution = np.format_float_positional(resolutions[i], trim="-")
-            unit = units[i]
-            print(f"Ch{i + 1}={_ch_name},{_ref_ch_name},{resolution},{unit}", file=fout)
+    print("", file=fout)
+    print("[Comment]", file=fout)
+    print("", file=fout)
 
-        print("", file=fout)
-        print("[Comment]", file=fout)
-        print("", file=fout)
+    if quantization is not None:
+        print(
+            f"Maximum quantization error per channel (in its unit) in {bvfmt}:",
+            file=fout,
+        )
+        for i, error in enumerate(quantization):
+            print(f"Ch{i + 1}={error:.3g}", file=fout)
 
 
 def _check_data_in_range(data, dtype):
@@ -780,41 +2387,322 @@ def _check_data_in_range(data, dtype):
     return True
 
 
-def _write_bveeg_file(eeg_fname, data, orientation, format, resolution, units):  # noqa: A002
-    """Write BrainVision data file."""
+def _get_chunk_samples(nchan, dtype):
+    """Get the number of samples per block that fit into the default memory budget."""
+    # per time point, we need one float64 value per channel for scaling and range
+    # checking, and one value of the target `dtype` per channel for the conversion
+    bytes_per_sample = nchan * (
+        np.dtype(np.float64).itemsize + np.dtype(dtype).itemsize
+    )
+    return max(1, _CHUNK_BYTES // max(1, bytes_per_sample))
+
+
+def _get_data_scales(units, resolution):
+    """Get the per-channel factors scaling data in Volts to `units` and `resolution`.
+
+    Both factors are per-channel, so they are folded into one small column vector of
+    shape (n_channels, 1), such that the data needs to be scaled only once.
+    """
+    return _get_unit_scales(units) * np.atleast_2d(1 / resolution).T
+
+
+def _get_peaks(data, chunk_samples=None, reporter=None):
+    """Get the largest absolute value of each channel, reading `data` in chunks.
+
+    Channels with non-finite values have a peak of NaN or infinity. Cancellation is
+    checked with `reporter` (a `_WriteProgress`) before each chunk.
+    """
+    reporter = _WriteProgress() if reporter is None else reporter
+    nchan, n_times = data.shape
+    if chunk_samples is None:
+        chunk_samples = _get_chunk_samples(nchan, np.float64)
+    peaks = np.zeros(nchan)
+    for start in range(0, n_times, chunk_samples):
+        reporter.check_cancel()
+        chunk = _asarray(data[:, start : start + chunk_samples])
+        # two reductions instead of np.abs, which would copy the chunk
+        np.maximum(peaks, chunk.max(axis=1), out=peaks)
+        np.maximum(peaks, -chunk.min(axis=1), out=peaks)
+    return np.abs(peaks, out=peaks)  # no negative zeros of channels of zeros
+
+
+def _ceil_significant(values, digits=4):
+    """Round positive `values` up to `digits` significant digits."""
+    exponents = np.floor(np.log10(values)).astype(int) - (digits - 1)
+    # dividing integers by exact powers of ten gives the floats closest to the decimal
+    # numbers, which keeps the resolutions in the header short
+    mantissas = np.ceil(values / 10.0**exponents)
+    return np.where(
+        exponents < 0,
+        mantissas / 10.0 ** np.maximum(-exponents, 0),
+        mantissas * 10.0 ** np.maximum(exponents, 0),
+    )
+
+
+def _get_auto_format(
+    data, *, fmt, resolution, units, max_error, chunk_samples, reporter=None
+):
+    """Choose the format and/or the resolution for ``"auto"``.
+
+    If `resolution` is ``None``, the finest resolution with which the data of each
+    channel fits into int16 is chosen, based on its peak in `units`. If `fmt` is
+    ``"auto"``, int16 is chosen if all channels fit into it and their quantization
+    error (less than their resolution) does not exceed `max_error`, else float32. The
+    data is only read to get the peaks, before any conversion.
+
+    Returns the format, the resolution of each channel, and the maximum quantization
+    error of each channel.
+    """
+    nchan = data.shape[0]
+    unit_scales = np.array(
+        [SUPPORTED_VOLTAGE_SCALINGS.get(unit, 1.0) for unit in units], dtype=float
+    )
+    peaks = _get_peaks(data, chunk_samples, reporter) * unit_scales
+    # values are written as int16 if they are strictly within its range
+    int16_max = np.iinfo(np.int16).max
+    if resolution is None:
+        resolution = np.full(nchan, 0.1)  # the default, for channels of zeros
+        has_peak = np.isfinite(peaks) & (peaks > 0)
+        resolution[has_peak] = _ceil_significant(peaks[has_peak] / (int16_max - 1))
+    else:
+        resolution = np.broadcast_to(resolution, (nchan,)).astype(float)
+
+    if fmt == "auto":
+        fits = np.isfinite(peaks) & (peaks / resolution < int16_max)
+        precise = True if max_error is None else resolution <= max_error
+        fmt = "binary_int16" if np.all(fits & precise) else "binary_float32"
+    if fmt == "binary_int16":
+        errors = resolution.copy()
+    else:
+        # float32 has a relative precision of 2**-24
+        errors = peaks * 2.0**-24
+    return fmt, resolution, errors
+
+
+def _write_bveeg_file(
+    eeg_fname,
+    data,
+    orientation,
+    format,  # noqa: A002
+    resolution,
+    units,
+    ref_chs=None,
+    chunk_samples=None,
+    timer=None,
+    reporter=None,
+):
+    """Write BrainVision data file, return the size of the temporary buffers."""
+    with open(eeg_fname, "wb") as fid:
+        return _write_bveeg(
+            fid,
+            data,
+            orientation=orientation,
+            format=format,
+            resolution=resolution,
+            units=units,
+            ref_chs=ref_chs,
+            chunk_samples=chunk_samples,
+            timer=timer,
+            reporter=reporter,
+        )
+
+
+def _write_bveeg(
+    fid,
+    data,
+    *,
+    orientation,
+    format,  # noqa: A002
+    resolution,
+    units,
+    ref_chs=None,
+    chunk_samples=None,
+    timer=None,
+    reporter=None,
+):
+    """Write BrainVision data to the binary stream `fid`, see `_write_bveeg_file`."""
     # check the orientation and format
-    _chk_multiplexed(orientation)
+    multiplexed = _chk_multiplexed(orientation)
+    _chk_fmt(format)
+
+    # convert the data to the desired unit and scale by the (inverted) resolution
+    scales = _get_data_scales(units, resolution)
+
+    return _write_bveeg_samples(
+        fid,
+        data,
+        scales=scales,
+        format=format,
+        resolution=resolution,
+        units=units,
+        ref_chs=ref_chs,
+        chunk_samples=chunk_samples,
+        multiplexed=multiplexed,
+        timer=timer,
+        reporter=reporter,
+    )
+
+
+def _write_bveeg_samples(
+    fid,
+    data,
+    *,
+    scales,
+    format,  # noqa: A002
+    resolution,
+    units,
+    ref_chs=None,
+    chunk_samples=None,
+    multiplexed=True,
+    timer=None,
+    reporter=None,
+):
+    """Write `data` in multiplexed or vectorized orientation to the binary stream `fid`.
+
+    `data` may be an array or an array-like supporting slicing. It is read in chunks of
+    `chunk_samples` time points (of all channels), and each chunk is written to the file
+    at once, so that the temporary memory does not grow with the length of `data`. If
+    not `multiplexed`, chunks instead hold the same number of values in the order of
+    the vectorized layout, that is, whole channels or consecutive time points of a
+    single channel.
+
+    Within each chunk, the data is processed in small blocks that fit into the CPU
+    cache. In a single sweep over each block, the reference channels in `ref_chs` (a
+    dict mapping names to indices) are checked to be zero, the data is scaled, checked
+    for being representable in `format`, and converted into the output buffer. This
+    way, the data is read from memory only once.
+
+    The time of each of these stages is measured with `timer` (a `_StageTimer`), if
+    enabled. After each chunk, the progress is reported to `reporter` (a
+    `_WriteProgress`), which is also checked for cancellation before each chunk.
+    Returns the size in bytes of the temporary buffers.
+    """
+    timer = _StageTimer(enabled=False) if timer is None else timer
+    reporter = _WriteProgress() if reporter is None else reporter
     _, dtype = _chk_fmt(format)
+    ref_chs = dict() if ref_chs is None else ref_chs
+    ref_names = sorted(ref_chs, key=ref_chs.get)
+    ref_idxs = np.array([ref_chs[name] for name in ref_names], dtype=np.intp)
+
+    nchan, n_times = data.shape
+    if chunk_samples is None:
+        chunk_samples = _get_chunk_samples(nchan, dtype)
+    chunk_samples = max(1, min(chunk_samples, n_times))
+    if multiplexed:
+        chunks = [
+            (0, nchan, start, min(start + chunk_samples, n_times))
+            for start in range(0, n_times, chunk_samples)
+        ]
+    else:
+        # as many whole channels as fit into a chunk, or a single channel in parts
+        chunk_values = chunk_samples * nchan
+        chunk_chans = min(chunk_values // max(1, n_times), nchan)
+        if chunk_chans >= 1:
+            chunks = [
+                (start, min(start + chunk_chans, nchan), 0, n_times)
+                for start in range(0, nchan, chunk_chans)
+            ]
+        else:
+            chunks = [
+                (ch, ch + 1, start, min(start + chunk_values, n_times))
+                for ch in range(nchan)
+                for start in range(0, n_times, chunk_values)
+            ]
+    if not chunks:
+        return 0
+    max_chans = max(cstop - cstart for cstart, cstop, _, _ in chunks)
+    max_samples = max(stop - start for _, _, start, stop in chunks)
+    block_samples = max(1, min(_BLOCK_BYTES // (8 * max(1, max_chans)), max_samples))
+
+    # buffers are allocated once and re-used; blocks are scaled in the layout of the
+    # input. If multiplexed, they are transposed to shape (n_times, n_channels) while
+    # converting them into the output buffer, such that writing it in C order results
+    # in the multiplexed layout (ch1,pt1, ch2,pt1, ...). Vectorized blocks are
+    # converted as they are (ch1,pt1, ch1,pt2, ...). We always write data as
+    # little-endian without BOM, irrespective of the system architecture.
+    buf = np.empty((max_chans, block_samples), dtype=np.float64)
+    out = np.empty(max_chans * max_samples, dtype=np.dtype(dtype).newbyteorder("<"))
+    # chunks of array-likes are copied into arrays
+    chunk_bytes = 0 if isinstance(data, np.ndarray) else max_chans * max_samples * 8
+
+    n_done = n_bytes = 0
+    for cstart, cstop, start, stop in chunks:
+        reporter.check_cancel()
+        chunk = _asarray(data[cstart:cstop, start:stop])
+        timer.lap("read_data")
+        chunk_scales = scales[cstart:cstop]
+        # reference channels in this chunk, with indices relative to the chunk
+        is_ref = (ref_idxs >= cstart) & (ref_idxs < cstop)
+        chunk_ref_idxs = ref_idxs[is_ref] - cstart
+        chunk_ref_names = [name for name, keep in zip(ref_names, is_ref) if keep]
+        if multiplexed:
+            out_chunk = out[: (stop - start) * nchan].reshape(stop - start, nchan)
+        else:
+            out_chunk = out[: chunk.size].reshape(chunk.shape)
+
+        for bstart in range(0, stop - start, block_samples):
+            bstop = min(bstart + block_samples, stop - start)
+            src = chunk[:, bstart:bstop]
+
+            # ensure ref chs that are in data are zero (same as np.allclose(x, 0)),
+            # checking all of them at once
+            is_zero = (np.abs(src[chunk_ref_idxs]) <= 1e-8).all(axis=1)
+            timer.lap("check_ref")
+            if not is_zero.all():
+                ref_ch_name = chunk_ref_names[np.argmin(is_zero)]
+                raise ValueError(
+                    f"The provided data for the reference channel {ref_ch_name} "
+                    "does not appear to be zero across all time points. This "
+                    "indicates that this channel either did not serve as a "
+                    "reference during the recording, or the data has been altered "
+                    "since. Please either pick a different reference channel, or "
+                    "omit the ref_ch_name parameter."
+                )
 
-    # convert the data to the desired unit and scale by the (inverted) resolution in a
-    # single multiplication; both factors are per-channel, so folding them avoids
-    # allocating a second full-size copy of the data array
-    scaling_factor = np.atleast_2d(1 / resolution).T
-    data = _scale_data_to_unit(data, units, extra_scale=scaling_factor)
-
-    # convert the data to required format
-    if not _check_data_in_range(data, dtype):
-        mod = " ('{resolution}')"
-        if isinstance(resolution, np.ndarray):
-            # if we have individual resolutions, do not print them all
-            mod = "s"
-        msg = (
-            f"`data` can not be represented in '{format}' given the desired "
-            f"resolution{mod} and units ('{units}')."
+            block = buf[: cstop - cstart, : bstop - bstart]
+            np.multiply(src, chunk_scales, out=block)
+            timer.lap("scale")
+
+            # convert the data to required format
+            in_range = _check_data_in_range(block, dtype)
+            timer.lap("check_range")
+            if not in_range:
+                mod = " ('{resolution}')"
+                if isinstance(resolution, np.ndarray):
+                    # if we have individual resolutions, do not print them all
+                    mod = "s"
+                msg = (
+                    f"`data` can not be represented in '{format}' given the desired "
+                    f"resolution{mod} and units ('{units}')."
+                )
+                if format == "binary_int16":
+                    msg += "\nPlease consider writing using 'binary_float32' format."
+                raise ValueError(msg)
+            if multiplexed:
+                out_chunk[bstart:bstop] = block.T
+            else:
+                out_chunk[:, bstart:bstop] = block
+            timer.lap("convert")
+
+        _write_buffer(fid, out_chunk)
+        timer.lap("write_eeg")
+        n_done += out_chunk.size
+        n_bytes += out_chunk.nbytes
+        reporter.update(
+            "eeg", n_done // nchan, n_times, n_bytes, nchan * n_times * out.itemsize
         )
-        if format == "binary_int16":
-            msg += "\nPlease consider writing using 'binary_float32' format."
-        raise ValueError(msg)
-    data = data.astype(dtype=dtype)
+    return buf.nbytes + out.nbytes + chunk_bytes
 
-    # we always write data as little-endian without BOM
-    # `data` is already in native byte order due to NumPy operations that result in
-    # copies of the `data` array (see above)
-    assert data.dtype.byteorder == "="
 
-    # swap bytes if system architecture is big-endian
-    if sys.byteorder == "big":  # pragma: no cover
-        data = data.byteswap()
+def _write_buffer(fid, buffer):
+    """Write all bytes of the contiguous array `buffer` to the binary stream `fid`.
 
-    # save to binary
-    data.ravel(order="F").tofile(eeg_fname)
+    Unlike :meth:`numpy.ndarray.tofile`, this works with any stream, and raw streams
+    that write only part of the bytes at a time are written to until all are written.
+    """
+    view = memoryview(buffer).cast("B")
+    while view:
+        n_written = fid.write(view)
+        if n_written is None:  # streams that are not raw write all bytes
+            break
+        view = view[n_written:]
@@ -0,0 +1,195 @@
+"""Command line interface tests."""
+
+# Authors: pybv developers
+# SPDX-License-Identifier: BSD-3-Clause
+
+import json
+import re
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from pybv import write_brainvision
+from pybv._cli import main
+
+# create testing data
+rng = np.random.default_rng(1337)
+n_chans = 3
+ch_names = ["Fp1", "Fp2", "Cz"]
+sfreq = 250
+data = rng.normal(size=(n_chans, 1000)) * 1e-5
+data[-1] = 0.0
+
+
+def _assert_same_files(folder, expected_folder, fname_base="data"):
+    """Assert that BrainVision files were written like `expected_folder`."""
+    for ext in [".vhdr", ".vmrk", ".eeg"]:
+        expected = (expected_folder / ("pybv" + ext)).read_binary()
+        if ext != ".eeg":
+            expected = expected.replace(b"pybv.", f"{fname_base}.".encode())
+        assert (folder / (fname_base + ext)).read_binary() == expected
+
+
+@pytest.fixture
+def expected(tmpdir):
+    """Write the testing data with `write_brainvision`."""
+    folder = tmpdir / "expected"
+    write_brainvision(
+        data=data,
+        sfreq=sfreq,
+        ch_names=ch_names,
+        ref_ch_names="Cz",
+        fname_base="pybv",
+        folder_out=folder,
+        unit="mV",
+        resolution=[0.1, 0.2, 0.1],
+        fmt="binary_int16",
+    )
+    return folder
+
+
+@pytest.mark.parametrize("source", ["npy", "npz", "raw", "raw_channels_first"])
+def test_convert(tmpdir, expected, source):
+    """Test that all inputs are converted like with write_brainvision."""
+    args = [
+        "--ch-names=Fp1,Fp2,Cz",
+        "--ref-ch-names=Cz",
+        "--unit=mV",
+        "--resolution=0.1,0.2,0.1",
+        "--fmt=binary_int16",
+    ]
+    if source == "npy":
+        fname = tmpdir / "data.npy"
+        np.save(str(fname), data)
+    elif source == "npz":
+        fname = tmpdir / "data.npz"
+        np.savez(str(fname), times=np.arange(3), data=data.T)
+        args += ["--member=data", "--layout=times-first"]
+    elif source == "raw":
+        fname = tmpdir / "data.bin"
+        fname.write_binary(b"\0" * 16 + data.T.astype(">f8").tobytes())
+        args += ["--dtype=>f8", "--offset=16"]
+    else:
+        fname = tmpdir / "data.bin"
+        data.astype("<f4").tofile(fname)
+        args += ["--dtype=float32", "--layout=channels-first", "--n-channels=3"]
+        expected = tmpdir / "expected_float32"
+        write_brainvision(
+            data=data.astype("<f4"),
+            sfreq=sfreq,
+            ch_names=ch_names,
+            ref_ch_names="Cz",
+            fname_base="pybv",
+            folder_out=expected,
+            unit="mV",
+            resolution=[0.1, 0.2, 0.1],
+            fmt="binary_int16",
+        )
+    main(["convert", str(fname), "-o", str(tmpdir / "out"), "--sfreq=250"] + args)
+    _assert_same_files(tmpdir / "out", expected)
+
+
+def test_convert_sidecars(tmpdir, expected):
+    """Test that metadata are read from sidecars and can be overridden."""
+    np.save(str(tmpdir / "data.npy"), data)
+    (tmpdir / "data.json").write_text(
+        json.dumps(dict(SamplingFrequency=sfreq, fmt="binary_float32")), "utf-8"
+    )
+    (tmpdir / "channels.tsv").write_text(
+        "name\ttype\tunits\tresolution\treference\n"
+        "Fp1\tEEG\tmV\t0.1\tCz\n"
+        "Fp2\tEEG\tmV\t0.2\tCz\n"
+        "Cz\tEEG\tmV\t0.1\tn/a\n",
+        "utf-8",
+    )
+    argv = [
+        "convert",
+        str(tmpdir / "data.npy"),
+        "--sidecar",
+        str(tmpdir / "data.json"),
+        "--sidecar",
+        str(tmpdir / "channels.tsv"),
+        "--ref-ch-names=Cz",
+        "--fmt=binary_int16",
+        "--fname-base=converted",
+        "-o",
+        str(tmpdir / "out"),
+    ]
+    main(argv)
+    _assert_same_files(tmpdir / "out", expected, fname_base="converted")
+
+
+def test_convert_errors(tmpdir, capsys):
+    """Test that invalid inputs exit with errors."""
+    np.save(str(tmpdir / "data.npy"), data)
+    np.savez_compressed(str(tmpdir / "compressed.npz"), data=data)
+    np.savez(str(tmpdir / "two.npz"), a=data, b=data)
+    np.save(str(tmpdir / "vector.npy"), data[0])
+    (tmpdir / "data.bin").write_binary(b"\0" * 20)
+    (tmpdir / "channels.txt").write_text("Fp1\n", "utf-8")
+    (tmpdir / "channels.tsv").write_text("type\nEEG\n", "utf-8")
+    ch_arg = "--ch-names=Fp1,Fp2,Cz"
+    for args, match in [
+        (["data.npy", ch_arg], "sfreq must be given as --sfreq"),
+        (["data.npy", "--sfreq=1"], "ch_names must be given as --ch-names"),
+        (["compressed.npz", ch_arg, "--sfreq=1"], "is compressed"),
+        (["two.npz", ch_arg, "--sfreq=1"], "Use --member to choose one of .*: a, b"),
+        (["vector.npy", ch_arg, "--sfreq=1"], "must be 2D"),
+        (["data.bin", ch_arg, "--sfreq=1"], "is not a multiple of the size"),
+        (["data.npy", "--sidecar", "channels.txt", "--sfreq=1"], "must be a .json or"),
+        (["data.npy", "--sidecar", "channels.tsv", "--sfreq=1"], "must have a column"),
+        (["data.npy", "--ch-names=Fp1", "--sfreq=1"], "Number of channels in data"),
+        (["missing.npy", ch_arg, "--sfreq=1"], "No such file"),
+    ]:
+        argv = ["convert"] + [
+            str(tmpdir / arg) if not arg.startswith("-") else arg for arg in args
+        ]
+        argv += ["-o", str(tmpdir / "out")]
+        with pytest.raises(SystemExit) as excinfo:
+            main(argv)
+        assert excinfo.value.code == 1
+        assert re.search(match, capsys.readouterr().err)
+
+
+def test_convert_empty(tmpdir):
+    """Test that empty raw binary files are converted."""
+    (tmpdir / "empty.bin").write_binary(b"")
+    main(
+        ["convert", str(tmpdir / "empty.bin"), "--ch-names=a,b", "--sfreq=1"]
+        + ["-o", str(tmpdir)]
+    )
+    assert (tmpdir / "empty.eeg").size() == 0
+    assert "DataPoints" not in (tmpdir / "empty.vhdr").read_text("utf-8")
+
+
+def test_module_entry_point(tmpdir):
+    """Test that the command line interface runs with ``python -m pybv``."""
+    np.save(str(tmpdir / "data.npy"), data)
+    subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "pybv",
+            "convert",
+            str(tmpdir / "data.npy"),
+            "--sfreq=250",
+            "--ch-names=Fp1,Fp2,Cz",
+            "-o",
+            str(tmpdir),
+        ],
+        check=True,
+    )
+    assert (tmpdir / "data.vhdr").exists()
+
+
+def test_startup_imports():
+    """Test that NumPy and pybv.io are not imported before a command runs."""
+    code = (
+        "import sys, pybv._cli; print(sorted({'numpy', 'pybv.io'} & set(sys.modules)))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True, text=True
+    )
+    assert result.stdout.strip() == "[]"
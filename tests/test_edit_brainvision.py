@@ -0,0 +1,463 @@
+"""BrainVision editing tests."""
+
+# Authors: pybv developers
+# SPDX-License-Identifier: BSD-3-Clause
+
+import os
+
+import numpy as np
+import pytest
+from numpy.testing import assert_allclose, assert_array_equal
+
+import pybv._edit
+from pybv import (
+    append_markers,
+    concatenate_brainvision,
+    crop_brainvision,
+    pick_channels_brainvision,
+    read_brainvision,
+    read_markers,
+    split_brainvision,
+    update_brainvision,
+    write_brainvision,
+)
+
+# create testing data
+fname = "pybv"
+rng = np.random.default_rng(1337)
+n_chans = 4
+ch_names = ["Fp1", "Fp2", "Cz", "ref"]
+sfreq = 500
+n_times = 2000
+data = rng.normal(size=(n_chans, n_times)) * 1e-5
+data[-1] = 0.0
+events = [
+    dict(onset=1, duration=10, description=1),
+    dict(onset=100, description="Some, string", type="Comment", channels="Fp2"),
+    dict(onset=1000, description=2, type="Response", channels=["Fp1", "Cz"]),
+]
+meas_date = "20000101120000000000"
+
+
+def _write(folder_out, **kwargs):
+    """Write the testing data, return the header file name."""
+    kwargs = (
+        dict(
+            data=data,
+            sfreq=sfreq,
+            ch_names=ch_names,
+            fname_base=fname,
+            folder_out=folder_out,
+            events=events,
+            meas_date=meas_date,
+        )
+        | kwargs
+    )
+    write_brainvision(**kwargs)
+    return folder_out / (fname + ".vhdr")
+
+
+@pytest.mark.parametrize("orientation", ["multiplexed", "vectorized"])
+def test_update_brainvision(tmpdir, orientation):
+    """Test that updating metadata is the same as writing with that metadata."""
+    new_ch_names = ["Fz", "F,z", "Pz", "M1"]
+    new_events = [dict(onset=1999, description=3)]
+    kwargs = dict(fmt="auto", orientation=orientation)
+    vhdr_fname = _write(tmpdir / "updated", **kwargs)
+    eeg_fname = tmpdir / "updated" / (fname + ".eeg")
+    eeg_stat = os.stat(eeg_fname)
+
+    # no changes
+    vhdr = vhdr_fname.read_binary()
+    vmrk = (tmpdir / "updated" / (fname + ".vmrk")).read_binary()
+    update_brainvision(vhdr_fname)
+    assert vhdr_fname.read_binary() == vhdr
+    update_brainvision(vhdr_fname, meas_date=meas_date)
+    assert (tmpdir / "updated" / (fname + ".vmrk")).read_binary() == vmrk
+
+    # channel names, references, units, and markers
+    update_brainvision(
+        vhdr_fname, ch_names=new_ch_names, ref_ch_names="M1", unit=["µV"] * 3 + ["mV"]
+    )
+    update_brainvision(vhdr_fname, events=new_events, meas_date=False)
+    with pytest.warns(UserWarning, match="unsupported"):
+        write_brainvision(
+            data=data,
+            sfreq=sfreq,
+            ch_names=new_ch_names,
+            ref_ch_names="M1",
+            fname_base=fname,
+            folder_out=tmpdir / "written",
+            unit=["µV"] * 3 + ["mV"],
+            events=new_events,
+            **kwargs,
+        )
+    for ext in [".vhdr", ".vmrk"]:
+        expected = (tmpdir / "written" / (fname + ext)).read_binary()
+        assert (tmpdir / "updated" / (fname + ext)).read_binary() == expected
+
+    # the data file is not touched, and no temporary files are left behind
+    assert os.stat(eeg_fname).st_mtime_ns == eeg_stat.st_mtime_ns
+    assert sorted(os.listdir(tmpdir / "updated")) == [
+        fname + ext for ext in [".eeg", ".vhdr", ".vmrk"]
+    ]
+
+
+def test_update_brainvision_keeps_markers(tmpdir):
+    """Test that markers and channels are kept when changing other metadata."""
+    vhdr_fname = _write(tmpdir)
+    vmrk_fname = tmpdir / (fname + ".vmrk")
+    markers = read_markers(vmrk_fname, ch_names=ch_names)
+    update_brainvision(vhdr_fname, ch_names=["a", "b", "c", "d"], meas_date=False)
+    assert "New Segment" not in vmrk_fname.read_text("utf-8")
+    new_markers = read_markers(vmrk_fname, ch_names=["a", "b", "c", "d"])
+    assert_array_equal(new_markers.onset, markers.onset)
+    assert_array_equal(new_markers.ch_data, ["b", "a", "c"])
+
+    update_brainvision(vhdr_fname, meas_date="20240229235959999999")
+    assert "Mk1=New Segment,,1,1,0,20240229235959999999" in vmrk_fname.read_text(
+        "utf-8"
+    )
+    raw = read_brainvision(vhdr_fname)
+    assert raw.ch_names == ["a", "b", "c", "d"]
+    assert_allclose(raw.data[:, :], data, rtol=1e-6, atol=1e-12)
+
+
+def test_update_brainvision_errors(tmpdir):
+    """Test that invalid metadata raise errors and leave the files unchanged."""
+    vhdr_fname = _write(tmpdir)
+    contents = {fname: fname.read_binary() for fname in tmpdir.listdir()}
+    with pytest.raises(ValueError, match="Number of channels in data"):
+        update_brainvision(vhdr_fname, ch_names=["a", "b"])
+    with pytest.raises(ValueError, match="Channel names must be unique"):
+        update_brainvision(vhdr_fname, ch_names=["a", "a", "b", "c"])
+    with pytest.raises(ValueError, match="number of reference channel names"):
+        update_brainvision(vhdr_fname, ref_ch_names=["a"])
+    with pytest.raises(ValueError, match="Number of channels in unit"):
+        update_brainvision(vhdr_fname, unit=["µV"])
+    with pytest.raises(ValueError, match="not in range of data"):
+        update_brainvision(vhdr_fname, events=[dict(onset=n_times, description=1)])
+    with pytest.raises(ValueError, match="was not formatted as expected"):
+        update_brainvision(vhdr_fname, meas_date="2000")
+
+    # the data file must match the header
+    eeg_fname = tmpdir / (fname + ".eeg")
+    eeg_fname.write_binary(eeg_fname.read_binary()[:-2])
+    with pytest.raises(ValueError, match="is not a multiple of the size"):
+        update_brainvision(vhdr_fname, ch_names=["a", "b", "c", "d"])
+    eeg_fname.write_binary(contents[eeg_fname])
+
+    assert {fname: fname.read_binary() for fname in tmpdir.listdir()} == contents
+
+
+@pytest.mark.parametrize("tail_bytes", [16, 64 * 1024])
+def test_append_markers(tmpdir, monkeypatch, tail_bytes):
+    """Test that appending markers is the same as writing all markers at once."""
+    monkeypatch.setattr(pybv._edit, "_TAIL_BYTES", tail_bytes)
+    array_events = [dict(onset=1000, description=2), dict(onset=100, description=1)]
+    _write(tmpdir / "all", events=events * 3 + array_events)
+    _write(tmpdir / "appended", events=events[:1])
+    vmrk_fname = tmpdir / "appended" / (fname + ".vmrk")
+    with pytest.warns(UserWarning, match="Such events will be written"):
+        append_markers(vmrk_fname, events[1:] + events)
+        append_markers(vmrk_fname, iter(events))
+    append_markers(vmrk_fname, np.array([[1000, 2], [100, 1]]))
+    expected = (tmpdir / "all" / (fname + ".vmrk")).read_text("utf-8")
+    assert vmrk_fname.read_text("utf-8") == expected
+    assert expected.endswith("Mk15=Stimulus,S  1,101,1,0\n")
+
+
+@pytest.mark.parametrize("tail_bytes", [16, 64 * 1024])
+def test_append_markers_description_width(tmpdir, monkeypatch, tail_bytes):
+    """Test that appended descriptions have the width of those in the file."""
+    monkeypatch.setattr(pybv._edit, "_TAIL_BYTES", tail_bytes)
+    first = [dict(onset=1, description=1234), dict(onset=2, description=5)]
+    comments = [dict(onset=3, description="Comment", type="Comment")] * 20
+    new = [dict(onset=4, description=7, type="Response")]
+    _write(tmpdir / "all", events=first + comments + new)
+    _write(tmpdir / "appended", events=first + comments)
+    vmrk_fname = tmpdir / "appended" / (fname + ".vmrk")
+    append_markers(vmrk_fname, new)
+    expected = (tmpdir / "all" / (fname + ".vmrk")).read_text("utf-8")
+    assert vmrk_fname.read_text("utf-8") == expected
+    assert expected.endswith("=Response,R   7,5,1,0\n")
+
+    # descriptions that do not fit into the width are not appended
+    with pytest.raises(ValueError, match="have a width of 4 digits, which some"):
+        append_markers(vmrk_fname, iter(new + [dict(onset=5, description=12345)]))
+    assert vmrk_fname.read_text("utf-8") == expected
+
+
+def test_append_markers_no_markers(tmpdir):
+    """Test appending to marker files without markers or without a final newline."""
+    vhdr_fname = _write(tmpdir, events=None, meas_date=None)
+    vmrk_fname = tmpdir / (fname + ".vmrk")
+    vmrk_fname.write_text(vmrk_fname.read_text("utf-8").rstrip("\n"), "utf-8")
+    append_markers(vmrk_fname, [dict(onset=0, description=1)], vhdr_fname=vhdr_fname)
+    assert vmrk_fname.read_text("utf-8").endswith(
+        '(empty).\n; Commas in type or description text are coded as "\\1".\n'
+        "Mk1=Stimulus,S  1,1,1,0\n"
+    )
+
+
+def test_append_markers_errors(tmpdir):
+    """Test that invalid markers and marker files raise errors."""
+    _write(tmpdir, events=None)
+    vmrk_fname = tmpdir / (fname + ".vmrk")
+    vmrk = vmrk_fname.read_text("utf-8")
+    with pytest.raises(ValueError, match="events must be given"):
+        append_markers(vmrk_fname, None)
+    with pytest.raises(ValueError, match="not in range of data"):
+        append_markers(vmrk_fname, [dict(onset=n_times, description=1)])
+    with pytest.raises(ValueError, match="found channel .* Oz"):
+        append_markers(vmrk_fname, [dict(onset=1, description=1, channels="Oz")])
+    assert vmrk_fname.read_text("utf-8") == vmrk
+
+    vmrk_fname.write_text(vmrk + "[Comment]\nsome text\n", "utf-8")
+    with pytest.raises(ValueError, match="is the last section of the file"):
+        append_markers(vmrk_fname, [dict(onset=1, description=1)])
+    vmrk_fname.write_text("Brain Vision Data Exchange Marker File\n", "utf-8")
+    with pytest.raises(ValueError, match="has no \\[Marker Infos\\] section"):
+        append_markers(vmrk_fname, [dict(onset=1, description=1)])
+    vmrk_fname.write_text("[Marker Infos]\nMkx=Stimulus,S  1,1,1,0\n", "utf-8")
+    with pytest.raises(ValueError, match="has invalid marker entries"):
+        append_markers(vmrk_fname, [dict(onset=1, description=1)])
+
+
+@pytest.mark.parametrize("kernel_copy", [True, False])
+def test_concatenate_brainvision(tmpdir, monkeypatch, kernel_copy):
+    """Test that concatenated recordings are like writing all data at once."""
+    if not kernel_copy:
+        monkeypatch.delattr(os, "copy_file_range", raising=False)
+        monkeypatch.setattr(pybv._edit.sys, "platform", "other")
+        monkeypatch.setattr(pybv._edit, "_COPY_BYTES", 1000)
+    bounds = [0, 500, 1500, n_times]
+    part_events = [
+        [dict(onset=0, description=1), dict(onset=499, description=2)],
+        [dict(onset=10, description="Comment", type="Comment", channels="Cz")],
+        [],
+    ]
+    vhdr_fnames = []
+    for idx, (start, stop) in enumerate(zip(bounds[:-1], bounds[1:])):
+        vhdr_fnames.append(
+            _write(
+                tmpdir / f"part{idx}",
+                data=data[:, start:stop],
+                events=part_events[idx],
+                meas_date=None if idx == 1 else f"2000010112000{idx}000000",
+                fmt="auto",
+            )
+        )
+    concatenate_brainvision(vhdr_fnames, fname_base=fname, folder_out=tmpdir / "out")
+    _write(
+        tmpdir / "all",
+        events=part_events[0] + [dict(part_events[1][0], onset=510)],
+        meas_date="20000101120000000000",
+        fmt="auto",
+    )
+
+    raw = read_brainvision(tmpdir / "out" / (fname + ".vhdr"))
+    assert raw.n_times == n_times
+    eeg = (tmpdir / "all" / (fname + ".eeg")).read_binary()
+    assert (tmpdir / "out" / (fname + ".eeg")).read_binary() == eeg
+    vhdr = (tmpdir / "all" / (fname + ".vhdr")).read_text("utf-8")
+    new_vhdr = (tmpdir / "out" / (fname + ".vhdr")).read_text("utf-8")
+    # quantization errors are the largest of all parts, which may be smaller
+    assert new_vhdr.split("[Comment]")[0] == vhdr.split("[Comment]")[0]
+    assert "Maximum quantization error" in new_vhdr
+
+    vmrk = (tmpdir / "out" / (fname + ".vmrk")).read_text("utf-8")
+    assert vmrk.split("[Marker Infos]")[1].splitlines()[-6:] == [
+        "Mk1=New Segment,,1,1,0,20000101120000000000",
+        "Mk2=Stimulus,S  1,1,1,0",
+        "Mk3=Stimulus,S  2,500,1,0",
+        "Mk4=New Segment,,501,1,0",
+        "Mk5=Comment,Comment,511,1,3",
+        "Mk6=New Segment,,1501,1,0,20000101120002000000",
+    ]
+
+
+def test_concatenate_brainvision_description_width(tmpdir):
+    """Test that descriptions are formatted with the same width in all parts."""
+    part_events = [[dict(onset=0, description=5)], [dict(onset=10, description=1234)]]
+    vhdr_fnames = []
+    for idx, events_ in enumerate(part_events):
+        part_data = data[:, idx * 1000 : (idx + 1) * 1000]
+        vhdr_fnames.append(
+            _write(tmpdir / f"part{idx}", data=part_data, events=events_)
+        )
+    concatenate_brainvision(vhdr_fnames, fname_base=fname, folder_out=tmpdir / "out")
+    _write(
+        tmpdir / "all", events=[part_events[0][0], dict(onset=1010, description=1234)]
+    )
+
+    vmrk = (tmpdir / "out" / (fname + ".vmrk")).read_text("utf-8")
+    expected = (tmpdir / "all" / (fname + ".vmrk")).read_text("utf-8")
+    assert "Mk2=Stimulus,S   5,1,1,0" in expected
+    # the markers are the same, apart from the New Segment markers between parts
+    markers = [line for line in vmrk.splitlines() if "Stimulus" in line]
+    assert [marker.split("=", 1)[1] for marker in markers] == [
+        line.split("=", 1)[1] for line in expected.splitlines() if "Stimulus" in line
+    ]
+
+
+def test_concatenate_brainvision_errors(tmpdir):
+    """Test that incompatible recordings can not be concatenated."""
+    first = _write(tmpdir / "first")
+    kwargs = dict(fname_base=fname, folder_out=tmpdir / "out")
+    with pytest.raises(ValueError, match="must be a list of at least one"):
+        concatenate_brainvision(first, **kwargs)
+    with pytest.raises(ValueError, match="must be a list of at least one"):
+        concatenate_brainvision([], **kwargs)
+    for key, value in [
+        ("ch_names", ["a", "b", "c", "d"]),
+        ("sfreq", 1000),
+        ("fmt", "binary_int16"),
+        ("resolution", 0.2),
+        ("ref_ch_names", "ref"),
+    ]:
+        other = _write(tmpdir / key, events=None, **{key: value})
+        with pytest.raises(ValueError, match=f"with different {key} can not be"):
+            concatenate_brainvision([first, other], **kwargs)
+    other = _write(tmpdir / "vectorized", orientation="vectorized")
+    with pytest.raises(ValueError, match="Only multiplexed data can be concatenated"):
+        concatenate_brainvision([first, other], **kwargs)
+    with pytest.raises(ValueError, match="is an input file"):
+        concatenate_brainvision(
+            [first, first],
+            fname_base=fname,
+            folder_out=tmpdir / "first",
+            overwrite=True,
+        )
+    assert not (tmpdir / "out").exists()
+    assert read_brainvision(first).n_times == n_times
+
+
+@pytest.mark.parametrize("orientation", ["multiplexed", "vectorized"])
+@pytest.mark.parametrize(
+    "tmin, tmax, start, stop, new_events",
+    [
+        (0.19, 2.002, 95, 1001, [dict(events[1], onset=5), dict(events[2], onset=905)]),
+        (0.0, 0.01, 0, 5, [dict(events[0], duration=4)]),
+        (3.0, None, 1500, n_times, []),
+    ],
+)
+def test_crop_brainvision(tmpdir, orientation, tmin, tmax, start, stop, new_events):
+    """Test that cropped recordings are like writing the cropped data."""
+    vhdr_fname = _write(tmpdir / "orig", orientation=orientation, fmt="binary_int16")
+    crop_brainvision(
+        vhdr_fname, fname_base=fname, folder_out=tmpdir / "out", tmin=tmin, tmax=tmax
+    )
+    _write(
+        tmpdir / "expected",
+        data=data[:, start:stop],
+        events=new_events,
+        meas_date=f"200001011200{start * 1_000_000 // sfreq:08}",
+        orientation=orientation,
+        fmt="binary_int16",
+    )
+    for ext in [".eeg", ".vmrk"]:
+        expected = (tmpdir / "expected" / (fname + ext)).read_binary()
+        assert (tmpdir / "out" / (fname + ext)).read_binary() == expected
+    vhdr = (tmpdir / "expected" / (fname + ".vhdr")).read_text("utf-8")
+    assert (tmpdir / "out" / (fname + ".vhdr")).read_text("utf-8") == vhdr
+
+
+def test_split_brainvision(tmpdir):
+    """Test that split recordings hold all data and markers of the recording."""
+    vhdr_fname = _write(tmpdir / "orig", meas_date=None)
+    vhdr_fnames = split_brainvision(
+        vhdr_fname, [0.5, 1.9], fname_base=fname, folder_out=tmpdir / "out"
+    )
+    assert [vhdr.name for vhdr in vhdr_fnames] == [
+        f"{fname}_split-{idx:02}.vhdr" for idx in (1, 2, 3)
+    ]
+    orig = read_brainvision(vhdr_fname)
+    orig_events = read_markers(vhdr_fname.new(ext=".vmrk"), ch_names=ch_names)
+    for vhdr, start, stop in zip(vhdr_fnames, [0, 250, 950], [250, 950, n_times]):
+        assert_array_equal(read_brainvision(vhdr).data, orig.data[:, start:stop])
+        part_events = read_markers(vhdr.with_suffix(".vmrk"), ch_names=ch_names)
+        mask = (orig_events.onset >= start) & (orig_events.onset < stop)
+        assert_array_equal(part_events.onset, orig_events.onset[mask] - start)
+        assert_array_equal(part_events.description, orig_events.description[mask])
+        assert "New Segment" not in vhdr.with_suffix(".vmrk").read_text("utf-8")
+    part_events = read_markers(vhdr.with_suffix(".vmrk"), ch_names=ch_names)
+    assert_array_equal(part_events.ch_data, orig_events.ch_data[-2:])
+    assert_array_equal(part_events.ch_indptr, [0, 1, 2])
+
+
+def test_crop_split_brainvision_errors(tmpdir):
+    """Test that invalid times raise errors."""
+    vhdr_fname = _write(tmpdir / "orig")
+    kwargs = dict(fname_base=fname, folder_out=tmpdir / "out")
+    for tmin, tmax in [(-1, None), (0, 5), (2, 1), ("0", None), (True, None)]:
+        with pytest.raises(ValueError, match="tmin, tmax must be"):
+            crop_brainvision(vhdr_fname, tmin=tmin, tmax=tmax, **kwargs)
+    for tmin, tmax in [(0.5, 0.5), (0.5, 0.5005), (4, None)]:
+        with pytest.raises(ValueError, match="must be at least one time point apart"):
+            crop_brainvision(vhdr_fname, tmin=tmin, tmax=tmax, **kwargs)
+    for times in [[2, 1], [0], [4], [1, 1], [False]]:
+        with pytest.raises(ValueError, match="times must"):
+            split_brainvision(vhdr_fname, times, **kwargs)
+    with pytest.raises(ValueError, match="is an input file"):
+        crop_brainvision(
+            vhdr_fname, fname_base=fname, folder_out=tmpdir / "orig", overwrite=True
+        )
+    # parts that were written are removed if a later part can not be written
+    (tmpdir / "out").mkdir()
+    (tmpdir / "out" / f"{fname}_split-02.vmrk").write_text("", "utf-8")
+    with pytest.raises(OSError, match="already exists"):
+        split_brainvision(vhdr_fname, [1], **kwargs)
+    assert os.listdir(tmpdir / "out") == [f"{fname}_split-02.vmrk"]
+    assert read_brainvision(vhdr_fname).n_times == n_times
+
+
+@pytest.mark.parametrize("orientation", ["multiplexed", "vectorized"])
+@pytest.mark.parametrize("copy_bytes", [100, 1024**2])
+def test_pick_channels_brainvision(tmpdir, monkeypatch, orientation, copy_bytes):
+    """Test that picking channels is like writing the data of these channels."""
+    monkeypatch.setattr(pybv._edit, "_COPY_BYTES", copy_bytes)
+    resolution = np.array([0.1, 0.2, 0.3, 0.4])
+    kwargs = dict(orientation=orientation, fmt="binary_int16", ref_ch_names="ref")
+    vhdr_fname = _write(tmpdir / "orig", resolution=resolution, **kwargs)
+    pick_channels_brainvision(
+        vhdr_fname, ["Cz", 0], fname_base=fname, folder_out=tmpdir / "out"
+    )
+    _write(
+        tmpdir / "expected",
+        data=data[[2, 0]],
+        ch_names=["Cz", "Fp1"],
+        resolution=resolution[[2, 0]],
+        # markers of several channels are written once per channel
+        events=[events[0]] + [dict(events[2], channels=ch) for ch in ["Fp1", "Cz"]],
+        **kwargs,
+    )
+    for ext in [".eeg", ".vmrk", ".vhdr"]:
+        expected = (tmpdir / "expected" / (fname + ext)).read_binary()
+        assert (tmpdir / "out" / (fname + ext)).read_binary() == expected
+
+
+def test_pick_channels_brainvision_errors(tmpdir):
+    """Test that invalid picks raise errors."""
+    vhdr_fname = _write(tmpdir / "orig")
+    kwargs = dict(fname_base=fname, folder_out=tmpdir / "out")
+    for picks, match in [
+        (None, "must be a list of at least one"),
+        ([], "must be a list of at least one"),
+        ("Cz", "must be a list of at least one"),
+        (["Oz"], "Channel Oz is not in the recording"),
+        ([4], "picks must be channel names or indices"),
+        (["Cz", 2], "more than once"),
+    ]:
+        with pytest.raises(ValueError, match=match):
+            pick_channels_brainvision(vhdr_fname, picks, **kwargs)
+    with pytest.raises(ValueError, match="is an input file"):
+        pick_channels_brainvision(
+            vhdr_fname,
+            [0],
+            fname_base=fname,
+            folder_out=tmpdir / "orig",
+            overwrite=True,
+        )
+    assert not (tmpdir / "out").exists()
+    assert read_brainvision(vhdr_fname).n_times == n_times
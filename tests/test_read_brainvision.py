@@ -0,0 +1,306 @@
+"""BrainVision reader tests."""
+
+# Authors: pybv developers
+# SPDX-License-Identifier: BSD-3-Clause
+
+import mne
+import numpy as np
+import pytest
+from numpy.testing import assert_allclose, assert_array_equal
+
+from pybv import (
+    EventTable,
+    read_brainvision,
+    read_markers,
+    read_window,
+    write_brainvision,
+)
+from pybv.io import SUPPORTED_FORMATS
+
+# create testing data
+fname = "pybv"
+rng = np.random.default_rng(1337)
+n_chans = 5
+ch_names = ["Fp1", "Fp2", "a,b", "temp", "ref"]
+sfreq = 500
+n_times = 2000
+data = rng.normal(size=(n_chans, n_times)) * 1e-5
+data[-1] = 0.0
+units = ["µV", "mV", "V", "°C", "µV"]
+resolution = np.array([0.1, 0.01, 1e-6, 0.5, 0.1])
+
+
+def _write(folder_out, fmt="binary_float32", **kwargs):
+    """Write the testing data, return the header file name."""
+    kwargs = (
+        dict(
+            data=data,
+            sfreq=sfreq,
+            ch_names=ch_names,
+            ref_ch_names="ref",
+            fname_base=fname,
+            folder_out=folder_out,
+            unit=units,
+            resolution=resolution,
+            fmt=fmt,
+        )
+        | kwargs
+    )
+    with pytest.warns(UserWarning, match="unsupported"):
+        write_brainvision(**kwargs)
+    return folder_out / (fname + ".vhdr")
+
+
+@pytest.mark.parametrize("fmt", SUPPORTED_FORMATS.keys())
+def test_read_brainvision(tmpdir, fmt):
+    """Test that written data and header are read back."""
+    vhdr_fname = _write(tmpdir, fmt=fmt)
+    raw = read_brainvision(vhdr_fname)
+    assert raw.ch_names == ch_names
+    assert raw.ref_ch_names == ["ref"] * n_chans
+    assert raw.units == units
+    assert_array_equal(raw.resolution, resolution)
+    assert raw.sfreq == sfreq
+    assert raw.fmt == fmt
+    assert raw.orientation == "multiplexed"
+    assert raw.n_times == n_times
+    assert raw.data.shape == (n_chans, n_times)
+    assert raw.eeg_fname == tmpdir / (fname + ".eeg")
+    assert raw.vmrk_fname == tmpdir / (fname + ".vmrk")
+    assert isinstance(raw.memmap, np.memmap)
+    assert repr(raw) == (
+        f"<BrainVisionRaw | {fname}.vhdr | 5 channels x 2000 time points, 500 Hz>"
+    )
+
+    # data are scaled back to Volts, except for non-voltage units, which are only
+    # written in their resolution
+    resolution_volts = resolution / np.array([1e6, 1e3, 1, 1, 1e6])
+    for idx in [0, 1, 2, 4]:
+        # values are truncated to int16
+        atol = resolution_volts[idx] if fmt == "binary_int16" else 1e-12
+        assert_allclose(raw.data[idx], data[idx], rtol=1e-6, atol=atol)
+    temp = data[3] if fmt == "binary_float32" else np.trunc(data[3] / 0.5) * 0.5
+    assert_allclose(np.asarray(raw.data)[3], temp, rtol=1e-6)
+
+    # same as MNE-Python
+    raw_mne = mne.io.read_raw_brainvision(vhdr_fname, preload=True)
+    assert_allclose(np.asarray(raw.data)[:3], raw_mne.get_data()[:3], rtol=1e-6)
+
+
+@pytest.mark.parametrize(
+    "key",
+    [
+        (slice(None), slice(100, 200)),
+        (1, slice(None, None, 7)),
+        ([3, 0], slice(-10, None)),
+        (slice(None, None, -1), 5),
+        np.s_[..., 1500:],
+        2,
+        ([0, 1, 2], [5, 6, 7]),
+    ],
+)
+def test_read_brainvision_indexing(tmpdir, key):
+    """Test that indexing the lazy data works like indexing an array."""
+    raw = read_brainvision(_write(tmpdir))
+    selection = raw.data[key]
+    assert selection.dtype == np.float64
+    assert_array_equal(selection, np.asarray(raw.data)[key])
+
+
+@pytest.mark.parametrize("orientation", ["multiplexed", "vectorized"])
+@pytest.mark.parametrize("fmt", SUPPORTED_FORMATS.keys())
+def test_read_brainvision_roundtrip(tmpdir, fmt, orientation):
+    """Test that the data of a recording can be written again."""
+    raw = read_brainvision(_write(tmpdir / "first", fmt=fmt, orientation=orientation))
+    assert raw.orientation == orientation
+    raw2 = read_brainvision(
+        _write(
+            tmpdir / "second",
+            fmt=fmt,
+            data=raw.data,
+            chunk_samples=300,
+            orientation=orientation,
+        )
+    )
+    first = (tmpdir / "first" / fname + ".vhdr").read_binary()
+    assert (tmpdir / "second" / fname + ".vhdr").read_binary() == first
+    if fmt == "binary_float32":
+        assert_array_equal(raw2.memmap, raw.memmap)
+    else:
+        # scaling back and forth may be off by one before truncating to int16
+        assert np.abs(raw2.memmap.astype(int) - raw.memmap).max() <= 1
+
+
+def test_read_brainvision_errors(tmpdir):
+    """Test that invalid files raise errors."""
+    vhdr_fname = _write(tmpdir)
+    header = vhdr_fname.read_text("utf-8")
+
+    vhdr_fname.write_text("bogus\n" + header, "utf-8")
+    with pytest.raises(ValueError, match="is not a BrainVision header file"):
+        read_brainvision(vhdr_fname)
+
+    vhdr_fname.write_text(header.replace("=MULTIPLEXED", "=SEGMENTED"), "utf-8")
+    with pytest.raises(ValueError, match="orientation segmented is not supported"):
+        read_brainvision(vhdr_fname)
+
+    vhdr_fname.write_text(header.replace("=IEEE_FLOAT_32", "=UINT_16"), "utf-8")
+    with pytest.raises(ValueError, match="Data format UINT_16 is not supported"):
+        read_brainvision(vhdr_fname)
+
+    vhdr_fname.write_text(header, "utf-8")
+    eeg_fname = tmpdir / (fname + ".eeg")
+    eeg_fname.write_binary(eeg_fname.read_binary()[:-2])
+    with pytest.raises(ValueError, match="is not a multiple of the size"):
+        read_brainvision(vhdr_fname)
+
+    # empty data files can not be memory-mapped, but are valid
+    eeg_fname.write_binary(b"")
+    raw = read_brainvision(vhdr_fname)
+    assert raw.data.shape == (n_chans, 0)
+    assert raw.data[:, :].shape == (n_chans, 0)
+
+
+@pytest.mark.parametrize("orientation", ["multiplexed", "vectorized"])
+@pytest.mark.parametrize("fmt", SUPPORTED_FORMATS.keys())
+@pytest.mark.parametrize(
+    "start, stop, picks",
+    [
+        (0, None, None),
+        (100, 250, ["Fp2", "a,b"]),
+        (1999, 2000, [4, 0]),
+        (500, 510, [-1, "temp", 3]),
+        (10, 10, None),
+        (0, 2000, []),
+    ],
+)
+def test_read_window(tmpdir, fmt, orientation, start, stop, picks):
+    """Test that windows of some channels are read like slices of all data."""
+    vhdr_fname = _write(tmpdir, fmt=fmt, orientation=orientation)
+    raw = read_brainvision(vhdr_fname)
+    window = read_window(vhdr_fname, start, stop, picks)
+    idxs = [
+        raw.ch_names.index(pick) if isinstance(pick, str) else pick
+        for pick in (range(n_chans) if picks is None else picks)
+    ]
+    assert window.dtype == np.float64
+    assert window.shape == (len(idxs), (stop or n_times) - start)
+    assert_array_equal(window, raw.data[idxs, start:stop])
+
+
+def test_read_window_errors(tmpdir):
+    """Test that invalid windows and picks raise errors."""
+    vhdr_fname = _write(tmpdir)
+    for start, stop in [(-1, 10), (10, 5), (0, n_times + 1)]:
+        with pytest.raises(ValueError, match="must be time points"):
+            read_window(vhdr_fname, start, stop)
+    for start, stop, name in [
+        (1.5, 10, "start"),
+        (0, 10.0, "stop"),
+        (True, 10, "start"),
+    ]:
+        with pytest.raises(ValueError, match=f"{name} must be an int"):
+            read_window(vhdr_fname, start, stop)
+    with pytest.raises(ValueError, match="Channel Cz is not in the recording"):
+        read_window(vhdr_fname, picks=["Cz"])
+    for pick in [n_chans, 1.0]:
+        with pytest.raises(ValueError, match="picks must be channel names or indices"):
+            read_window(vhdr_fname, picks=[pick])
+
+
+def test_read_markers(tmpdir):
+    """Test that markers are read and can be written again as is."""
+    events = [
+        dict(onset=1, duration=10, description=1),
+        dict(onset=0, description="Some, string", type="Comment", channels="Fp2"),
+        dict(onset=1000, description=2, type="Response", channels=["Fp1", "a,b"]),
+        dict(onset=200, description=1234, channels=[]),
+        dict(onset=300, description="x" * 300, type="Comment"),
+        dict(onset=400, description=3, type="Comment"),
+    ]
+    with pytest.warns(UserWarning, match="Such events will be written"):
+        vhdr_fname = _write(
+            tmpdir / "first", events=events, meas_date="20000101120000000000"
+        )
+    vmrk_fname = tmpdir / "first" / (fname + ".vmrk")
+    markers = read_markers(vmrk_fname, ch_names=ch_names)
+    assert isinstance(markers, EventTable)
+    assert len(markers) == 7  # "New Segment" is skipped, one marker per channel
+    assert_array_equal(markers.onset, [1, 0, 1000, 1000, 200, 300, 400])
+    assert_array_equal(markers.duration, [10, 1, 1, 1, 1, 1, 1])
+    assert_array_equal(markers.type_code, [0, 2, 1, 1, 0, 2, 2])
+    assert markers.description.tolist() == [
+        1,
+        "Some, string",
+        2,
+        2,
+        1234,
+        "x" * 300,
+        "3",
+    ]
+    assert_array_equal(markers.ch_indptr, [0, 0, 1, 2, 3, 3, 3, 3])
+    assert_array_equal(markers.ch_data, ["Fp2", "Fp1", "a,b"])
+
+    with pytest.warns(UserWarning, match="unsupported"):
+        write_brainvision(
+            data=read_brainvision(vhdr_fname).data,
+            sfreq=sfreq,
+            ch_names=ch_names,
+            fname_base=fname,
+            folder_out=tmpdir / "second",
+            unit=units,
+            resolution=resolution,
+            meas_date="20000101120000000000",
+            events=markers,
+        )
+    vmrk = vmrk_fname.read_text("utf-8")
+    assert (tmpdir / "second" / (fname + ".vmrk")).read_text("utf-8") == vmrk
+
+    # channel numbers are kept without channel names, and Windows line endings and
+    # omitted fields are supported
+    vmrk_fname.write_binary(
+        vmrk.replace("Mk8=Comment,3,401,1,0", "Mk8=Stimulus,S 12,401,,")
+        .replace("\n", "\r\n")
+        .encode("utf-8")
+    )
+    markers = read_markers(vmrk_fname)
+    assert_array_equal(markers.ch_data, ["2", "1", "3"])
+    assert markers.description[-1] == 12
+    assert markers.duration[-1] == 1
+    assert markers.ch_indptr[-1] == markers.ch_indptr[-2]
+
+
+def test_read_markers_prefix_mismatch(tmpdir):
+    """Test that descriptions with the prefix of another type are kept as str."""
+    vmrk_fname = tmpdir / "mismatch.vmrk"
+    vmrk_fname.write_text(
+        "[Marker Infos]\n"
+        "Mk1=Stimulus,R  5,1,1,0\n"
+        "Mk2=Response,S  5,2,1,0\n"
+        "Mk3=Stimulus,S  5,3,1,0\n"
+        "Mk4=Response,R  5,4,1,0\n",
+        "utf-8",
+    )
+    markers = read_markers(vmrk_fname)
+    assert markers.description.tolist() == ["R  5", "S  5", 5, 5]
+    assert_array_equal(markers.type_code, [0, 1, 0, 1])
+
+
+def test_read_markers_errors(tmpdir):
+    """Test that invalid marker files raise errors."""
+    vmrk_fname = tmpdir / "bad.vmrk"
+    vmrk_fname.write_text("Brain Vision Data Exchange Marker File\n", "utf-8")
+    with pytest.raises(ValueError, match="has no \\[Marker Infos\\] section"):
+        read_markers(vmrk_fname)
+
+    for entry in ["Mk1=Stimulus,S  1,x,1,0", "Mk1=Stimulus,S  1,0,1,0"]:
+        vmrk_fname.write_text(f"[Marker Infos]\n{entry}\n", "utf-8")
+        with pytest.raises(ValueError, match="invalid numbers|invalid positions"):
+            read_markers(vmrk_fname)
+
+    vmrk_fname.write_text("[Marker Infos]\nMk1=Stimulus,S  1,1,1,3\n", "utf-8")
+    with pytest.raises(ValueError, match="invalid positions or channels"):
+        read_markers(vmrk_fname, ch_names=["a", "b"])
+    vmrk_fname.write_text("[Marker Infos]\nMk1=Stimulus\n", "utf-8")
+    with pytest.raises(ValueError, match="invalid positions or channels"):
+        read_markers(vmrk_fname)
@@ -3,11 +3,18 @@
 # Authors: pybv developers
 # SPDX-License-Identifier: BSD-3-Clause
 
+import asyncio
+import io
 import itertools
 import os
 import re
+import threading
+import time
+import tracemalloc
+from concurrent.futures import CancelledError, ThreadPoolExecutor
 from datetime import datetime, timezone
 from importlib.metadata import version
+from multiprocessing import shared_memory
 
 import mne
 import numpy as np
@@ -15,12 +22,22 @@ import pytest
 from numpy.testing import assert_allclose, assert_array_equal
 from packaging.version import Version
 
+import pybv.io
+from pybv import (
+    BrainVisionWriter,
+    EventTable,
+    WriteReport,
+    submit_write,
+    write_brainvision_async,
+    write_brainvision_batch,
+    write_brainvision_streams,
+)
 from pybv.io import (
     SUPPORTED_FORMATS,
     SUPPORTED_VOLTAGE_SCALINGS,
     _check_data_in_range,
     _chk_fmt,
-    _scale_data_to_unit,
+    _get_data_scales,
     _write_bveeg_file,
     _write_vhdr_file,
     write_brainvision,
@@ -88,7 +105,11 @@ def test_non_stim_resp_event_first(tmpdir):
 @pytest.mark.parametrize(
     "events_errormsg",
     [
-        ({}, "events must be an array, a list of dict, or None"),
+        (
+            {},
+            "events must be an array, an EventTable, a list of dict, an iterator of "
+            "dict, or None",
+        ),
         (rng.normal(size=(10, 20, 30)), "When array, events must be 2D, but got 3"),
         (
             rng.normal(size=(10, 4)),
@@ -205,7 +226,7 @@ def test_kw_only_args(tmpdir):
 
 def test_bv_writer_inputs(tmpdir):
     """Test data, channels, sfreq, resolution, ref_ch_names, and overwrite."""
-    with pytest.raises(ValueError, match="data must be np.ndarray"):
+    with pytest.raises(ValueError, match="data must be np.ndarray or an array-like"):
         write_brainvision(
             data=[1, 2, 3],
             sfreq=sfreq,
@@ -344,7 +365,6 @@ def test_bv_bad_format(tmpdir):
             vhdr_fname=vhdr_fname,
             vmrk_fname=vmrk_fname,
             eeg_fname=eeg_fname,
-            data=data,
             sfreq=sfreq,
             ch_names=ch_names,
             ref_ch_names=None,
@@ -358,7 +378,6 @@ def test_bv_bad_format(tmpdir):
             vhdr_fname=vhdr_fname,
             vmrk_fname=vmrk_fname,
             eeg_fname=eeg_fname,
-            data=data,
             sfreq=sfreq,
             ch_names=ch_names,
             ref_ch_names=None,
@@ -520,8 +539,7 @@ def test_format_resolution_unit(tmpdir, format, resolution, unit):  # noqa: A002
     accurately be written.
     """
     # check whether this test will be numerically possible
-    tmpdata = _scale_data_to_unit(data.copy(), [unit] * n_chans)
-    tmpdata = tmpdata * np.atleast_2d(1 / resolution).T
+    tmpdata = data * _get_data_scales([unit] * n_chans, resolution)
     _, dtype = _chk_fmt(format)
     data_will_fit = _check_data_in_range(tmpdata, dtype)
 
@@ -800,3 +818,891 @@ def test_event_writing(tmpdir):
     _events, _event_id = mne.events_from_annotations(raw)
     for _d in descr:
         assert _d in _event_id
+
+
+@pytest.mark.parametrize("fmt", SUPPORTED_FORMATS.keys())
+@pytest.mark.parametrize("chunk_samples", [1, 7, 1000, n_times, 10 * n_times])
+def test_chunk_samples(tmpdir, fmt, chunk_samples):
+    """Test that writing in blocks of samples produces identical files."""
+    kwargs = dict(
+        data=data,
+        sfreq=sfreq,
+        ch_names=ch_names,
+        fname_base=fname,
+        fmt=fmt,
+    )
+    write_brainvision(**kwargs, folder_out=tmpdir / "default")
+    write_brainvision(
+        **kwargs, folder_out=tmpdir / "chunked", chunk_samples=chunk_samples
+    )
+    for ext in (".eeg", ".vmrk", ".vhdr"):
+        default = (tmpdir / "default" / fname + ext).read_binary()
+        chunked = (tmpdir / "chunked" / fname + ext).read_binary()
+        assert default == chunked
+
+
+@pytest.mark.parametrize("chunk_samples", [0, -1, 1.5, "100"])
+def test_bad_chunk_samples(tmpdir, chunk_samples):
+    """Test that invalid block sizes raise an error."""
+    with pytest.raises(ValueError, match="chunk_samples must be a positive int"):
+        write_brainvision(
+            data=data,
+            sfreq=sfreq,
+            ch_names=ch_names,
+            fname_base=fname,
+            folder_out=tmpdir,
+            chunk_samples=chunk_samples,
+        )
+
+
+def test_chunked_write_memory(tmpdir):
+    """Test that the temporary memory of writing is bounded by the block size."""
+    chunk_samples = 100
+    tracemalloc.start()
+    try:
+        write_brainvision(
+            data=data,
+            sfreq=sfreq,
+            ch_names=ch_names,
+            fname_base=fname,
+            folder_out=tmpdir,
+            chunk_samples=chunk_samples,
+        )
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    # a single copy of the data would already exceed this limit
+    assert peak < data.nbytes / 4
+
+
+@pytest.mark.parametrize("fmt", SUPPORTED_FORMATS.keys())
+@pytest.mark.parametrize("chunk_samples", [None, 1, 1000, 3 * n_times])
+def test_vectorized_orientation(tmpdir, fmt, chunk_samples):
+    """Test writing data in vectorized orientation."""
+    kwargs = dict(data=data, sfreq=sfreq, ch_names=ch_names, fname_base=fname, fmt=fmt)
+    write_brainvision(**kwargs, folder_out=tmpdir / "multiplexed")
+    write_brainvision(
+        **kwargs,
+        folder_out=tmpdir / "vectorized",
+        orientation="vectorized",
+        chunk_samples=chunk_samples,
+    )
+
+    # same values, in channel-major order
+    dtype = np.dtype(SUPPORTED_FORMATS[fmt][1]).newbyteorder("<")
+    multiplexed = np.fromfile(tmpdir / "multiplexed" / fname + ".eeg", dtype=dtype)
+    vectorized = np.fromfile(tmpdir / "vectorized" / fname + ".eeg", dtype=dtype)
+    assert_array_equal(vectorized, multiplexed.reshape(n_times, n_chans).T.ravel())
+    vhdr = (tmpdir / "vectorized" / fname + ".vhdr").read_text("utf-8")
+    assert "DataOrientation=VECTORIZED" in vhdr
+    assert f"DataPoints={n_times}" in vhdr
+
+    raw = mne.io.read_raw_brainvision(tmpdir / "vectorized" / fname + ".vhdr")
+    raw_multiplexed = mne.io.read_raw_brainvision(
+        tmpdir / "multiplexed" / fname + ".vhdr"
+    )
+    assert_array_equal(raw.get_data(), raw_multiplexed.get_data())
+
+
+@pytest.mark.parametrize(
+    "scale, kwargs, expected_fmt",
+    [
+        (1, dict(resolution="auto"), "binary_int16"),
+        (1, dict(resolution=0.1), "binary_int16"),
+        (1e5, dict(resolution=0.1), "binary_float32"),
+        (1, dict(resolution="auto", max_error=1e-6), "binary_float32"),
+        (1, dict(resolution="auto", max_error=np.full(n_chans, 0.1)), "binary_int16"),
+        (np.nan, dict(resolution="auto"), "binary_float32"),
+    ],
+)
+def test_auto_format(tmpdir, scale, kwargs, expected_fmt):
+    """Test choosing the format and resolutions automatically."""
+    data_ = data * np.linspace(1, 10, n_chans)[:, np.newaxis]
+    data_[0] *= scale
+    write_brainvision(
+        data=data_,
+        sfreq=sfreq,
+        ch_names=ch_names,
+        fname_base=fname,
+        folder_out=tmpdir,
+        fmt="auto",
+        **kwargs,
+    )
+    vhdr = (tmpdir / fname + ".vhdr").read_text("utf-8")
+    bvfmt = SUPPORTED_FORMATS[expected_fmt][0]
+    assert f"BinaryFormat={bvfmt}" in vhdr
+    comment = vhdr[vhdr.index("[Comment]") :]
+    assert f"Maximum quantization error per channel (in its unit) in {bvfmt}" in comment
+    errors = np.array(re.findall(r"^Ch\d+=(.*)$", comment, re.MULTILINE), dtype=float)
+    assert len(errors) == n_chans
+
+    raw = mne.io.read_raw_brainvision(tmpdir / fname + ".vhdr", preload=True)
+    if np.isnan(scale):
+        return
+    # errors are reported in µV, with three significant digits
+    actual_errors = np.abs(raw.get_data() - data_).max(axis=1) * 1e6
+    assert np.all(actual_errors <= errors * 1.01)
+    if kwargs["resolution"] == "auto" and expected_fmt == "binary_int16":
+        # the finest resolutions are chosen, all values fit into int16
+        resolutions = errors
+        peaks = np.abs(data_).max(axis=1) * 1e6
+        assert_allclose(resolutions[:-1], peaks[:-1] / 32766, rtol=1e-2)
+        assert resolutions[-1] == 0.1  # reference channel of zeros
+
+
+def test_auto_resolution_float32(tmpdir):
+    """Test choosing resolutions automatically for a fixed format."""
+    write_brainvision(
+        data=data,
+        sfreq=sfreq,
+        ch_names=ch_names,
+        fname_base=fname,
+        folder_out=tmpdir,
+        resolution="auto",
+    )
+    raw = mne.io.read_raw_brainvision(tmpdir / fname + ".vhdr", preload=True)
+    assert_allclose(raw.get_data(), data, rtol=1e-6)
+    vhdr = (tmpdir / fname + ".vhdr").read_text("utf-8")
+    assert "in IEEE_FLOAT_32:" in vhdr
+
+
+@pytest.mark.parametrize(
+    "max_error, errormsg",
+    [
+        ("y", "max_error should be numeric"),
+        (0, "max_error should be > 0"),
+        (np.ones(n_chans - 1), "max_error should be one or n_channels floats"),
+    ],
+)
+def test_bad_max_error(tmpdir, max_error, errormsg):
+    """Test that invalid maximum quantization errors raise an error."""
+    with pytest.raises(ValueError, match=errormsg):
+        write_brainvision(
+            data=data,
+            sfreq=sfreq,
+            ch_names=ch_names,
+            fname_base=fname,
+            folder_out=tmpdir,
+            fmt="auto",
+            max_error=max_error,
+        )
+
+
+@pytest.mark.parametrize("as_iterator", [False, True])
+def test_write_report(tmpdir, as_iterator):
+    """Test that the stages of writing are measured when instrumented."""
+    kwargs = dict(
+        data=data,
+        sfreq=sfreq,
+        ch_names=ch_names,
+        fname_base=fname,
+        events=iter(events) if as_iterator else events,
+        meas_date="20000101120000000000",
+    )
+    with pytest.warns(UserWarning, match="will be written"):
+        assert write_brainvision(**kwargs, folder_out=tmpdir / "plain") is None
+
+    reports = []
+    kwargs["events"] = iter(events) if as_iterator else events
+    with pytest.warns(UserWarning, match="will be written"):
+        report = write_brainvision(
+            **kwargs, folder_out=tmpdir, chunk_samples=100, instrument=reports.append
+        )
+    assert isinstance(report, WriteReport)
+    assert reports == [report]
+    assert list(report.stage_times) == [
+        "check_inputs",
+        "check_events",
+        "read_data",
+        "check_ref",
+        "scale",
+        "check_range",
+        "convert",
+        "write_eeg",
+        "write_vmrk",
+        "write_vhdr",
+    ]
+    assert all(seconds >= 0 for seconds in report.stage_times.values())
+    assert report.total_time == pytest.approx(sum(report.stage_times.values()))
+    for ext, n_bytes in report.bytes_written.items():
+        assert n_bytes == os.path.getsize(tmpdir / f"{fname}.{ext}")
+        plain = (tmpdir / "plain" / f"{fname}.{ext}").read_binary()
+        assert (tmpdir / f"{fname}.{ext}").read_binary() == plain
+    # float64 block and float32 output buffer of 100 time points
+    assert report.temp_bytes == 100 * n_chans * (8 + 4)
+    assert report.n_events == len(events)
+    # one "New Segment" marker, and one marker per channel of the third event
+    assert report.n_markers == len(events) + 2
+    assert report.fmt == "binary_float32"
+    assert_array_equal(report.resolution, np.full(n_chans, 0.1))
+    assert report.max_errors is None
+    assert re.fullmatch(
+        r"<WriteReport \| .* s, 0.2 MB written, 6 markers>", repr(report)
+    )
+
+
+@pytest.mark.parametrize("orientation", ["multiplexed", "vectorized"])
+def test_progress(tmpdir, orientation):
+    """Test that the progress is reported per block of data and batch of markers."""
+    calls = []
+    write_brainvision(
+        data=data,
+        sfreq=sfreq,
+        ch_names=ch_names,
+        fname_base=fname,
+        folder_out=tmpdir,
+        events=events_array,
+        meas_date="20000101120000000000",
+        chunk_samples=1000,
+        orientation=orientation,
+        progress=lambda *args: calls.append(args),
+    )
+    eeg_calls = [call for call in calls if call[0] == "eeg"]
+    assert len(eeg_calls) == 5  # n_times / chunk_samples
+    assert [call[1] for call in eeg_calls] == [1000 * k for k in range(1, 6)]
+    eeg_size = os.path.getsize(tmpdir / fname + ".eeg")
+    assert all(call[2] == n_times and call[4] == eeg_size for call in eeg_calls)
+    # time points and bytes are both done with the last call
+    assert eeg_calls[-1] == ("eeg", n_times, n_times, eeg_size, eeg_size)
+
+    # "New Segment" and one entry per event
+    assert calls[-1] == (
+        "vmrk",
+        len(events_array) + 1,
+        len(events_array) + 1,
+        os.path.getsize(tmpdir / fname + ".vmrk"),
+        None,
+    )
+
+    # the total number of markers is unknown for iterators
+    calls = []
+    write_brainvision(
+        data=data,
+        sfreq=sfreq,
+        ch_names=ch_names,
+        fname_base=fname,
+        folder_out=tmpdir / "iterator",
+        events=iter(events[:2]),
+        progress=lambda *args: calls.append(args),
+    )
+    assert calls[-1][:3] == ("vmrk", 2, None)
+
+
+@pytest.mark.parametrize("stage", ["eeg", "vmrk", "auto"])
+def test_cancel(tmpdir, monkeypatch, stage):
+    """Test that cancelling a write removes all files written so far."""
+    monkeypatch.setattr(pybv.io, "_MARKER_BATCH", 1)  # check between all markers
+    cancel = threading.Event()
+
+    def progress(this_stage, done, total, n_bytes, total_bytes):
+        if this_stage == stage:
+            cancel.set()
+
+    folder_out = tmpdir / "my_output"
+    kwargs = dict(
+        data=data,
+        sfreq=sfreq,
+        ch_names=ch_names,
+        fname_base=fname,
+        events=events_array,
+        chunk_samples=1000,
+        progress=progress,
+        cancel=cancel,
+    )
+    if stage == "auto":
+        cancel.set()
+        kwargs["fmt"] = "auto"
+    with pytest.raises(CancelledError, match="Writing was cancelled"):
+        write_brainvision(**kwargs, folder_out=folder_out)
+    assert not folder_out.exists()
+
+    # existing folders are kept
+    folder_out.mkdir()
+    cancel.clear()
+    if stage == "auto":
+        cancel.set()
+    with pytest.raises(CancelledError):
+        write_brainvision(**kwargs, folder_out=folder_out)
+    assert folder_out.listdir() == []
+
+
+def test_bad_orientation(tmpdir):
+    """Test that unsupported orientations raise an error before writing."""
+    with pytest.raises(ValueError, match="Orientation bad not supported"):
+        write_brainvision(
+            data=data,
+            sfreq=sfreq,
+            ch_names=ch_names,
+            fname_base=fname,
+            folder_out=tmpdir / "out",
+            orientation="bad",
+        )
+    assert not (tmpdir / "out").exists()
+
+
+@pytest.mark.parametrize("fmt", SUPPORTED_FORMATS.keys())
+def test_writer_matches_write_brainvision(tmpdir, fmt):
+    """Test that the incremental writer produces the same files as the batch writer."""
+    kwargs = dict(
+        sfreq=sfreq,
+        ch_names=ch_names,
+        ref_ch_names=ref_ch_name,
+        fname_base=fname,
+        fmt=fmt,
+        meas_date="20000101120000000000",
+    )
+    # the last event has a description with 4 digits, which would change the width of
+    # all descriptions in the batch writer
+    _events = events[:3]
+    write_brainvision(**kwargs, data=data, folder_out=tmpdir / "batch", events=_events)
+
+    with pytest.warns(UserWarning, match="Such events will be written"):
+        with BrainVisionWriter(**kwargs, folder_out=tmpdir / "stream") as writer:
+            # append blocks of varying size, add markers once all their samples were
+            # written
+            stops = [1, 2, 999, 1500, 3000, n_times]
+            start = 0
+            for stop in stops:
+                writer.append(data[:, start:stop])
+                for event in _events:
+                    end = event["onset"] + event.get("duration", 1)
+                    if start < end <= stop:
+                        writer.add_marker(**event)
+                start = stop
+    assert writer.closed
+    assert writer.n_times == n_times
+
+    # events in the batch writer are sorted by the order in which they are passed
+    batch_vmrk = (tmpdir / "batch" / fname + ".vmrk").read_text("utf-8").splitlines()
+    stream_vmrk = (tmpdir / "stream" / fname + ".vmrk").read_text("utf-8").splitlines()
+    n_markers = len(_events) + 2  # New Segment, and one event written for two channels
+    assert batch_vmrk[:-n_markers] == stream_vmrk[:-n_markers]
+    strip_number = [line.split("=", 1)[1] for line in batch_vmrk[-n_markers:]]
+    assert sorted(strip_number) == sorted(
+        line.split("=", 1)[1] for line in stream_vmrk[-n_markers:]
+    )
+    for ext in (".eeg", ".vhdr"):
+        batch = (tmpdir / "batch" / fname + ext).read_binary()
+        stream = (tmpdir / "stream" / fname + ext).read_binary()
+        assert batch == stream
+
+
+def test_writer_flush(tmpdir):
+    """Test that markers and data are on disk after a flush, before closing."""
+    vmrk_fname = tmpdir / fname + ".vmrk"
+    eeg_fname = tmpdir / fname + ".eeg"
+    writer = BrainVisionWriter(
+        fname_base=fname,
+        folder_out=tmpdir,
+        sfreq=sfreq,
+        ch_names=ch_names,
+        flush_interval=None,
+    )
+    assert (tmpdir / fname + ".vhdr").exists()
+    writer.append(data[:, :100])
+    writer.add_marker(onset=10, description=3)
+    assert "Mk1=" not in vmrk_fname.read_text("utf-8")
+    writer.flush()
+    assert "Mk1=Stimulus,S  3,11,1,0" in vmrk_fname.read_text("utf-8")
+    assert eeg_fname.size() == n_chans * 100 * 4
+
+    writer.close()
+    writer.close()  # closing twice is fine
+    with pytest.raises(ValueError, match="operation on closed BrainVisionWriter"):
+        writer.append(data)
+
+    # a flush interval of 0 flushes on each call
+    with BrainVisionWriter(
+        fname_base="flushed",
+        folder_out=tmpdir,
+        sfreq=sfreq,
+        ch_names=ch_names,
+        flush_interval=0,
+    ) as writer:
+        writer.append(data[:, :100])
+        assert (tmpdir / "flushed.eeg").size() == n_chans * 100 * 4
+        writer.add_marker(onset=10, description=3)
+        assert "Mk1=Stimulus,S  3,11,1,0" in (tmpdir / "flushed.vmrk").read_text(
+            "utf-8"
+        )
+        writer.append(data[:, 100:200])
+        assert (tmpdir / "flushed.eeg").size() == n_chans * 200 * 4
+
+
+def test_writer_errors(tmpdir):
+    """Test that the incremental writer validates its inputs."""
+    kwargs = dict(fname_base=fname, folder_out=tmpdir, sfreq=sfreq, ch_names=ch_names)
+    with pytest.raises(ValueError, match="Data format bad not supported"):
+        BrainVisionWriter(**kwargs, fmt="bad")
+    with pytest.raises(ValueError, match="flush_interval must be a non-negative"):
+        BrainVisionWriter(**kwargs, flush_interval=-1)
+
+    with BrainVisionWriter(
+        **kwargs, ref_ch_names=ref_ch_name, overwrite=True
+    ) as writer:
+        with pytest.raises(ValueError, match="samples must be 2D with shape"):
+            writer.append(data[1:])
+        data_ = data[:, :10].copy()
+        data_[-1] = 1
+        with pytest.raises(ValueError, match="reference channel.*not.*zero"):
+            writer.append(data_)
+        # markers may only refer to samples that were written
+        writer.append(data[:, :10])
+        with pytest.raises(ValueError, match="onset sample is not in range"):
+            writer.add_marker(onset=10, description=1)
+        with pytest.raises(ValueError, match="`type` must be one of"):
+            writer.add_marker(onset=1, description=1, type="bogus")
+
+    with pytest.raises(OSError, match="File already exists"):
+        BrainVisionWriter(**kwargs)
+
+    # data that can not be represented is not written
+    with BrainVisionWriter(**kwargs, fmt="binary_int16", overwrite=True) as writer:
+        with pytest.raises(ValueError, match="can not be represented in"):
+            writer.append(data[:, :10] * 1e6)
+        assert writer.n_times == 0
+    assert (tmpdir / fname + ".eeg").size() == 0
+
+
+class _LazyArray:
+    """Array-like that only supports `shape` and slicing, recording requested sizes."""
+
+    def __init__(self, data):
+        self._data = data
+        self.shape = data.shape
+        self.max_block_size = 0
+
+    def __getitem__(self, item):
+        block = self._data[item]
+        self.max_block_size = max(self.max_block_size, block.size)
+        return block.tolist()  # not an array
+
+
+class _FailingArray(_LazyArray):
+    """Lazy array-like whose reads fail after the first block, like a lost drive."""
+
+    n_reads = 0
+
+    def __getitem__(self, item):
+        self.n_reads += 1
+        if self.n_reads > 1:
+            raise OSError("Lost connection to the data")
+        return super().__getitem__(item)
+
+
+def test_array_like_data(tmpdir):
+    """Test that memmaps, buffers, and lazy array-likes are written identically."""
+    kwargs = dict(
+        sfreq=sfreq,
+        ch_names=ch_names,
+        ref_ch_names=ref_ch_name,
+        fname_base=fname,
+        chunk_samples=100,
+    )
+    write_brainvision(**kwargs, data=data, folder_out=tmpdir / "array")
+    expected = (tmpdir / "array" / fname + ".eeg").read_binary()
+
+    memmap = np.lib.format.open_memmap(
+        str(tmpdir / "data.npy"), mode="w+", shape=data.shape
+    )
+    memmap[:] = data
+    lazy = _LazyArray(data)
+    for i, data_ in enumerate((memmap, memoryview(data), lazy)):
+        write_brainvision(**kwargs, data=data_, folder_out=tmpdir / str(i))
+        assert (tmpdir / str(i) / fname + ".eeg").read_binary() == expected
+
+    # lazy data is never requested as a whole
+    assert 0 < lazy.max_block_size <= n_chans * 100
+
+    with pytest.raises(ValueError, match="data must be 2D: shape"):
+        write_brainvision(**kwargs, data=memoryview(data[0]), folder_out=tmpdir)
+
+    # files are removed if reading lazy data fails during the write
+    failing = _FailingArray(data)
+    with pytest.raises(OSError, match="Lost connection"):
+        write_brainvision(**kwargs, data=failing, folder_out=tmpdir / "failing")
+    assert failing.n_reads > 1
+    assert not (tmpdir / "failing").exists()
+
+
+def test_background_writes(tmpdir):
+    """Test writing in a background thread and from an asyncio event loop."""
+    kwargs = dict(data=data, sfreq=sfreq, ch_names=ch_names, fname_base=fname)
+    write_brainvision(**kwargs, folder_out=tmpdir / "sync")
+    future = submit_write(**kwargs, folder_out=tmpdir / "future")
+    assert future.result() is None
+    asyncio.run(write_brainvision_async(**kwargs, folder_out=tmpdir / "async"))
+    for ext in (".eeg", ".vmrk", ".vhdr"):
+        expected = (tmpdir / "sync" / fname + ext).read_binary()
+        assert (tmpdir / "future" / fname + ext).read_binary() == expected
+        assert (tmpdir / "async" / fname + ext).read_binary() == expected
+
+    # errors propagate, after cleaning up
+    kwargs["fmt"] = "binary_float999"
+    future = submit_write(**kwargs, folder_out=tmpdir / "bad_future")
+    with pytest.raises(ValueError, match="Data format binary_float999"):
+        future.result()
+    assert not (tmpdir / "bad_future").exists()
+    with pytest.raises(ValueError, match="Data format binary_float999"):
+        asyncio.run(write_brainvision_async(**kwargs, folder_out=tmpdir / "bad_async"))
+    assert not (tmpdir / "bad_async").exists()
+
+
+class _SlowArray(_LazyArray):
+    """Lazy array-like that takes a while to read each block, counting the reads."""
+
+    n_reads = 0
+
+    def __getitem__(self, item):
+        self.n_reads += 1
+        time.sleep(0.01)
+        return super().__getitem__(item)
+
+
+def test_async_write_cancel(tmpdir):
+    """Test that cancelling the awaiting task stops the write in the thread."""
+    slow = _SlowArray(data)
+    kwargs = dict(
+        data=slow, sfreq=sfreq, ch_names=ch_names, fname_base=fname, chunk_samples=10
+    )
+
+    async def _write_and_cancel(**kwargs):
+        task = asyncio.create_task(write_brainvision_async(**kwargs))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        await task
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(_write_and_cancel(**kwargs, folder_out=tmpdir / "cancelled"))
+    # the write stopped early and removed its files before the task was cancelled
+    n_reads = slow.n_reads
+    assert 0 < n_reads < data.shape[1] // 10
+    assert not (tmpdir / "cancelled").exists()
+    time.sleep(0.05)
+    assert slow.n_reads == n_reads
+
+    # a cancel event passed by the user still cancels the write
+    cancel = threading.Event()
+    cancel.set()
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(
+            write_brainvision_async(**kwargs, folder_out=tmpdir / "user", cancel=cancel)
+        )
+    assert not (tmpdir / "user").exists()
+
+
+class _PipeLikeStream(io.RawIOBase):
+    """A non-seekable raw stream that writes at most 1000 bytes at a time."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, buffer):
+        self.chunks.append(bytes(buffer[:1000]))
+        return len(self.chunks[-1])
+
+
+@pytest.mark.parametrize("orientation", ["multiplexed", "vectorized"])
+def test_write_streams(tmpdir, orientation):
+    """Test that writing to streams and buffers results in the same files."""
+    kwargs = dict(
+        data=data,
+        sfreq=sfreq,
+        ch_names=ch_names,
+        fname_base=fname,
+        events=events,
+        meas_date="20000101120000000000",
+        fmt="auto",
+        chunk_samples=1000,
+        orientation=orientation,
+    )
+    write_brainvision(**kwargs, folder_out=tmpdir)
+    eeg = _PipeLikeStream()
+    vhdr = io.BytesIO(b"existing content;")
+    vhdr.seek(0, io.SEEK_END)
+    calls = []
+    parts = write_brainvision_streams(
+        **kwargs,
+        streams=dict(eeg=eeg, vhdr=vhdr),
+        progress=lambda *args: calls.append(args),
+    )
+    assert set(parts) == {"vhdr", "vmrk", "eeg"}
+    assert parts["eeg"] is eeg and parts["vhdr"] is vhdr
+    assert not eeg.closed and not vhdr.closed
+    assert b"".join(eeg.chunks) == (tmpdir / fname + ".eeg").read_binary()
+    vhdr_content = (tmpdir / fname + ".vhdr").read_binary()
+    assert vhdr.getvalue() == b"existing content;" + vhdr_content
+    vmrk_content = (tmpdir / fname + ".vmrk").read_binary()
+    assert parts["vmrk"].read() == vmrk_content
+    assert calls[-1][3] == len(vmrk_content)
+
+    # everything is written to new buffers by default
+    parts = write_brainvision_streams(**kwargs)
+    assert parts["eeg"].read() == b"".join(eeg.chunks)
+    assert parts["vhdr"].read() == vhdr_content
+
+
+def test_write_streams_errors():
+    """Test that invalid streams and data raise errors."""
+    kwargs = dict(data=data, sfreq=sfreq, ch_names=ch_names, fname_base=fname)
+    for streams in [[io.BytesIO()], dict(eeg=io.BytesIO(), dat=io.BytesIO())]:
+        with pytest.raises(ValueError, match="streams must be a dict with the keys"):
+            write_brainvision_streams(**kwargs, streams=streams)
+
+    eeg = io.BytesIO()
+    kwargs["data"] = data + 1  # does not fit into int16 in µV
+    with pytest.raises(ValueError, match="can not be represented in 'binary_int16'"):
+        write_brainvision_streams(
+            **kwargs, streams=dict(eeg=eeg), fmt="binary_int16", chunk_samples=1000
+        )
+    assert not eeg.closed
+
+
+@pytest.mark.parametrize("orientation", ["multiplexed", "vectorized"])
+@pytest.mark.parametrize("bad_value", [1e-6, np.nan, np.inf])
+def test_ref_ch_checked_while_writing(tmpdir, bad_value, orientation):
+    """Test that reference channels are checked in all blocks, cleaning up on error."""
+    data_ = data.copy()
+    data_[ch_names.index(ref_ch_name), -1] = bad_value
+    folder_out = tmpdir / "my_output"
+    with pytest.raises(ValueError, match="reference channel.*not.*zero"):
+        write_brainvision(
+            data=data_,
+            sfreq=sfreq,
+            ch_names=ch_names,
+            ref_ch_names=ref_ch_name,
+            fname_base=fname,
+            folder_out=folder_out,
+            chunk_samples=100,
+            orientation=orientation,
+        )
+    assert not folder_out.exists()
+
+    # values within the tolerance of np.allclose are fine
+    data_[ch_names.index(ref_ch_name), -1] = 1e-9
+    write_brainvision(
+        data=data_,
+        sfreq=sfreq,
+        ch_names=ch_names,
+        ref_ch_names=ref_ch_name,
+        fname_base=fname,
+        folder_out=folder_out,
+        chunk_samples=100,
+        orientation=orientation,
+    )
+
+
+def test_events_array_same_as_list_of_dict(tmpdir):
+    """Test that array events are written like the equivalent list of dict."""
+    events_array_ = np.column_stack([events_array, [1, 0, 5, 1]])
+    events_list = [
+        dict(onset=int(onset), description=int(descr), duration=int(duration))
+        for onset, descr, duration in events_array_
+    ]
+    kwargs = dict(data=data, sfreq=sfreq, ch_names=ch_names, fname_base=fname)
+    write_brainvision(**kwargs, folder_out=tmpdir / "array", events=events_array_)
+    write_brainvision(**kwargs, folder_out=tmpdir / "list", events=events_list)
+    vmrk_array = (tmpdir / "array" / fname + ".vmrk").read_text("utf-8")
+    vmrk_list = (tmpdir / "list" / fname + ".vmrk").read_text("utf-8")
+    assert vmrk_array == vmrk_list
+    assert "Mk3=Stimulus,S  2,3001,5,0" in vmrk_array
+
+
+@pytest.mark.parametrize(
+    "events_errormsg",
+    [
+        ([[1, 1, -1], [-1, 1, 1]], "at least one duration is negative"),
+        ([[1, 1, 1], [-1, 1, 1]], "at least one onset sample is not in range"),
+        ([[4999, 1, 2]], "at least one event has a duration that exceeds"),
+        ([[1, -1, 1], [4999, 1, 2]], "descriptions must be non-negative ints"),
+    ],
+)
+def test_events_array_errors(tmpdir, events_errormsg):
+    """Test that the first invalid event determines the error for array events."""
+    ev, errormsg = events_errormsg
+    with pytest.raises(ValueError, match=errormsg):
+        write_brainvision(
+            data=data,
+            sfreq=sfreq,
+            ch_names=ch_names,
+            fname_base=fname,
+            folder_out=tmpdir,
+            events=np.array(ev),
+        )
+
+
+def test_events_iterator(tmpdir, monkeypatch):
+    """Test that events can be passed as an iterator and are written in batches."""
+    monkeypatch.setattr(pybv.io, "_MARKER_BATCH", 2)
+    kwargs = dict(data=data, sfreq=sfreq, ch_names=ch_names, fname_base=fname)
+    _events = events[:3]  # descriptions with at most three digits
+    with pytest.warns(UserWarning, match="Such events will be written"):
+        write_brainvision(**kwargs, folder_out=tmpdir / "list", events=_events)
+    with pytest.warns(UserWarning, match="Such events will be written"):
+        write_brainvision(**kwargs, folder_out=tmpdir / "iter", events=iter(_events))
+    vmrk_list = (tmpdir / "list" / fname + ".vmrk").read_text("utf-8")
+    vmrk_iter = (tmpdir / "iter" / fname + ".vmrk").read_text("utf-8")
+    assert vmrk_list == vmrk_iter
+    assert "Mk4=Response,R  2,1001,1,3" in vmrk_iter
+
+    # events are consumed lazily, validation errors clean up all files
+    def gen_events():
+        yield from _events
+        yield dict(onset=n_times, description=1)
+
+    folder_out = tmpdir / "bad"
+    with (
+        pytest.raises(ValueError, match="onset sample is not in range"),
+        pytest.warns(UserWarning, match="Such events will be written"),
+    ):
+        write_brainvision(**kwargs, folder_out=folder_out, events=gen_events())
+    assert not folder_out.exists()
+
+
+def test_event_table_same_as_list_of_dict(tmpdir):
+    """Test that an EventTable is written like the equivalent list of dict."""
+    events_list = [dict(ev, type=ev.get("type", "Stimulus")) for ev in events]
+    columns = {
+        key: [ev.get(key, default) for ev in events_list]
+        for key, default in [
+            ("onset", None),
+            ("description", None),
+            ("duration", 1),
+            ("type", None),
+            ("channels", "all"),
+        ]
+    }
+    kwargs = dict(data=data, sfreq=sfreq, ch_names=ch_names, fname_base=fname)
+    events_in = {
+        "list": events_list,
+        "table": EventTable(**columns),
+        "columns": EventTable.from_columns(columns),
+        "records": EventTable.from_records(events_list),
+    }
+    for name, ev in events_in.items():
+        with pytest.warns(UserWarning, match="Such events will be written"):
+            write_brainvision(**kwargs, folder_out=tmpdir / name, events=ev)
+        vmrk = (tmpdir / name / fname + ".vmrk").read_text("utf-8")
+        assert vmrk == (tmpdir / "list" / fname + ".vmrk").read_text("utf-8")
+    assert repr(events_in["table"]) == f"<EventTable | {len(events)} events>"
+
+    # structured arrays are written as their columns, like arrays of int
+    structured = np.zeros(len(events_array), [("onset", int), ("description", int)])
+    structured["onset"], structured["description"] = events_array.T
+    write_brainvision(**kwargs, folder_out=tmpdir / "structured", events=structured)
+    write_brainvision(**kwargs, folder_out=tmpdir / "array", events=events_array)
+    vmrk_structured = (tmpdir / "structured" / fname + ".vmrk").read_text("utf-8")
+    vmrk_array = (tmpdir / "array" / fname + ".vmrk").read_text("utf-8")
+    assert vmrk_structured == vmrk_array
+
+
+@pytest.mark.parametrize(
+    "kwargs_errormsg",
+    [
+        (dict(onset=[[1, 2]], description=[1, 2]), "`onset` must be 1D"),
+        (dict(onset=[1.5], description=[1]), "`onset` must be int"),
+        (dict(onset=[1, 2], description=[1]), "`description` must have one entry"),
+        (dict(onset=[1, 2], description=[1, 2], duration=[1]), "`duration` must have"),
+        (dict(onset=[1], description=[1], type="bogus"), "`type` must be one of"),
+        (dict(onset=[1], description=[1], channels=[]), "`channels` must have one"),
+        (
+            dict(onset=[1, 2], description=[1, "a"], type=["Stimulus", "Response"]),
+            "when `type` is Response, `description` must be non-negative int",
+        ),
+        (
+            dict(onset=[1, 2], description=[1, 2], channels=[["ch_1"], ["bogus"]]),
+            "found channel name that is not present in the data: bogus",
+        ),
+    ],
+)
+def test_event_table_errors(tmpdir, kwargs_errormsg):
+    """Test that invalid EventTable columns raise errors."""
+    kwargs, errormsg = kwargs_errormsg
+    with pytest.raises(ValueError, match=errormsg):
+        write_brainvision(
+            data=data,
+            sfreq=sfreq,
+            ch_names=ch_names,
+            fname_base=fname,
+            folder_out=tmpdir,
+            events=EventTable(**kwargs),
+        )
+
+    with pytest.raises(ValueError, match="must have the columns 'onset' and"):
+        EventTable.from_columns(dict(onset=[1]))
+
+
+def test_many_channels(tmpdir):
+    """Test that many channels with per-channel events and references are handled."""
+    n_chans_ = 4096
+    ch_names_ = [f"ch_{i}" for i in range(n_chans_)]
+    data_ = np.zeros((n_chans_, 100))
+    events_ = [
+        dict(onset=i % 100, description=1, channels=[ch_names_[i], ch_names_[i - 1]])
+        for i in range(n_chans_)
+    ]
+    kwargs = dict(data=data_, sfreq=sfreq, ch_names=ch_names_, fname_base=fname)
+    ref_ch_names_ = ch_names_[::-1]  # each channel serves as a reference
+    with pytest.warns(UserWarning, match="Such events will be written") as record:
+        write_brainvision(
+            **kwargs, ref_ch_names=ref_ch_names_, folder_out=tmpdir, events=events_
+        )
+    assert len(record) == 1
+    vmrk = (tmpdir / fname + ".vmrk").read_text("utf-8")
+    assert f"Mk{2 * n_chans_}=Stimulus,S  1,96,1,{n_chans_}\n" in vmrk
+
+    # the reference channel with the lowest index is reported
+    data_[[7, 3]] = 1
+    with pytest.raises(ValueError, match="reference channel ch_3 does not appear"):
+        write_brainvision(
+            **kwargs,
+            ref_ch_names=ref_ch_names_,
+            folder_out=tmpdir,
+            overwrite=True,
+        )
+
+
+@pytest.mark.parametrize("executor", ["thread", "process", "instance"])
+def test_write_brainvision_batch(tmpdir, executor):
+    """Test writing many datasets in parallel, passing data by reference."""
+    np.save(str(tmpdir / "data.npy"), data)
+    shm = shared_memory.SharedMemory(create=True, size=data.nbytes)
+    try:
+        np.ndarray(data.shape, buffer=shm.buf)[:] = data
+        kwargs = dict(sfreq=sfreq, ch_names=ch_names, fname_base=fname)
+        jobs = [
+            dict(**kwargs, data=data, folder_out=tmpdir / "array"),
+            dict(**kwargs, data=str(tmpdir / "data.npy"), folder_out=tmpdir / "npy"),
+            dict(**kwargs, data=shm, data_shape=data.shape, folder_out=tmpdir / "shm"),
+            dict(**kwargs, data=data, folder_out=tmpdir / "bad", fmt="bogus"),
+        ]
+        if executor == "instance":
+            with ThreadPoolExecutor(2) as pool:
+                results = write_brainvision_batch(jobs, executor=pool)
+        else:
+            results = write_brainvision_batch(jobs, executor=executor, max_workers=2)
+    finally:
+        shm.close()
+        shm.unlink()
+
+    assert [res["vhdr_fname"] for res in results] == [
+        job["folder_out"] / (fname + ".vhdr") for job in jobs
+    ]
+    assert all(res["time"] > 0 for res in results)
+    assert [res["error"] for res in results[:3]] == [None] * 3
+    with pytest.raises(ValueError, match="Data format bogus not supported"):
+        raise results[3]["error"]
+    assert not (tmpdir / "bad").exists()  # cleaned up
+    eeg = (tmpdir / "array" / fname + ".eeg").read_binary()
+    for folder in ["npy", "shm"]:
+        assert (tmpdir / folder / fname + ".eeg").read_binary() == eeg
+
+    # invalid parameters
+    with pytest.raises(ValueError, match="jobs must be an iterable of dict"):
+        write_brainvision_batch([jobs[0], None])
+    with pytest.raises(ValueError, match="executor must be 'thread', 'process'"):
+        write_brainvision_batch(jobs, executor="bogus")